@@ -17,11 +17,45 @@ __author__ = """Elliot Palmer"""
 __email__ = 'elliot@ecoplumbers.com'
 __version__ = '0.3.2'
 
-# MODULES
-import requests
-import json
-
-from servicepytan.requests import Endpoint
-from servicepytan.reports import Report
-from servicepytan.data import DataService
-from servicepytan._dates import _convert_date_to_api_format
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+
+# Public names and the module defining them. They are imported on first access
+# (PEP 562), so `import servicepytan` does not load requests, dateutil or pytz.
+_LAZY_ATTRIBUTES = {
+  "Endpoint": "servicepytan.requests",
+  "Report": "servicepytan.reports",
+  "DataService": "servicepytan.data",
+  "_convert_date_to_api_format": "servicepytan._dates",
+  "Connection": "servicepytan.connection",
+  "ExportSync": "servicepytan.sync",
+  "ResponseCache": "servicepytan.cache",
+}
+
+__all__ = [name for name in _LAZY_ATTRIBUTES if not name.startswith("_")]
+
+if TYPE_CHECKING:
+  from servicepytan.requests import Endpoint
+  from servicepytan.reports import Report
+  from servicepytan.data import DataService
+  from servicepytan._dates import _convert_date_to_api_format
+  from servicepytan.connection import Connection
+  from servicepytan.sync import ExportSync
+  from servicepytan.cache import ResponseCache
+
+def __getattr__(name):
+  module = _LAZY_ATTRIBUTES.get(name)
+  if module is not None:
+    value = globals()[name] = getattr(import_module(module), name)
+    return value
+  # Submodules (e.g., `servicepytan.utils`) are imported on first access
+  try:
+    return import_module(f"{__name__}.{name}")
+  except ModuleNotFoundError as e:
+    if e.name != f"{__name__}.{name}":
+      raise
+  raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+  return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
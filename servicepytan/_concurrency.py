@@ -0,0 +1,89 @@
+"""Concurrency Module: Bounded thread pools for running API requests in parallel"""
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+def _imap_concurrently(func, items, max_workers=4):
+  """Applies a function to each item on a bounded thread pool, yielding results in order.
+
+  At most `max_workers` calls run at once and at most twice that many results are
+  held waiting to be consumed, so memory stays bounded for long inputs. The first
+  exception raised by a call cancels every call that has not started yet and is
+  re-raised to the consumer. Closing the generator early cancels outstanding calls too.
+
+  Args:
+      func: Callable taking a single item
+      items: Iterable of items to pass to the callable
+      max_workers: Maximum number of concurrent calls
+
+  Yields:
+      The result of `func(item)` for each item, in the order of `items`
+
+  Raises:
+      Exception: The first exception raised by `func`
+
+  Examples:
+      >>> for page in _imap_concurrently(fetch_page, range(2, 10), max_workers=4):
+      ...     data.extend(page)
+  """
+  items = iter(items)
+  if max_workers <= 1:
+    for item in items:
+      yield func(item)
+    return
+
+  executor = ThreadPoolExecutor(max_workers=max_workers)
+  pending = deque()
+  in_flight = set()
+  lock = threading.Lock()
+  errors = []
+
+  def cancel_on_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+      with lock:
+        errors.append(future.exception())
+        for other in in_flight:
+          other.cancel()
+
+  def next_result():
+    future = pending.popleft()
+    with lock:
+      in_flight.discard(future)
+    if future.cancelled() and errors:
+      # Cancelled because another call failed, surface that failure instead
+      raise errors[0]
+    return future.result()
+
+  try:
+    for item in items:
+      if errors:
+        break
+      future = executor.submit(func, item)
+      with lock:
+        in_flight.add(future)
+      future.add_done_callback(cancel_on_failure)
+      pending.append(future)
+      if len(pending) >= max_workers * 2:
+        yield next_result()
+    while pending:
+      yield next_result()
+  finally:
+    with lock:
+      for future in in_flight:
+        future.cancel()
+    executor.shutdown(wait=True)
+
+def _map_concurrently(func, items, max_workers=4):
+  """Applies a function to each item on a bounded thread pool and returns the results in order.
+
+  See `_imap_concurrently` for cancellation behavior.
+
+  Args:
+      func: Callable taking a single item
+      items: Iterable of items to pass to the callable
+      max_workers: Maximum number of concurrent calls
+
+  Returns:
+      list: The result of `func(item)` for each item, in the order of `items`
+  """
+  return list(_imap_concurrently(func, items, max_workers))
@@ -1,7 +1,19 @@
 """Dates Module: Converting Dates to UTC format"""
+import re
+from datetime import date as _date, datetime, timedelta, timezone as _timezone
+from functools import lru_cache
 
-from dateutil.parser import parse
-import pytz
+# dateutil and pytz are imported when first needed, keeping `import servicepytan` fast
+
+# ISO dates and timestamps handled without dateutil: 2024-01-15, 2024-01-15T10:30, 2024-01-15 10:30:45.1234567Z, ...
+_ISO_PATTERN = re.compile(
+  r"^(\d{4})-(\d{2})-(\d{2})"
+  r"(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d+))?)?)?"
+  r"(Z|[+-]\d{2}:?\d{2})?$"
+)
+
+# Timestamp fields returned by most API records
+API_TIMESTAMP_FIELDS = ("createdOn", "modifiedOn", "completedOn")
 
 def _convert_date_to_api_format(date, timezone=""):
   """Converts a date into ISO format compatible with API endpoint parameters.
@@ -31,11 +43,61 @@ def _convert_date_to_api_format(date, timezone=""):
   formatted_date = _format_date_to_iso_format(parsed_date)
   return formatted_date
 
+def _convert_dates_to_api_format(dates, timezone=""):
+  """Converts many dates into API format at once (see `_convert_date_to_api_format`).
+
+  Args:
+      dates: Iterable of strings or datetime objects
+      timezone: A string using a Timezone DB abbreviation (e.g. 'America/New_York')
+
+  Returns:
+      list: Date strings in ISO format, in the order of `dates`
+
+  Examples:
+      >>> _convert_dates_to_api_format(["2024-01-01", "2024-01-02"], "America/New_York")
+      >>> # Returns: ["2024-01-01T05:00:00Z", "2024-01-02T05:00:00Z"]
+  """
+  return [_convert_date_to_api_format(date, timezone) for date in dates]
+
+def _to_datetime(value):
+  """Converts a date string, date or datetime into a datetime."""
+  if isinstance(value, str):
+    return _parse_date_string(value)
+  if isinstance(value, datetime):
+    return value
+  if isinstance(value, _date):
+    return datetime(value.year, value.month, value.day)
+  raise TypeError(f"Unsupported date value: {value!r}")
+
+def _split_date_range(start_date, end_date, step):
+  """Splits a [start_date, end_date) window into consecutive (start, end) datetime windows of `step`.
+
+  Args:
+      start_date: Start of the window (string, date or datetime), inclusive
+      end_date: End of the window (string, date or datetime), exclusive
+      step: `timedelta` size of each window (the last one may be shorter)
+
+  Returns:
+      list: (start, end) datetime tuples covering the window without gaps or overlap
+  """
+  if step <= timedelta(0):
+    raise ValueError("Shard size must be positive.")
+  start = _to_datetime(start_date)
+  end = _to_datetime(end_date)
+  windows = []
+  while start < end:
+    windows.append((start, min(start + step, end)))
+    start += step
+  return windows
+
+@lru_cache(maxsize=4096)
 def _parse_date_string(date_string):
   """Parse date string to datetime object.
   
-  Uses dateutil.parser to intelligently parse various date string formats
-  into a datetime object. This handles most common date formats automatically.
+  ISO dates and timestamps are parsed directly; other formats fall back to
+  dateutil.parser, which handles most common date formats automatically.
+  Results are cached, since the same dates are converted over and over when
+  building queries.
   
   Args:
       date_string: String representation of a date/time
@@ -51,13 +113,92 @@ def _parse_date_string(date_string):
       >>> _parse_date_string("January 15, 2024")
       >>> _parse_date_string("2024-01-15T10:30:00")
   """
-  return parse(date_string)
+  parsed = _parse_iso(date_string)
+  if parsed is None:
+    from dateutil.parser import parse
+    parsed = parse(date_string)
+  return parsed
+
+def _parse_iso(value):
+  """Parses an ISO date or timestamp, or returns None if `value` is not in ISO format.
+
+  Fractional seconds are truncated to microseconds (the API sends up to 7 digits)
+  and a "Z" suffix gives a UTC datetime. Timestamps without an offset are naive.
+  """
+  match = _ISO_PATTERN.match(value)
+  if match is None:
+    return None
+  year, month, day, hour, minute, second, fraction, offset = match.groups()
+  microsecond = int(fraction[:6].ljust(6, "0")) if fraction else 0
+  tzinfo = None
+  if offset == "Z":
+    tzinfo = _timezone.utc
+  elif offset:
+    sign = -1 if offset[0] == "-" else 1
+    digits = offset[1:].replace(":", "")
+    tzinfo = _timezone(sign * timedelta(hours=int(digits[:2]), minutes=int(digits[2:])))
+  return datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0),
+                  microsecond, tzinfo=tzinfo)
+
+def parse_api_datetime(value):
+  """Parse a timestamp from an API response into a datetime.
+
+  Handles the API's ISO timestamps ("2024-01-15T10:30:45.1234567Z") quickly,
+  including 7-digit fractional seconds (truncated to microseconds) and the "Z"
+  suffix. Other formats fall back to dateutil.
+
+  Args:
+      value: Timestamp string, or None
+
+  Returns:
+      datetime: Timezone-aware datetime when the timestamp has "Z" or an offset,
+          naive otherwise; None if `value` is None or empty
+
+  Examples:
+      >>> parse_api_datetime("2024-01-15T10:30:45.1234567Z")
+      >>> # Returns: datetime(2024, 1, 15, 10, 30, 45, 123456, tzinfo=timezone.utc)
+  """
+  if not value:
+    return None
+  parsed = _parse_iso(value)
+  if parsed is None:
+    from dateutil.parser import parse
+    parsed = parse(value)
+  return parsed
+
+def parse_api_datetimes(records, fields=API_TIMESTAMP_FIELDS):
+  """Parse timestamp fields of many records in place.
+
+  Args:
+      records: List of record dictionaries
+      fields: Names of the timestamp fields to parse
+
+  Returns:
+      list: The same records, with the fields converted to datetimes
+
+  Examples:
+      >>> jobs = parse_api_datetimes(Endpoint("jpm", "jobs", conn).get_all(), ("createdOn", "completedOn"))
+  """
+  for record in records:
+    for field in fields:
+      value = record.get(field)
+      if isinstance(value, str):
+        record[field] = parse_api_datetime(value)
+  return records
+
+@lru_cache(maxsize=None)
+def _get_timezone(timezone):
+  """Returns the pytz timezone for a name, cached across calls."""
+  import pytz
+  return pytz.timezone(timezone)
 
+@lru_cache(maxsize=4096)
 def _change_timezones(datetime_object, timezone):
     """Convert a datetime object from one timezone to UTC.
     
     Takes a naive datetime object (without timezone info) and treats it as
-    being in the specified timezone, then converts it to UTC.
+    being in the specified timezone, then converts it to UTC. Results are
+    cached, as pytz's `localize` is the slowest step of date conversion.
     
     Args:
         datetime_object: Naive datetime object to convert
@@ -71,7 +212,7 @@ def _change_timezones(datetime_object, timezone):
         >>> utc_dt = _change_timezones(dt, "America/New_York")
         >>> # Returns equivalent UTC time (15:30 in winter, 14:30 in summer)
     """
-    timezone = pytz.timezone(timezone)
+    timezone = _get_timezone(timezone)
     parsed_date = timezone.localize(datetime_object)
     parsed_date = _convert_datetime_to_utc(parsed_date)
     return parsed_date
@@ -93,7 +234,10 @@ def _format_date_to_iso_format(datetime_object):
       >>> _format_date_to_iso_format(dt)
       >>> # Returns: "2024-01-15T10:30:45Z"
   """
-  return datetime_object.strftime('%Y-%m-%dT%H:%M:%SZ')
+  if not isinstance(datetime_object, datetime):
+    return datetime_object.strftime('%Y-%m-%dT%H:%M:%SZ')
+  d = datetime_object
+  return f"{d.year:04d}-{d.month:02d}-{d.day:02d}T{d.hour:02d}:{d.minute:02d}:{d.second:02d}Z"
 
 def _convert_datetime_to_utc(datetime_object):
   """Convert datetime object to UTC timezone.
@@ -113,4 +257,5 @@ def _convert_datetime_to_utc(datetime_object):
       >>> utc_dt = _convert_datetime_to_utc(dt)
       >>> # Returns datetime in UTC (15:30)
   """
+  import pytz
   return datetime_object.astimezone(pytz.UTC)
\ No newline at end of file
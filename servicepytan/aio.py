@@ -0,0 +1,585 @@
+"""Asyncio client mirroring the Endpoint and Report APIs.
+
+Requires the optional `httpx` dependency (`pip install servicepytan[async]`).
+
+  Examples:
+    >>> import asyncio
+    >>> from servicepytan.aio import AsyncClient, AsyncEndpoint
+    >>> async def main(conn):
+    ...     async with AsyncClient(conn, max_concurrency=20) as client:
+    ...         jobs = AsyncEndpoint("jpm", "jobs", client=client)
+    ...         customers = AsyncEndpoint("crm", "customers", client=client)
+    ...         return await asyncio.gather(jobs.get_all(), customers.get_all())
+"""
+import asyncio
+import math
+import time
+from collections import deque
+
+from servicepytan.auth import get_token_manager, get_app_key
+from servicepytan.decoders import get_decoder
+from servicepytan.metrics import _response_size, get_metrics, request_event
+from servicepytan.ratelimit import get_rate_limiter, get_retry_policy, parse_retry_after
+from servicepytan.reports import ReportTimeoutError, _ReportParams, get_report_metadata_cache, get_report_rate_limiter
+from servicepytan.utils import _http_method, check_default_options, endpoint_url
+
+try:
+  import httpx
+except ImportError:
+  httpx = None
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def _gather_ordered(coroutines, limit):
+  """Awaits coroutines concurrently and returns their results in order.
+
+  At most `limit` coroutines are scheduled at once; the rest are only created
+  (when `coroutines` is a generator) as earlier ones finish, so long inputs do not
+  create a task per item up front. The first failure cancels every scheduled
+  coroutine that has not finished and is re-raised.
+  """
+  results = []
+  pending = deque()
+  try:
+    for coroutine in coroutines:
+      pending.append(asyncio.ensure_future(coroutine))
+      if len(pending) >= limit:
+        results.append(await pending.popleft())
+    while pending:
+      results.append(await pending.popleft())
+  except BaseException:
+    for task in pending:
+      task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    raise
+  return results
+
+class AsyncClient:
+  """Shared async HTTP client with a connection pool and a concurrency limit.
+
+  One `AsyncClient` can be shared by any number of `AsyncEndpoint` and `AsyncReport`
+  objects so that every request in the event loop reuses the same pooled
+  connections, auth token, per-tenant rate limiter and retry policy as the
+  blocking API.
+
+  Attributes:
+      conn: a dictionary or `Connection` containing the credential config.
+      max_connections: Maximum number of pooled HTTP connections.
+      max_concurrency: Maximum number of requests in flight at once.
+      timeout: Request timeout in seconds.
+  """
+  def __init__(self, conn=None, max_connections=20, max_concurrency=10, timeout=60):
+    """Inits AsyncClient. The HTTP pool is created on first use."""
+    if httpx is None:
+      raise ImportError("The async client requires httpx. Install it with `pip install servicepytan[async]`.")
+    self.conn = conn
+    self.max_connections = max_connections
+    self.max_concurrency = max_concurrency
+    self.timeout = timeout
+    self._client = None
+    self._semaphore = None
+    self._token_lock = None
+
+  @property
+  def client(self):
+    """The pooled `httpx.AsyncClient`, created on first use."""
+    if self._client is None:
+      self._client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+        timeout=self.timeout,
+      )
+    return self._client
+
+  @property
+  def semaphore(self):
+    """The semaphore bounding the number of requests in flight."""
+    if self._semaphore is None:
+      self._semaphore = asyncio.Semaphore(self.max_concurrency)
+    return self._semaphore
+
+  async def aclose(self):
+    """Closes the pooled HTTP connections."""
+    if self._client is not None:
+      await self._client.aclose()
+      self._client = None
+
+  async def __aenter__(self):
+    return self
+
+  async def __aexit__(self, exc_type, exc_value, traceback):
+    await self.aclose()
+
+  async def get_auth_headers(self):
+    """Returns the auth headers, refreshing the shared cached token without blocking the loop.
+
+    Returns:
+        dict: Dictionary containing Authorization and ST-App-Key headers
+
+    Raises:
+        httpx.HTTPStatusError: If the authentication request fails
+    """
+    manager = get_token_manager()
+    auth_root = self.conn["auth_root"]
+    client_id = self.conn["SERVICETITAN_CLIENT_ID"]
+    token = manager.cached_token(auth_root, client_id)
+    if token is None:
+      if self._token_lock is None:
+        self._token_lock = asyncio.Lock()
+      async with self._token_lock:
+        token = manager.cached_token(auth_root, client_id)
+        if token is None:
+          response = await self.client.post(
+            f"{auth_root}/connect/token",
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            data={
+              "grant_type": "client_credentials",
+              "client_id": client_id,
+              "client_secret": self.conn["SERVICETITAN_CLIENT_SECRET"],
+            },
+          )
+          response.raise_for_status()
+          token = manager.store(auth_root, client_id, response.json())
+    return {"Authorization": token, "ST-App-Key": get_app_key(self.conn)}
+
+  async def request(self, request_type, url, idempotent=None, **kwargs):
+    """Sends an authenticated request with rate limiting and retries.
+
+    Async counterpart of `utils.send_request`, applying the connection's retry
+    policy and the tenant's shared rate limiter. Like `send_request`, requests that
+    are not idempotent (POST, PATCH) are only retried on 429 and when the
+    connection could not be established.
+
+    Args:
+        request_type: HTTP method type ("GET", "POST", "PUT", "PATCH", "DELETE")
+        url: The complete URL for the API request
+        idempotent: Whether the request is safe to send twice (defaults to the retry policy's verdict)
+        **kwargs: Passed to `httpx.AsyncClient.request` (params, data, json, ...)
+
+    Returns:
+        httpx.Response: The last response received. Its status is not checked.
+
+    Raises:
+        httpx.TransportError: If the connection keeps failing after every attempt
+    """
+    request_type = _http_method(request_type)
+    policy = get_retry_policy(self.conn)
+    limiter = get_rate_limiter(self.conn)
+    shared_limiter = getattr(self.conn, "shared_rate_limiter", None)
+    metrics = get_metrics(self.conn)
+    if idempotent is None:
+      idempotent = policy.is_idempotent(request_type)
+    attempt = 0
+    token_refreshed = False
+    async with self.semaphore:
+      started = time.perf_counter()
+      waited = 0.0
+      while True:
+        attempt += 1
+        wait = limiter.reserve()
+        if shared_limiter is not None:
+          wait = max(wait, shared_limiter.reserve())
+        if wait > 0:
+          waited += wait
+          await asyncio.sleep(wait)
+        headers = await self.get_auth_headers()
+        sent = time.perf_counter()
+        try:
+          response = await self.client.request(request_type, url, headers=headers, **kwargs)
+        except httpx.TransportError as e:
+          # Connect errors and timeouts mean the server never received the request
+          connect_failed = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+          if attempt >= policy.max_attempts or not (idempotent or connect_failed):
+            if metrics.enabled:
+              now = time.perf_counter()
+              metrics.emit(request_event(request_type, url, self.conn, seconds=now - started, latency=now - sent,
+                                         retries=attempt - 1, rate_limit_wait=waited, error=e.__class__.__name__))
+            raise
+          delay = policy.delay(attempt)
+          logger.warning(f"{e.__class__.__name__} on {url}. Retrying in {delay:.1f} seconds (attempt {attempt} of {policy.max_attempts})...")
+          await asyncio.sleep(delay)
+          continue
+
+        if response.status_code == 401 and not token_refreshed:
+          token_refreshed = True
+          attempt -= 1
+          get_token_manager().invalidate(self.conn["auth_root"], self.conn["SERVICETITAN_CLIENT_ID"], headers["Authorization"])
+          continue
+
+        retryable = idempotent or response.status_code == 429
+        if retryable and response.status_code in policy.retry_statuses and attempt < policy.max_attempts:
+          retry_after = parse_retry_after(response) if response.status_code == 429 else None
+          delay = policy.delay(attempt, retry_after)
+          if response.status_code == 429:
+            limiter.throttle(delay)
+          logger.warning(f"Error {response.status_code} on {url}. Retrying in {delay:.1f} seconds (attempt {attempt} of {policy.max_attempts})...")
+          await asyncio.sleep(delay)
+          continue
+
+        if response.is_success:
+          limiter.recover()
+        if metrics.enabled:
+          now = time.perf_counter()
+          metrics.emit(request_event(request_type, url, self.conn, status=response.status_code, seconds=now - started,
+                                     latency=now - sent, size=_response_size(response), retries=attempt - 1,
+                                     rate_limit_wait=waited))
+        return response
+
+  async def request_json(self, url, options={}, payload=None, request_type="GET", json_payload=None, idempotent=None):
+    """Makes the request to the API and returns JSON.
+
+    Args:
+        url: The complete URL for the API request
+        options: Dictionary of query parameters to add to the URL for filtering
+        payload: Dictionary containing form data for the request body
+        request_type: HTTP method type ("GET", "POST", "PUT", "PATCH", "DELETE")
+        json_payload: Dictionary containing JSON data for the request body
+        idempotent: Whether the request is safe to retry after a server error (see `request`)
+
+    Returns:
+        dict: JSON response from the API
+
+    Raises:
+        httpx.HTTPStatusError: If the API request fails after every retry
+    """
+    options = {key: str(value).lower() if isinstance(value, bool) else value for key, value in options.items()}
+    response = await self.request(request_type, url, idempotent=idempotent, params=options, data=payload or None,
+                                  json=json_payload)
+    if response.status_code != 200:
+      logger.error(f"Error fetching data (url={url}, data={payload}, json={json_payload}): {response.text}")
+      response.raise_for_status()
+    return get_decoder(self.conn).decode(response.content, url)
+
+  async def request_contents(self, url, options={}):
+    """Fetches the raw contents of a URL.
+
+    Args:
+        url: The complete URL for the API request
+        options: Dictionary of query parameters to add to the URL
+
+    Returns:
+        bytes: The response body
+
+    Raises:
+        httpx.HTTPStatusError: If the API request fails after every retry
+    """
+    response = await self.request("GET", url, params=options)
+    response.raise_for_status()
+    return response.content
+
+class _OwnedClient:
+  """Closes the `AsyncClient` an object created for itself.
+
+  Objects given a shared client leave it open for its owner to close.
+  """
+  def _set_client(self, conn, client):
+    self._owns_client = client is None
+    self.client = AsyncClient(conn) if client is None else client
+    self.conn = self.client.conn
+
+  async def aclose(self):
+    """Closes the client's pooled connections if this object created the client."""
+    if self._owns_client:
+      await self.client.aclose()
+
+  async def __aenter__(self):
+    return self
+
+  async def __aexit__(self, exc_type, exc_value, traceback):
+    await self.aclose()
+
+class AsyncEndpoint(_OwnedClient):
+  """Async counterpart of `Endpoint`.
+
+  Without a shared `client`, the endpoint creates its own; use it with `async with`
+  (or await `aclose()`) so its connections are closed.
+
+  Examples:
+      >>> async with AsyncEndpoint("jpm", "jobs", conn) as jobs:
+      ...     records = await jobs.get_all()
+
+  Attributes:
+      folder: A string indicating the group of endpoints you want to address.
+      endpoint: A string indicating the endpoint you want to address.
+      client: The `AsyncClient` shared with other async endpoints and reports.
+      conn: a dictionary or `Connection` containing the credential config.
+  """
+  def __init__(self, folder, endpoint, conn=None, client=None):
+    """Inits AsyncEndpoint, creating its own `AsyncClient` when none is shared."""
+    self.folder = folder
+    self.endpoint = endpoint
+    self._set_client(conn, client)
+
+  def _url(self, id="", modifier=""):
+    return endpoint_url(self.folder, self.endpoint, id=id, modifier=modifier, conn=self.conn)
+
+  async def get_one(self, id, modifier="", query={}):
+    """Retrieve one record using the record id (see `Endpoint.get_one`)."""
+    return await self.client.request_json(self._url(id, modifier), options=check_default_options(dict(query)))
+
+  async def get_many(self, query={}, id="", modifier=""):
+    """Retrieve one page of results (see `Endpoint.get_many`)."""
+    return await self.client.request_json(self._url(id, modifier), options=check_default_options(dict(query)))
+
+  async def iter_all(self, query={}, id="", modifier="", pages=False):
+    """Stream all pages of results one after another (see `Endpoint.iter_all`).
+
+    Yields:
+        dict: Each record, or each page response when `pages` is True
+    """
+    query = dict(query)
+    page = 1
+    while True:
+      query["page"] = str(page)
+      response = await self.get_many(query=query, id=id, modifier=modifier)
+      if page == 1 and response["data"] == []:
+        return
+      if pages:
+        yield response
+      else:
+        for record in response["data"]:
+          yield record
+      if not response["hasMore"]:
+        return
+      page += 1
+
+  async def get_all(self, query={}, id="", modifier="", concurrent=True):
+    """Retrieve all pages of results for your query.
+
+    The first page is requested with `includeTotal=true` and the remaining pages are
+    fetched concurrently, bounded by the client's `max_concurrency` (with at most
+    twice that many pages scheduled at once). Records are returned in page order.
+
+    Args:
+        query: Dictionary of query parameters for filtering
+        id: Optional record ID for accessing sub-resources
+        modifier: Optional sub-resource path
+        concurrent: If False, fetch the pages one after another
+
+    Returns:
+        list: Combined list of all records from all pages
+
+    Raises:
+        httpx.HTTPStatusError: If any API request fails
+    """
+    if not concurrent:
+      return [record async for record in self.iter_all(query, id=id, modifier=modifier)]
+
+    query = check_default_options(dict(query))
+    response = await self.get_many(query=dict(query, page="1", includeTotal="true"), id=id, modifier=modifier)
+    data = response["data"]
+    if data == [] or not response["hasMore"]:
+      return data
+
+    page_size = int(response.get("pageSize") or query["pageSize"])
+    last_page = max(math.ceil((response.get("totalCount") or 0) / page_size), 2)
+    responses = await _gather_ordered(
+      (self.get_many(query=dict(query, page=str(page)), id=id, modifier=modifier) for page in range(2, last_page + 1)),
+      limit=self.client.max_concurrency * 2,
+    )
+    for response in responses:
+      data.extend(response["data"])
+    page = last_page
+    while response["hasMore"]:
+      page += 1
+      response = await self.get_many(query=dict(query, page=str(page)), id=id, modifier=modifier)
+      data.extend(response["data"])
+    return data
+
+  async def create(self, payload):
+    """Create a new record via POST request (see `Endpoint.create`)."""
+    return await self.client.request_json(self._url(), json_payload=payload, request_type="POST")
+
+  async def update(self, id, payload, modifier="", request_type="PUT"):
+    """Update an existing record via PUT or PATCH request (see `Endpoint.update`)."""
+    return await self.client.request_json(self._url(id, modifier), payload=payload, request_type=request_type)
+
+  async def delete(self, id, modifier=""):
+    """Delete a record via DELETE request (see `Endpoint.delete`)."""
+    return await self.client.request_json(self._url(id, modifier), request_type="DELETE")
+
+  async def export_one(self, export_endpoint, export_from="", include_recent_changes=False):
+    """Export one page of data from an export endpoint (see `Endpoint.export_one`)."""
+    url = endpoint_url(self.folder, "export", modifier=f"{export_endpoint}", conn=self.conn)
+    return await self.client.request_json(url, options={"from": export_from, "includeRecentChanges": include_recent_changes})
+
+  async def iter_export(self, export_endpoint, export_from="", include_recent_changes=False, pages=False):
+    """Stream all data from an export endpoint (see `Endpoint.iter_export`).
+
+    Yields:
+        dict: Each exported record, or each page response when `pages` is True
+    """
+    while True:
+      response = await self.export_one(export_endpoint, export_from, include_recent_changes)
+      if pages:
+        yield response
+      else:
+        for record in response["data"]:
+          yield record
+      if response["data"] == [] or not response["hasMore"]:
+        return
+      export_from = response["continueFrom"]
+
+  async def export_all(self, export_endpoint, export_from="", include_recent_changes=False):
+    """Export all data from an export endpoint (see `Endpoint.export_all`).
+
+    Export pages are chained by their `continueFrom` token, so they are fetched one
+    after another; run several exports at once to use the client's concurrency.
+
+    Returns:
+        list: Combined list of all exported records
+    """
+    return [record async for record in self.iter_export(export_endpoint, export_from, include_recent_changes)]
+
+  async def download(self, id, modifier="", filename=None):
+    """Download a file from the specified endpoint (see `Endpoint.download`).
+
+    Returns:
+        bytes: The content of the downloaded file
+    """
+    if not id:
+      raise ValueError("ID must be provided to download a file.")
+    file_bytes = await self.client.request_contents(self._url(id, modifier))
+    if filename:
+      with open(filename, "wb") as f:
+        f.write(file_bytes)
+    return file_bytes
+
+class AsyncReport(_OwnedClient, _ReportParams):
+  """Async counterpart of `Report`.
+
+  Parameters are managed with the same `add_params`/`update_params`/`get_params`
+  methods as `Report`. Metadata is not fetched on construction; await
+  `get_metadata()` before calling `show_param_types()` unless it is already in the
+  shared `ReportMetadataCache`. Like `AsyncEndpoint`, a report without a shared
+  `client` owns its client and should be closed with `async with` or `aclose()`.
+
+  Attributes:
+      category: A string representing the report category.
+      report_id: A string representing the report id.
+      params: The report parameters, as for `Report`.
+      client: The `AsyncClient` shared with other async endpoints and reports.
+  """
+  def __init__(self, category, report_id, conn=None, client=None):
+    """Inits AsyncReport, creating its own `AsyncClient` when none is shared."""
+    self._set_client(conn, client)
+    self.category = category
+    self.report_id = report_id
+    self.params = {"parameters": []}
+    self._metadata = None
+
+  @property
+  def metadata(self):
+    """The report metadata if assigned or cached (and not expired), otherwise None."""
+    if self._metadata is not None:
+      return self._metadata
+    return get_report_metadata_cache().get(self.category, self.report_id, self.conn)
+
+  @metadata.setter
+  def metadata(self, value):
+    self._metadata = value
+
+  def _url(self, suffix=""):
+    return endpoint_url("reporting", f"report-category/{self.category}/reports/{self.report_id}{suffix}", conn=self.conn)
+
+  def show_param_types(self):
+    """Display parameter types and requirements (see `Report.show_param_types`).
+
+    Raises:
+        ValueError: If the metadata has not been loaded with `get_metadata()`
+    """
+    if self.metadata is None:
+      raise ValueError("The report metadata is not loaded. Await get_metadata() before show_param_types().")
+    super().show_param_types()
+
+  async def get_metadata(self, refresh=False):
+    """Get report metadata including available parameters and their types (see `Report.get_metadata`)."""
+    cache = get_report_metadata_cache()
+    metadata = None if refresh else cache.get(self.category, self.report_id, self.conn)
+    if metadata is None:
+      metadata = await self.client.request_json(self._url())
+      cache.set(self.category, self.report_id, metadata, self.conn)
+    return metadata
+
+  async def get_data(self, params="", page=1, page_size=5000):
+    """Get report data for a specific page (see `Report.get_data`)."""
+    return await self._get_data(params, page, page_size)
+
+  async def _get_data(self, params="", page=1, page_size=5000, deadline=None):
+    """Gets one page for `get_data`, giving up before the limiter wait when it would pass `deadline`."""
+    if params == "":
+      params = self.params
+    options = {"page": page, "pageSize": page_size, "includeTotal": True}
+    # A page that would wait past the deadline does not take a slot from the shared limiter
+    max_wait = None if deadline is None else deadline - time.monotonic()
+    wait = get_report_rate_limiter(self.report_id, self.conn).reserve(max_wait=max_wait)
+    if wait is None:
+      raise ReportTimeoutError(f"The report rate limit would delay page {page} past the deadline.")
+    if wait > 0:
+      await asyncio.sleep(wait)
+    return await self.client.request_json(self._url("/data"), options=options, json_payload=params, request_type="POST",
+                                          idempotent=True)
+
+  async def get_all_data(self, params="", page_size=5000, timeout_min=60):
+    """Get all report data, fetching the pages after the first concurrently (see `Report.get_all_data`).
+
+    The page count comes from the first page's `totalCount`; pages are then
+    requested one after another while the last one reports `hasMore`, so a stale
+    total does not truncate the data. `timeout_min` is a wall-clock deadline for
+    the whole pull: pages not yet requested when it passes are skipped and the
+    records retrieved so far are returned along with an 'error' entry.
+
+    Args:
+        params: Parameter configuration (uses instance params if empty)
+        page_size: Number of records per page (max 5000)
+        timeout_min: Maximum time in minutes before aborting the request
+
+    Returns:
+        dict: Dictionary containing 'data' (list of records) and 'fields' (metadata),
+            plus 'error' if the deadline passed before every page was retrieved
+
+    Raises:
+        httpx.HTTPStatusError: If any API request fails
+    """
+    deadline = time.monotonic() + timeout_min * 60
+    if params == "":
+      params = self.params
+    data = []
+    fields = []
+
+    async def fetch_page(page):
+      if time.monotonic() > deadline:
+        raise ReportTimeoutError(f"Timed out after {timeout_min} minutes before requesting page {page}.")
+      return await self._get_data(params, page=page, page_size=page_size, deadline=deadline)
+
+    async def fetch_until_timeout(page):
+      # Pages before a timed-out one are kept, so the timeout is returned instead of raised
+      try:
+        return await fetch_page(page)
+      except ReportTimeoutError as e:
+        return e
+
+    try:
+      response = await fetch_page(1)
+      fields.extend(response["fields"])
+      data.extend(response["data"])
+      page = 1
+      if response["hasMore"]:
+        page = max(math.ceil(response["totalCount"] / page_size), 1)
+        responses = await _gather_ordered((fetch_until_timeout(page) for page in range(2, page + 1)),
+                                          limit=self.client.max_concurrency * 2)
+        for response in responses:
+          if isinstance(response, ReportTimeoutError):
+            raise response
+          data.extend(response["data"])
+      while response["hasMore"]:
+        page += 1
+        response = await fetch_page(page)
+        if not response["data"]:
+          break
+        data.extend(response["data"])
+    except ReportTimeoutError as e:
+      logger.warning(f"{e} Returning the {len(data)} records retrieved so far.")
+      return {"data": data, "fields": fields, "error": f"Timed out after {timeout_min} minutes. Limit the parameters to reduce the number of requests and try again."}
+    return {"data": data, "fields": fields}
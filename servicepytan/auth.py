@@ -3,7 +3,8 @@
 import requests
 import json
 import os
-from dotenv import load_dotenv
+import threading
+import time
 
 try:
     from enum import StrEnum
@@ -15,7 +16,6 @@ except ImportError:
 
 import logging
 
-logging.basicConfig()
 logger = logging.getLogger(__name__)
 
 
@@ -160,6 +160,7 @@ def servicepytan_connect(
     # If not, check if the environment variables are set
     # AFAICT, app_id is never used in the rest of the code, so it isn't necessary
     elif not api_environment or not app_key or not tenant_id or not client_id or not client_secret:
+        from dotenv import load_dotenv
         load_dotenv()
         logger.info("Auth config not provided, loading from environment variables...")
         for var in AUTH_VARIABLES:
@@ -172,7 +173,7 @@ def servicepytan_connect(
 
     return auth_config_object
 
-def request_auth_token(auth_root_url: str, client_id, client_secret):
+def request_auth_token(auth_root_url: str, client_id, client_secret, session=None):
   """Fetches Auth Token.
 
   Retrieves authentication token for completing a request against the API
@@ -180,6 +181,7 @@ def request_auth_token(auth_root_url: str, client_id, client_secret):
   Args:
       client_id: String, provided from the integration settings
       client_secret: String, provided from the integration settings
+      session: Optional `requests.Session` to send the request with
 
   Returns:
       Authentication token
@@ -199,18 +201,137 @@ def request_auth_token(auth_root_url: str, client_id, client_secret):
     "client_secret": client_secret,
   }
 
-  response = requests.post(url, headers=headers, data=data)
+  response = (session or requests).post(url, headers=headers, data=data)
   if response.status_code != requests.codes.ok:
     logger.error(f"Error fetching auth token (url={url}, header={headers}, data={data}): {response.text}")
     response.raise_for_status()
 
   return response.json()
 
+# Tokens are refreshed this many seconds before ServiceTitan says they expire
+TOKEN_REFRESH_MARGIN_SECONDS = 60
+# Used when the token response does not include `expires_in` (ServiceTitan issues 15 minute tokens)
+DEFAULT_TOKEN_LIFETIME_SECONDS = 900
+
+class AuthTokenManager:
+  """Caches OAuth access tokens and refreshes them ahead of expiry.
+
+  Tokens are keyed by (auth_root, client_id) so every connection using the same
+  app credentials shares one token. When a token is missing or about to expire,
+  only one thread performs the refresh while concurrent callers for the same key
+  wait for it and reuse the result.
+
+  Attributes:
+      refresh_margin: Seconds before expiry at which a cached token is considered stale.
+  """
+  def __init__(self, refresh_margin=TOKEN_REFRESH_MARGIN_SECONDS):
+    """Inits AuthTokenManager with an empty cache."""
+    self.refresh_margin = refresh_margin
+    self._tokens = {}
+    self._locks = {}
+    self._lock = threading.Lock()
+
+  def _key_lock(self, key):
+    """Returns the refresh lock for a (auth_root, client_id) key."""
+    with self._lock:
+      return self._locks.setdefault(key, threading.Lock())
+
+  def cached_token(self, auth_root_url, client_id):
+    """Returns the cached access token if it is still fresh, otherwise None.
+
+    Args:
+        auth_root_url: The authentication root URL
+        client_id: String, provided from the integration settings
+
+    Returns:
+        str: The cached access token or None
+    """
+    entry = self._tokens.get((auth_root_url, client_id))
+    if entry and time.monotonic() < entry["expires_at"] - self.refresh_margin:
+      return entry["access_token"]
+    return None
+
+  def store(self, auth_root_url, client_id, token_response):
+    """Stores a token response returned by the `/connect/token` endpoint.
+
+    Args:
+        auth_root_url: The authentication root URL
+        client_id: String, provided from the integration settings
+        token_response: Dictionary containing `access_token` and `expires_in`
+
+    Returns:
+        str: The stored access token
+    """
+    expires_in = token_response.get("expires_in") or DEFAULT_TOKEN_LIFETIME_SECONDS
+    self._tokens[(auth_root_url, client_id)] = {
+      "access_token": token_response["access_token"],
+      "expires_at": time.monotonic() + int(expires_in),
+    }
+    return token_response["access_token"]
+
+  def get_token(self, auth_root_url, client_id, client_secret, session=None):
+    """Returns a valid access token, requesting a new one only when needed.
+
+    Args:
+        auth_root_url: The authentication root URL
+        client_id: String, provided from the integration settings
+        client_secret: String, provided from the integration settings
+        session: Optional `requests.Session` to request the token with
+
+    Returns:
+        str: Access token
+
+    Raises:
+        requests.HTTPError: If the authentication request fails
+    """
+    token = self.cached_token(auth_root_url, client_id)
+    if token:
+      return token
+    with self._key_lock((auth_root_url, client_id)):
+      # Another thread may have refreshed the token while we were waiting on the lock
+      token = self.cached_token(auth_root_url, client_id)
+      if token:
+        return token
+      logger.info(f"Requesting new auth token for client {client_id}...")
+      token_response = request_auth_token(auth_root_url, client_id, client_secret, session=session)
+      return self.store(auth_root_url, client_id, token_response)
+
+  def invalidate(self, auth_root_url, client_id, token=None):
+    """Drops a cached token so the next call requests a new one.
+
+    Args:
+        auth_root_url: The authentication root URL
+        client_id: String, provided from the integration settings
+        token: Optional token that was rejected. The cache is only cleared if it still
+            holds this token, so a token refreshed by another thread is kept.
+    """
+    key = (auth_root_url, client_id)
+    with self._key_lock(key):
+      entry = self._tokens.get(key)
+      if entry and (token is None or entry["access_token"] == token):
+        del self._tokens[key]
+
+  def clear(self):
+    """Drops every cached token."""
+    with self._lock:
+      self._tokens.clear()
+
+_token_manager = AuthTokenManager()
+
+def get_token_manager():
+  """Returns the token manager shared by all requests in the process.
+
+  Returns:
+      AuthTokenManager: The shared token manager
+  """
+  return _token_manager
+
 def get_auth_token(conn):
   """Fetches Auth Token using the connection configuration.
 
   Retrieves the CLIENT_ID and CLIENT_SECRET entries from the connection object
-  and requests an authentication token from the ServiceTitan API.
+  and returns a cached authentication token, requesting a new one from the
+  ServiceTitan API only when the cached token is missing or about to expire.
 
   Args:
       conn: Dictionary containing the credential configuration
@@ -224,7 +345,17 @@ def get_auth_token(conn):
   # Read File
   client_id = conn['SERVICETITAN_CLIENT_ID']
   client_secret = conn['SERVICETITAN_CLIENT_SECRET']
-  return request_auth_token(conn["auth_root"], client_id, client_secret)["access_token"]
+  session = getattr(conn, "session", None)
+  return _token_manager.get_token(conn["auth_root"], client_id, client_secret, session=session)
+
+def invalidate_auth_token(conn, token=None):
+  """Drops the cached token for the connection, e.g. after the API rejected it.
+
+  Args:
+      conn: Dictionary containing the credential configuration
+      token: Optional token that was rejected (see `AuthTokenManager.invalidate`)
+  """
+  _token_manager.invalidate(conn["auth_root"], conn['SERVICETITAN_CLIENT_ID'], token)
 
 def get_app_key(conn):
   """Fetches App Key from the connection configuration.
@@ -0,0 +1,160 @@
+"""Bulk Module: Concurrent create/update/delete with per-item results"""
+import hashlib
+import json
+import os
+import threading
+
+import requests
+from servicepytan._concurrency import _imap_concurrently
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+BULK_ACTIONS = ("create", "update", "patch", "delete", "delete_subitem")
+
+def _operation_key(operation):
+  """Returns the key identifying an operation in results and checkpoints.
+
+  Without a caller-supplied `key`, the key is derived from the operation's content
+  (action, ids, modifier and a hash of the payload), so it stays the same when the
+  operations are regenerated in a different order.
+  """
+  if "key" in operation:
+    return str(operation["key"])
+  content = json.dumps(
+    [operation.get("modifier", ""), operation.get("modifier_id"), operation.get("payload")],
+    sort_keys=True, default=str,
+  )
+  digest = hashlib.sha256(content.encode()).hexdigest()[:16]
+  return f"{operation['action']}:{operation.get('id', '')}:{digest}"
+
+class BulkWriter:
+  """Runs many write operations against one endpoint on a bounded worker pool.
+
+  Each operation is a dictionary with an `action` and the arguments of the matching
+  `Endpoint` method:
+
+  - {"action": "create", "payload": {...}}
+  - {"action": "update", "id": 123, "payload": {...}, "modifier": ""}
+  - {"action": "patch", "id": 123, "payload": {...}, "modifier": ""}
+  - {"action": "delete", "id": 123, "modifier": ""}
+  - {"action": "delete_subitem", "id": 123, "modifier_id": 456, "modifier": "tags"}
+
+  An optional `key` names the operation in results and checkpoints. By default it
+  is derived from the action, id, modifier and a hash of the payload, so it does not
+  depend on the operation's position. Identical operations share a key (a resumed
+  run skips them all once one succeeded); give them distinct keys if needed. Requests share the connection's rate limiter and
+  retry rate limited and transient failures with its `RetryPolicy`. A failing
+  operation does not stop the batch; its result carries the error instead.
+
+  With a `checkpoint_path`, the key of every successful operation is appended to
+  that file as it completes, and operations already in the file are skipped when
+  the batch is run again.
+
+  Attributes:
+      endpoint: The `Endpoint` the operations are sent to.
+      max_workers: Number of operations sent concurrently.
+      checkpoint_path: Optional path of the checkpoint file.
+  """
+  def __init__(self, endpoint, max_workers=4, checkpoint_path=None):
+    """Inits BulkWriter."""
+    self.endpoint = endpoint
+    self.max_workers = max_workers
+    self.checkpoint_path = checkpoint_path
+    self._checkpoint_lock = threading.Lock()
+
+  def completed_keys(self):
+    """Returns the set of operation keys recorded in the checkpoint file."""
+    if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+      return set()
+    with open(self.checkpoint_path) as f:
+      return {line.rstrip("\n") for line in f if line.strip()}
+
+  def _record(self, key):
+    with self._checkpoint_lock:
+      with open(self.checkpoint_path, "a") as f:
+        f.write(f"{key}\n")
+        f.flush()
+
+  def _apply(self, operation):
+    """Sends one operation and returns the API response."""
+    action = operation["action"]
+    modifier = operation.get("modifier", "")
+    if action == "create":
+      return self.endpoint.create(operation["payload"])
+    if action == "update":
+      return self.endpoint.update(operation["id"], operation["payload"], modifier=modifier)
+    if action == "patch":
+      return self.endpoint.update(operation["id"], operation["payload"], modifier=modifier, request_type="PATCH")
+    if action == "delete":
+      return self.endpoint.delete(operation["id"], modifier=modifier)
+    if action == "delete_subitem":
+      return self.endpoint.delete_subitem(operation["id"], operation["modifier_id"], modifier)
+    raise ValueError(f"Unsupported bulk action '{action}'. Valid actions are: {', '.join(BULK_ACTIONS)}.")
+
+  def _run_one(self, item):
+    index, key, operation = item
+    result = {"index": index, "key": key, "action": operation.get("action"), "id": operation.get("id"),
+              "ok": False, "skipped": False, "response": None, "error": None, "status_code": None}
+    try:
+      result["response"] = self._apply(operation)
+      result["ok"] = True
+    except requests.HTTPError as e:
+      result["error"] = str(e)
+      result["status_code"] = e.response.status_code if e.response is not None else None
+    except Exception as e:
+      result["error"] = f"{e.__class__.__name__}: {e}"
+    if result["ok"] and self.checkpoint_path:
+      self._record(key)
+    return result
+
+  def iter_results(self, operations):
+    """Run the operations and stream their results in input order.
+
+    Args:
+        operations: Iterable of operation dictionaries
+
+    Yields:
+        dict: One result per operation with 'index', 'key', 'action', 'id', 'ok',
+            'skipped', 'response', 'error' and 'status_code'
+    """
+    completed = self.completed_keys()
+
+    def pending():
+      for index, operation in enumerate(operations):
+        yield index, _operation_key(operation), operation
+
+    def run(item):
+      index, key, operation = item
+      if key in completed:
+        return {"index": index, "key": key, "action": operation.get("action"), "id": operation.get("id"),
+                "ok": True, "skipped": True, "response": None, "error": None, "status_code": None}
+      return self._run_one(item)
+
+    yield from _imap_concurrently(run, pending(), self.max_workers)
+
+  def run(self, operations):
+    """Run the operations and return every result.
+
+    Args:
+        operations: Iterable of operation dictionaries
+
+    Returns:
+        list: One result dictionary per operation, in input order (see `iter_results`)
+
+    Examples:
+        >>> writer = BulkWriter(Endpoint("crm", "customers", conn), max_workers=8, checkpoint_path="tags.ckpt")
+        >>> results = writer.run({"action": "patch", "id": id, "payload": {"tagTypeIds": tags}} for id, tags in updates)
+        >>> failed = [result for result in results if not result["ok"]]
+    """
+    results = list(self.iter_results(operations))
+    failed = sum(1 for result in results if not result["ok"])
+    skipped = sum(1 for result in results if result["skipped"])
+    logger.info(f"Bulk {self.endpoint.folder}/{self.endpoint.endpoint}: {len(results) - failed - skipped} succeeded, {failed} failed, {skipped} skipped.")
+    return results
+
+  def reset(self):
+    """Deletes the checkpoint file so the next run sends every operation."""
+    if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+      os.remove(self.checkpoint_path)
@@ -0,0 +1,266 @@
+"""Cache Module: TTL response cache for slowly changing reference data"""
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Reference data that rarely changes, in seconds. Keys are "folder/endpoint" prefixes.
+DEFAULT_TTLS = {
+  "settings/employees": 900,
+  "settings/technicians": 900,
+  "settings/business-units": 900,
+  "settings/tag-types": 900,
+  "reporting/dynamic-value-sets": 900,
+}
+
+_ENDPOINT_PATH = re.compile(r"/(?P<folder>[^/]+)/v2/tenant/[^/]+/(?P<path>[^?]+)")
+
+def _endpoint_template(url):
+  """Returns the "folder/endpoint/..." part of an API URL, or the URL itself."""
+  match = _ENDPOINT_PATH.search(url)
+  if match is None:
+    return url
+  return f"{match.group('folder')}/{match.group('path')}"
+
+def _matches_endpoint(url, prefix):
+  """Returns True if a URL belongs to a "folder/endpoint" prefix."""
+  template = _endpoint_template(url)
+  return template == prefix or template.startswith(f"{prefix}/")
+
+class MemoryCacheBackend:
+  """In-memory LRU cache backend bounded to `max_entries` responses.
+
+  Attributes:
+      max_entries: Maximum number of cached responses before the least recently used is evicted.
+  """
+  def __init__(self, max_entries=1024):
+    """Inits MemoryCacheBackend."""
+    self.max_entries = max_entries
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, key):
+    """Returns (expires_at, body) for a key, or None."""
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        return None
+      self._entries.move_to_end(key)
+      return entry[2], entry[3]
+
+  def set(self, key, tenant_id, url, expires_at, body):
+    """Stores a response body, evicting the least recently used entries when full."""
+    with self._lock:
+      self._entries[key] = (tenant_id, url, expires_at, body)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+
+  def delete(self, key):
+    """Removes one entry."""
+    with self._lock:
+      self._entries.pop(key, None)
+
+  def delete_matching(self, predicate):
+    """Removes every entry for which `predicate(tenant_id, url)` is true."""
+    with self._lock:
+      for key, (tenant_id, url, _, _) in list(self._entries.items()):
+        if predicate(tenant_id, url):
+          del self._entries[key]
+
+  def clear(self):
+    """Removes every entry."""
+    with self._lock:
+      self._entries.clear()
+
+  def __len__(self):
+    return len(self._entries)
+
+class SQLiteCacheBackend:
+  """On-disk cache backend storing responses in a SQLite database.
+
+  Entries survive restarts, so short-lived processes can share reference data.
+  When more than `max_entries` responses are stored, those expiring first are evicted.
+
+  Attributes:
+      path: Path of the SQLite database file.
+      max_entries: Maximum number of cached responses.
+  """
+  def __init__(self, path="servicepytan_cache.db", max_entries=10000):
+    """Inits SQLiteCacheBackend and creates the cache table if needed."""
+    self.path = path
+    self.max_entries = max_entries
+    self._lock = threading.Lock()
+    with self._connect() as db:
+      db.execute(
+        "CREATE TABLE IF NOT EXISTS response_cache ("
+        "key TEXT PRIMARY KEY, tenant_id TEXT, url TEXT, expires_at REAL, body BLOB)"
+      )
+
+  @contextmanager
+  def _connect(self):
+    db = sqlite3.connect(self.path)
+    try:
+      with db:
+        yield db
+    finally:
+      db.close()
+
+  def get(self, key):
+    """Returns (expires_at, body) for a key, or None."""
+    with self._lock, self._connect() as db:
+      row = db.execute("SELECT expires_at, body FROM response_cache WHERE key=?", (key,)).fetchone()
+    return (row[0], bytes(row[1])) if row else None
+
+  def set(self, key, tenant_id, url, expires_at, body):
+    """Stores a response body, evicting the entries expiring first when full."""
+    with self._lock, self._connect() as db:
+      db.execute("INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?)", (key, tenant_id, url, expires_at, body))
+      db.execute(
+        "DELETE FROM response_cache WHERE key IN ("
+        "SELECT key FROM response_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+        (self.max_entries,)
+      )
+
+  def delete(self, key):
+    """Removes one entry."""
+    with self._lock, self._connect() as db:
+      db.execute("DELETE FROM response_cache WHERE key=?", (key,))
+
+  def delete_matching(self, predicate):
+    """Removes every entry for which `predicate(tenant_id, url)` is true."""
+    with self._lock, self._connect() as db:
+      rows = db.execute("SELECT key, tenant_id, url FROM response_cache").fetchall()
+      db.executemany("DELETE FROM response_cache WHERE key=?", [(key,) for key, tenant_id, url in rows if predicate(tenant_id, url)])
+
+  def clear(self):
+    """Removes every entry."""
+    with self._lock, self._connect() as db:
+      db.execute("DELETE FROM response_cache")
+
+  def __len__(self):
+    with self._lock, self._connect() as db:
+      return db.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+class ResponseCache:
+  """TTL cache for GET responses, keyed by (tenant, URL, normalized query).
+
+  Only endpoints with a TTL are cached. TTLs are looked up by the longest matching
+  "folder/endpoint" prefix in `ttls`, falling back to `default_ttl` (0 disables
+  caching). Response bodies are stored raw and decoded on every hit, so callers
+  can safely modify the data they receive.
+
+  Attributes:
+      ttls: Dictionary of "folder/endpoint" prefix to TTL in seconds.
+      default_ttl: TTL in seconds for endpoints not listed in `ttls`.
+      backend: Storage backend (`MemoryCacheBackend` or `SQLiteCacheBackend`).
+      hits: Number of requests answered from the cache.
+      misses: Number of cacheable requests that went to the API.
+
+  Examples:
+      >>> cache = ResponseCache(ttls={**DEFAULT_TTLS, "pricebook/categories": 3600})
+      >>> conn = Connection(config_file="servicepytan_config.json", cache=cache)
+      >>> DataService(conn).get_employees()  # fetched from the API
+      >>> DataService(conn).get_employees()  # answered from the cache
+      >>> cache.stats()
+  """
+  def __init__(self, ttls=None, default_ttl=0, max_entries=1024, backend=None):
+    """Inits ResponseCache, defaulting to an in-memory LRU backend and `DEFAULT_TTLS`."""
+    self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+    self.default_ttl = default_ttl
+    self.backend = backend if backend is not None else MemoryCacheBackend(max_entries)
+    self.hits = 0
+    self.misses = 0
+    self._stats_lock = threading.Lock()
+
+  def ttl_for(self, url):
+    """Returns the TTL in seconds for a URL (0 when it is not cached)."""
+    matches = [prefix for prefix in self.ttls if _matches_endpoint(url, prefix)]
+    if not matches:
+      return self.default_ttl
+    return self.ttls[max(matches, key=len)]
+
+  @staticmethod
+  def make_key(tenant_id, url, options=None):
+    """Returns the cache key for a request. Query parameter order does not matter."""
+    query = sorted((str(key), str(value)) for key, value in (options or {}).items())
+    return json.dumps([str(tenant_id), url, query])
+
+  def _count(self, hit):
+    with self._stats_lock:
+      if hit:
+        self.hits += 1
+      else:
+        self.misses += 1
+
+  def get(self, tenant_id, url, options=None):
+    """Returns the cached response body for a request, or None if missing or expired."""
+    key = self.make_key(tenant_id, url, options)
+    entry = self.backend.get(key)
+    if entry is not None and entry[0] > time.time():
+      self._count(True)
+      return entry[1]
+    if entry is not None:
+      self.backend.delete(key)
+    self._count(False)
+    return None
+
+  def set(self, tenant_id, url, options, body, ttl=None):
+    """Stores a response body for a request."""
+    ttl = self.ttl_for(url) if ttl is None else ttl
+    if ttl > 0:
+      self.backend.set(self.make_key(tenant_id, url, options), str(tenant_id), url, time.time() + ttl, body)
+
+  def invalidate(self, tenant_id=None, endpoint=None):
+    """Removes cached responses for a tenant and/or an endpoint.
+
+    Args:
+        tenant_id: Optional tenant whose responses are removed
+        endpoint: Optional "folder/endpoint" (e.g., "settings/employees") whose responses are removed
+
+    Examples:
+        >>> cache.invalidate(endpoint="settings/employees")
+        >>> cache.invalidate(tenant_id="1234567890")
+    """
+    if tenant_id is None and endpoint is None:
+      self.clear()
+      return
+
+    def matches(entry_tenant_id, url):
+      if tenant_id is not None and entry_tenant_id != str(tenant_id):
+        return False
+      return endpoint is None or _matches_endpoint(url, endpoint.strip("/"))
+
+    self.backend.delete_matching(matches)
+
+  def clear(self):
+    """Removes every cached response."""
+    self.backend.clear()
+
+  def stats(self):
+    """Returns hit/miss statistics.
+
+    Returns:
+        dict: 'hits', 'misses', 'hit_rate' and 'entries'
+    """
+    lookups = self.hits + self.misses
+    return {
+      "hits": self.hits,
+      "misses": self.misses,
+      "hit_rate": self.hits / lookups if lookups else 0.0,
+      "entries": len(self.backend),
+    }
+
+def get_response_cache(conn):
+  """Returns the response cache attached to a connection, or None.
+
+  Args:
+      conn: Dictionary or `Connection` containing the credential configuration
+
+  Returns:
+      ResponseCache: The connection's cache, or None for plain dictionaries
+  """
+  return getattr(conn, "cache", None)
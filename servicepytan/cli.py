@@ -0,0 +1,308 @@
+"""Command-line interface for bulk extraction from the ServiceTitan API"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+import click
+
+from servicepytan import __version__
+from servicepytan.auth import servicepytan_connect
+from servicepytan.connection import Connection
+from servicepytan.metrics import Metrics
+from servicepytan.requests import Endpoint
+from servicepytan.reports import Report
+from servicepytan.sinks import CSVSink, NDJSONSink, ParquetSink
+from servicepytan.sync import ExportSync, FileCheckpointStore
+
+logger = logging.getLogger(__name__)
+
+SINKS = {"ndjson": NDJSONSink, "csv": CSVSink, "parquet": ParquetSink}
+
+def _parse_pairs(values, option):
+  """Parses repeated NAME=VALUE options into a dictionary."""
+  pairs = {}
+  for value in values:
+    name, separator, item = value.partition("=")
+    if not separator or not name:
+      raise click.BadParameter(f"Expected NAME=VALUE, got '{value}'.", param_hint=option)
+    pairs[name] = item
+  return pairs
+
+class _Progress:
+  """Metrics hook counting requests, and progress printed to stderr."""
+  def __init__(self, quiet=False):
+    self.quiet = quiet
+    self.started = time.monotonic()
+    self.requests = 0
+    self.retries = 0
+    self.bytes = 0
+    self.rate_limit_wait = 0.0
+    self.pages = 0
+    self.records = 0
+    self._lock = threading.Lock()
+
+  def __call__(self, event):
+    if event["event"] == "request":
+      with self._lock:
+        self.requests += 1
+        self.retries += event["retries"]
+        self.bytes += event["bytes"] or 0
+        self.rate_limit_wait += event["rate_limit_wait"]
+
+  def page(self, records):
+    self.pages += 1
+    self.records += records
+    if not self.quiet:
+      seconds = max(time.monotonic() - self.started, 1e-9)
+      click.echo(f"\r{self.records} records, {self.pages} pages ({self.records / seconds:.0f} records/s)", err=True, nl=False)
+
+  def summary(self, manifest=None):
+    seconds = max(time.monotonic() - self.started, 1e-9)
+    if self.pages and not self.quiet:
+      click.echo(err=True)
+    files = f", {len(manifest['files'])} file(s)" if manifest else ""
+    click.echo(
+      f"{self.records} records in {self.pages} pages{files}, {self.requests} requests ({self.retries} retries), "
+      f"{self.bytes / 2 ** 20:.1f} MB in {seconds:.1f}s: {self.records / seconds:.0f} records/s, "
+      f"{self.requests / seconds:.1f} requests/s, {self.rate_limit_wait:.1f}s waiting on rate limits",
+      err=True,
+    )
+
+class _StdoutSink:
+  """Writes records to stdout as NDJSON."""
+  def __init__(self):
+    self.metadata = {}
+    self.manifest = None
+    self.rows = 0
+
+  @property
+  def closed_rows(self):
+    # click.echo flushes stdout after every page
+    return self.rows
+
+  def write_page(self, records):
+    click.echo("".join(json.dumps(record, default=str) + "\n" for record in records), nl=False)
+    self.rows += len(records)
+    return len(records)
+
+  def close(self, complete=True):
+    return None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close(complete=exc_type is None)
+
+def _open_sink(output, output_format, gzip, max_rows_per_file, prefix):
+  """Returns the sink for the output options."""
+  if output == "-":
+    if output_format != "ndjson":
+      raise click.UsageError("Only ndjson can be written to stdout.")
+    return _StdoutSink()
+  prefix = prefix or f"part-{time.strftime('%Y%m%dT%H%M%S')}"
+  options = {"prefix": prefix, "max_rows_per_file": max_rows_per_file}
+  if output_format == "parquet":
+    # Parquet compresses internally, --gzip selects its gzip codec
+    return ParquetSink(output, compression="gzip" if gzip else "snappy", **options)
+  return SINKS[output_format](output, compression="gzip" if gzip else None, **options)
+
+def _write_pages(pages, sink, progress, to_records=None, checkpoint=None):
+  """Writes every page to a sink, reporting progress, and returns the manifest.
+
+  `checkpoint` is called with a page's continueFrom token once every row of the
+  page is in a closed file (at file rotation or when the sink closes), so a
+  crash never skips rows that were still buffered.
+  """
+  # (rows written up to the page, continueFrom token) of pages not yet saved
+  pending = []
+
+  def save():
+    token = None
+    while pending and pending[0][0] <= sink.closed_rows:
+      token = pending.pop(0)[1]
+    if token is not None:
+      checkpoint(token)
+
+  try:
+    with sink:
+      for page in pages:
+        records = to_records(page) if to_records else page["data"]
+        sink.write_page(records)
+        if page.get("continueFrom"):
+          sink.metadata["continueFrom"] = page["continueFrom"]
+          if checkpoint:
+            pending.append((sink.rows, page["continueFrom"]))
+            save()
+        progress.page(len(records))
+  finally:
+    if checkpoint:
+      save()
+  progress.summary(sink.manifest)
+  return sink.manifest
+
+def output_options(command):
+  """Adds the options shared by the commands writing records."""
+  options = [
+    click.option("-o", "--output", required=True, help="Directory the files are written to, or - for NDJSON on stdout."),
+    click.option("-f", "--format", "output_format", type=click.Choice(sorted(SINKS)), default="ndjson", show_default=True),
+    click.option("--gzip", is_flag=True, help="Gzip the files (Parquet files use the gzip codec instead)."),
+    click.option("--max-rows-per-file", type=int, default=100000, show_default=True, help="Rows per file before starting a new one."),
+    click.option("--prefix", help="Filename prefix (defaults to part-<timestamp>, so runs never overwrite each other)."),
+  ]
+  for option in reversed(options):
+    command = option(command)
+  return command
+
+@click.group()
+@click.version_option(__version__)
+@click.option("--config", "config_file", type=click.Path(exists=True, dir_okay=False),
+              help="JSON credential file (defaults to the SERVICETITAN_* environment variables or .env).")
+@click.option("--tenant", "tenant_id", help="Tenant ID, overriding the configuration.")
+@click.option("--rate-limit", type=float, help="Requests per second for the tenant.")
+@click.option("--api-root", help="API root URL, overriding the environment's (e.g., for a proxy).")
+@click.option("--auth-root", help="Authentication root URL, overriding the environment's.")
+@click.option("-q", "--quiet", is_flag=True, help="Only print the final summary.")
+@click.option("-v", "--verbose", count=True, help="Log requests (-v) or debug information (-vv).")
+@click.pass_context
+def main(ctx, config_file, tenant_id, rate_limit, api_root, auth_root, quiet, verbose):
+  """Bulk extraction from the ServiceTitan API.
+
+  Records are streamed to rotating NDJSON, CSV or Parquet files with a
+  manifest, and a throughput summary is printed when the command finishes.
+  """
+  level = logging.DEBUG if verbose > 1 else logging.INFO if verbose else logging.WARNING
+  logging.basicConfig(level=level, format="%(levelname)s %(name)s: %(message)s")
+  ctx.obj = {
+    "config_file": config_file, "tenant_id": tenant_id, "rate_limit": rate_limit,
+    "api_root": api_root, "auth_root": auth_root, "progress": _Progress(quiet),
+  }
+
+def _connection(ctx):
+  """Creates the connection from the global options, reporting requests to the progress."""
+  options = ctx.obj
+  config = servicepytan_connect(config_file=options["config_file"])
+  for key, option in (("SERVICETITAN_TENANT_ID", "tenant_id"), ("api_root", "api_root"), ("auth_root", "auth_root")):
+    if options[option]:
+      config[key] = options[option]
+  return Connection(config, rate_limit=options["rate_limit"], metrics=Metrics([options["progress"]]))
+
+@main.command()
+@click.argument("folder")
+@click.argument("endpoint")
+@output_options
+@click.option("--from", "export_from", default="", help="Continuation token or date to start from.")
+@click.option("--include-recent-changes", is_flag=True, help="Include recent changes.")
+@click.option("--checkpoint", type=click.Path(dir_okay=False),
+              help="JSON checkpoint file. The export resumes from its saved token, saved as each output file is closed.")
+@click.pass_context
+def export(ctx, folder, endpoint, output, output_format, gzip, max_rows_per_file, prefix, export_from,
+           include_recent_changes, checkpoint):
+  """Export every record of an export endpoint (e.g., jpm jobs).
+
+  With --checkpoint, rerunning the command resumes after the last page written to
+  a closed file, or fetches only the changes since a finished export.
+  """
+  with _connection(ctx) as conn:
+    if checkpoint:
+      sync = ExportSync(folder, endpoint, conn, store=FileCheckpointStore(checkpoint),
+                        include_recent_changes=include_recent_changes)
+      if export_from:
+        sync.store.set(sync.key, export_from)
+      export_from = sync.store.get(sync.key) or ""
+      save = functools.partial(sync.store.set, sync.key)
+    else:
+      save = None
+    pages = Endpoint(folder, "export", conn).iter_export(endpoint, export_from, include_recent_changes, pages=True)
+    _write_pages(pages, _open_sink(output, output_format, gzip, max_rows_per_file, prefix), ctx.obj["progress"],
+                 checkpoint=save)
+
+@main.command("get-all")
+@click.argument("folder")
+@click.argument("endpoint")
+@output_options
+@click.option("--query", "query", multiple=True, metavar="NAME=VALUE", help="Query parameter (repeatable).")
+@click.option("--page-size", type=int, default=5000, show_default=True, help="Records per page.")
+@click.option("-w", "--max-workers", type=int, default=4, show_default=True, help="Pages fetched concurrently.")
+@click.pass_context
+def get_all(ctx, folder, endpoint, output, output_format, gzip, max_rows_per_file, prefix, query, page_size, max_workers):
+  """Fetch every page of a list endpoint (e.g., jpm jobs --query jobStatus=Completed).
+
+  Pages after the first are fetched concurrently. Use `export` for pulls that
+  need to resume.
+  """
+  query = dict(_parse_pairs(query, "--query"), pageSize=page_size)
+  with _connection(ctx) as conn:
+    pages = Endpoint(folder, endpoint, conn).iter_all(query, max_workers=max_workers, pages=True)
+    _write_pages(pages, _open_sink(output, output_format, gzip, max_rows_per_file, prefix), ctx.obj["progress"])
+
+@main.command("report")
+@click.argument("category")
+@click.argument("report_id")
+@output_options
+@click.option("-p", "--param", "params", multiple=True, metavar="NAME=VALUE", help="Report parameter (repeatable).")
+@click.option("--page-size", type=int, default=5000, show_default=True, help="Rows per page.")
+@click.option("-w", "--max-workers", type=int, default=1, show_default=True,
+              help="Pages fetched concurrently (within the report's rate limit).")
+@click.option("--timeout-min", type=float, default=60, show_default=True, help="Deadline for the whole pull in minutes.")
+@click.pass_context
+def report_data(ctx, category, report_id, output, output_format, gzip, max_rows_per_file, prefix, params, page_size,
+           max_workers, timeout_min):
+  """Fetch every row of a report, written as field name to value records."""
+  with _connection(ctx) as conn:
+    report = Report(category, report_id, conn=conn)
+    for name, value in _parse_pairs(params, "--param").items():
+      report.add_params(name, value)
+
+    def to_records(page):
+      names = [field["name"] for field in page["fields"]]
+      return [dict(zip(names, row)) for row in page["data"]]
+
+    pages = report.iter_data(page_size=page_size, timeout_min=timeout_min, max_workers=max_workers)
+    _write_pages(pages, _open_sink(output, output_format, gzip, max_rows_per_file, prefix), ctx.obj["progress"], to_records)
+
+@main.command()
+@click.argument("folder")
+@click.argument("endpoint")
+@click.argument("ids", nargs=-1)
+@click.option("--ids-file", type=click.File("r"), help="File with one id per line.")
+@click.option("-d", "--directory", default=".", show_default=True, help="Directory the files are saved in.")
+@click.option("--modifier", default="", help="Sub-resource path of the files.")
+@click.option("-w", "--max-workers", type=int, default=4, show_default=True, help="Files downloaded concurrently.")
+@click.option("--bytes-per-second", type=int, help="Limit on the combined download rate.")
+@click.option("--overwrite", is_flag=True, help="Download files that already exist with the expected size.")
+@click.pass_context
+def download(ctx, folder, endpoint, ids, ids_file, directory, modifier, max_workers, bytes_per_second, overwrite):
+  """Download files (e.g., forms jobs/attachment 123 456) to a directory.
+
+  Interrupted downloads resume from their partial file, and files already
+  downloaded are skipped, so rerunning the command resumes the batch.
+  """
+  ids = list(ids) + ([line.strip() for line in ids_file if line.strip()] if ids_file else [])
+  if not ids:
+    raise click.UsageError("No ids given.")
+  progress = ctx.obj["progress"]
+  with _connection(ctx) as conn:
+    results = Endpoint(folder, endpoint, conn).download_many(
+      ids, directory, modifier=modifier, max_workers=max_workers, bytes_per_second=bytes_per_second,
+      skip_existing=not overwrite)
+  failed = {id: result["error"] for id, result in results.items() if result["error"]}
+  skipped = sum(1 for result in results.values() if result["skipped"])
+  for id, error in failed.items():
+    click.echo(f"{id}: {error}", err=True)
+  seconds = max(time.monotonic() - progress.started, 1e-9)
+  downloaded = sum(result["bytes"] for result in results.values() if not result["skipped"])
+  click.echo(
+    f"{len(results) - len(failed) - skipped} downloaded, {skipped} skipped, {len(failed)} failed to "
+    f"{os.path.abspath(directory)}: {downloaded / 2 ** 20:.1f} MB in {seconds:.1f}s "
+    f"({downloaded / 2 ** 20 / seconds:.1f} MB/s, {progress.requests} requests)",
+    err=True,
+  )
+  if failed:
+    ctx.exit(1)
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,281 @@
+"""Columnar storage for report results"""
+from array import array
+
+# Whole-number fields are stored as 64-bit integers, with a mask for missing values
+INTEGER_TYPES = {"Integer", "Long"}
+# Fractional fields are stored as 64-bit floats, missing values become NaN
+FLOAT_TYPES = {"Decimal", "Currency", "Percentage", "Double"}
+# "Number" fields (often ids) stay integers until a fractional value arrives
+NUMERIC_TYPES = INTEGER_TYPES | FLOAT_TYPES | {"Number"}
+NAN = float("nan")
+# Integers beyond this magnitude lose precision as 64-bit floats
+MAX_EXACT_FLOAT_INTEGER = 2 ** 53
+
+def _field_type(field):
+  """Returns the data type of a report field."""
+  return field.get("dataType") or field.get("type") or "String"
+
+def _to_number(value, typecode):
+  """Converts a report value for an 'q' (int) or 'd' (float) column, returning None when missing.
+
+  Raises:
+      ValueError: If the value is not a number, or is fractional for an integer column
+  """
+  if value is None or value == "":
+    return None
+  if isinstance(value, str):
+    value = value.strip()
+    try:
+      value = int(value)
+    except ValueError:
+      value = float(value)
+  if typecode == "d":
+    return float(value)
+  if isinstance(value, float):
+    if not value.is_integer():
+      raise ValueError(f"{value} is not a whole number")
+    value = int(value)
+  if not -2 ** 63 <= value < 2 ** 63:
+    raise ValueError(f"{value} does not fit in 64 bits")
+  return int(value)
+
+class ReportTable:
+  """Column-oriented report result built incrementally as pages arrive.
+
+  Report pages return each row as a positional list with the column names in
+  `fields`. A `ReportTable` stores one column per field instead, typed from the
+  field's `dataType`:
+
+  - Integer and Long fields go into `array('q')` buffers. Missing values are kept
+    as 0 in the buffer and flagged in a null mask (see `null_mask`).
+  - Decimal, Currency, Percentage and Double fields go into `array('d')` buffers,
+    with missing values as NaN.
+  - Number fields start as `array('q')` and switch to `array('d')` when a
+    fractional value arrives, so id columns keep their exact values.
+  - Every other field is a plain list.
+
+  Numeric strings such as "12" are converted. A numeric column that receives a
+  value it cannot hold (text, or an integer too large for the column) becomes a
+  plain list. Numeric columns can be handed to NumPy and pyarrow without copying.
+
+  Attributes:
+      fields: The report field definitions (name, label, dataType).
+      columns: Dictionary of column name to column values.
+
+  Examples:
+      >>> table = ReportTable(response["fields"])
+      >>> table.append_rows(response["data"])
+      >>> table["Total"]
+      >>> table.to_pandas()
+  """
+  def __init__(self, fields):
+    """Inits ReportTable with empty columns for each field."""
+    self.fields = list(fields)
+    self.columns = {}
+    self._nulls = {}
+    self._promotable = set()
+    for field in self.fields:
+      name, field_type = field["name"], _field_type(field)
+      if field_type in FLOAT_TYPES:
+        self.columns[name] = array("d")
+      elif field_type in INTEGER_TYPES or field_type == "Number":
+        self.columns[name] = array("q")
+        if field_type == "Number":
+          self._promotable.add(name)
+      else:
+        self.columns[name] = []
+    self._length = 0
+
+  @property
+  def column_names(self):
+    """List of column names, in field order."""
+    return [field["name"] for field in self.fields]
+
+  def append_rows(self, rows):
+    """Appends a page of positional rows to the columns.
+
+    Args:
+        rows: List of rows, each a list of values in field order
+
+    Raises:
+        BufferError: If a NumPy or pyarrow view from `to_numpy`/`to_arrow` (without
+            `copy`) is still alive; no column is changed
+    """
+    self._check_resizable()
+    for index, (name, column) in enumerate(list(self.columns.items())):
+      values = [row[index] for row in rows]
+      if isinstance(column, array):
+        self._extend_numeric(name, column, values)
+      else:
+        column.extend(values)
+    self._length += len(rows)
+
+  def _check_resizable(self):
+    """Raises BufferError before any column changes if an exported buffer is still alive."""
+    for column in self.columns.values():
+      if isinstance(column, array):
+        column.append(0)
+        column.pop()
+
+  def _extend_numeric(self, name, column, values):
+    start = len(column)
+    if None not in values:
+      try:
+        column.extend(values)
+      except (TypeError, OverflowError):
+        # Strings, floats in an integer column or out of range values: convert one by one
+        del column[start:]
+      else:
+        if name in self._nulls:
+          self._nulls[name].extend(bytes(len(values)))
+        return
+
+    try:
+      numbers = [_to_number(value, column.typecode) for value in values]
+    except (TypeError, ValueError, OverflowError):
+      if column.typecode == "q" and name in self._promotable and self._promote(name):
+        return self._extend_numeric(name, self.columns[name], values)
+      self._demote(name)
+      self.columns[name].extend(values)
+      return
+
+    if column.typecode == "d":
+      column.extend(NAN if number is None else number for number in numbers)
+      return
+    column.extend(0 if number is None else number for number in numbers)
+    nulls = self._nulls.get(name)
+    if nulls is None and None in numbers:
+      nulls = self._nulls[name] = bytearray(start)
+    if nulls is not None:
+      nulls.extend(number is None for number in numbers)
+
+  def _promote(self, name):
+    """Turns an integer Number column into a float column. Returns False if that would lose precision."""
+    values = self.column_values(name)
+    if any(value is not None and abs(value) > MAX_EXACT_FLOAT_INTEGER for value in values):
+      return False
+    self.columns[name] = array("d", (NAN if value is None else value for value in values))
+    self._nulls.pop(name, None)
+    self._promotable.discard(name)
+    return True
+
+  def _demote(self, name):
+    """Turns a numeric column into a plain list of values."""
+    self.columns[name] = self.column_values(name)
+    self._nulls.pop(name, None)
+    self._promotable.discard(name)
+
+  def null_mask(self, name):
+    """Returns the null mask of an integer column (1 marks a missing value), or None if it has no missing values."""
+    return self._nulls.get(name)
+
+  def column_values(self, name):
+    """Returns a column as a list, with None for missing values (including NaN in float columns)."""
+    column = self.columns[name]
+    if not isinstance(column, array):
+      return list(column)
+    if column.typecode == "d":
+      return [None if value != value else value for value in column]
+    nulls = self._nulls.get(name)
+    if nulls is None:
+      return column.tolist()
+    return [None if null else value for value, null in zip(column, nulls)]
+
+  def __len__(self):
+    return self._length
+
+  def __getitem__(self, name):
+    return self.columns[name]
+
+  def __contains__(self, name):
+    return name in self.columns
+
+  def iter_rows(self):
+    """Yields each row as a dictionary of column name to value, with None for missing values."""
+    names = self.column_names
+    for values in zip(*(self.column_values(name) for name in names)):
+      yield dict(zip(names, values))
+
+  def to_dicts(self):
+    """Returns every row as a dictionary of column name to value."""
+    return list(self.iter_rows())
+
+  def to_numpy(self, copy=False):
+    """Returns the columns as NumPy arrays.
+
+    Numeric columns are int64 or float64 arrays that share memory with the table
+    unless `copy` is set; integer columns with missing values are returned as
+    masked arrays. Other columns are object arrays. While a shared array is
+    alive, `append_rows` raises `BufferError`, so pass `copy=True` to keep
+    appending after exporting.
+
+    Args:
+        copy: Whether to copy numeric columns instead of sharing their memory
+
+    Returns:
+        dict: Dictionary of column name to `numpy.ndarray`
+
+    Raises:
+        ImportError: If NumPy is not installed
+    """
+    import numpy as np
+    arrays = {}
+    for name, column in self.columns.items():
+      if not isinstance(column, array):
+        arrays[name] = np.array(column, dtype=object)
+        continue
+      dtype = np.int64 if column.typecode == "q" else np.float64
+      values = np.frombuffer(column, dtype=dtype) if len(column) else np.empty(0, dtype=dtype)
+      if copy:
+        values = values.copy()
+      nulls = self._nulls.get(name)
+      if nulls is not None:
+        values = np.ma.MaskedArray(values, mask=np.frombuffer(bytes(nulls), dtype=np.bool_), shrink=False)
+      arrays[name] = values
+    return arrays
+
+  def to_arrow(self, copy=False):
+    """Returns the table as a `pyarrow.Table`.
+
+    Numeric columns are wrapped without copying unless `copy` is set (integer
+    columns with missing values are always copied to build their validity
+    bitmap); NaN values stay NaN. While a wrapped column is alive, `append_rows`
+    raises `BufferError`.
+
+    Args:
+        copy: Whether to copy numeric columns instead of sharing their memory
+
+    Raises:
+        ImportError: If pyarrow is not installed
+    """
+    import pyarrow as pa
+    arrays = []
+    for name, column in self.columns.items():
+      if not isinstance(column, array):
+        arrays.append(pa.array(column))
+        continue
+      arrow_type = pa.int64() if column.typecode == "q" else pa.float64()
+      if name in self._nulls:
+        arrays.append(pa.array(self.column_values(name), type=arrow_type))
+        continue
+      buffer = pa.py_buffer(column.tobytes() if copy else column)
+      arrays.append(pa.Array.from_buffers(arrow_type, len(column), [None, buffer]))
+    return pa.Table.from_arrays(arrays, names=self.column_names)
+
+  def to_pandas(self):
+    """Returns the table as a `pandas.DataFrame`.
+
+    Columns are copied, so the table can still be appended to. Integer columns
+    with missing values use pandas' nullable Int64 type.
+
+    Raises:
+        ImportError: If pandas is not installed
+    """
+    import numpy as np
+    import pandas as pd
+    data = {}
+    for name, values in self.to_numpy(copy=True).items():
+      if isinstance(values, np.ma.MaskedArray):
+        values = pd.arrays.IntegerArray(values.data, np.ma.getmaskarray(values))
+      data[name] = values
+    return pd.DataFrame(data, columns=self.column_names)
@@ -0,0 +1,172 @@
+"""Connection Module: Pooled HTTP sessions shared by every request to the API"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from servicepytan.auth import servicepytan_connect
+
+DEFAULT_POOL_SIZE = 10
+
+def create_session(pool_size=DEFAULT_POOL_SIZE, pool_block=False):
+  """Creates a `requests.Session` with a connection pool sized for concurrent use.
+
+  The session keeps connections to the API alive between requests so that the
+  TCP and TLS handshakes are only paid once per pooled connection, and asks the
+  server for gzip compressed responses.
+
+  Args:
+      pool_size: Maximum number of connections kept open per host
+      pool_block: Whether to block when all pooled connections are in use instead
+          of opening a throwaway connection
+
+  Returns:
+      requests.Session: The configured session
+
+  Examples:
+      >>> session = create_session(pool_size=20)
+  """
+  session = requests.Session()
+  adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=pool_block)
+  session.mount("https://", adapter)
+  session.mount("http://", adapter)
+  session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+  return session
+
+class Connection(dict):
+  """Connection to the ServiceTitan API that owns a pooled HTTP session.
+
+  A `Connection` is the credential configuration returned by `servicepytan_connect`
+  with a `requests.Session` attached, so it can be passed anywhere a `conn` dictionary
+  is accepted (`Endpoint`, `Report`, `DataService` and the module functions in
+  `reports`). Every request made with the same connection reuses its pooled,
+  keep-alive connections.
+
+  Attributes:
+      pool_size: Maximum number of connections kept open per host.
+      pool_block: Whether to block when all pooled connections are in use.
+      rate_limit: Requests per second allowed for the tenant (see `ratelimit.get_rate_limiter`).
+      retry_policy: `RetryPolicy` applied to this connection's requests.
+      cache: Optional `ResponseCache` for GET requests to reference data endpoints.
+      decoder: Optional `JSONDecoder` used for response bodies.
+      metrics: Optional `Metrics` receiving this connection's request and pull events
+          instead of the default dispatcher.
+      shared_rate_limiter: Optional `TokenBucket` shared with other connections, applied
+          on top of the tenant's own limiter (e.g., one limit for an app across tenants).
+      session: The `requests.Session` used for every request on this connection.
+  """
+  def __init__(self, config=None, pool_size=DEFAULT_POOL_SIZE, pool_block=False,
+               rate_limit=None, retry_policy=None, cache=None, shared_rate_limiter=None, decoder=None,
+               metrics=None, **kwargs):
+    """Inits Connection from an existing configuration or the arguments of `servicepytan_connect`.
+
+    Args:
+        config: Optional dictionary returned by `servicepytan_connect`
+        pool_size: Maximum number of connections kept open per host
+        pool_block: Whether to block when all pooled connections are in use
+        rate_limit: Optional requests per second for the tenant (defaults to `DEFAULT_REQUESTS_PER_SECOND`)
+        retry_policy: Optional `RetryPolicy` (defaults to `DEFAULT_RETRY_POLICY`)
+        cache: Optional `ResponseCache`, or True for one with the default TTLs (disabled by default)
+        shared_rate_limiter: Optional `TokenBucket` every request also waits on
+        decoder: Optional `JSONDecoder`, e.g. `JSONDecoder("auto")` for orjson or msgspec (defaults to the standard library `json`)
+        metrics: Optional `Metrics` (defaults to the dispatcher managed with `metrics.add_hook`)
+        **kwargs: Passed to `servicepytan_connect` when no config is provided
+
+    Examples:
+        >>> conn = Connection(config_file="servicepytan_config.json", pool_size=20)
+        >>> conn = Connection(servicepytan_connect(config_file="servicepytan_config.json"))
+        >>> conn = Connection(config_file="servicepytan_config.json", cache=True)
+    """
+    if config is None:
+      config = servicepytan_connect(**kwargs)
+    super().__init__(config)
+    self.pool_size = pool_size
+    self.pool_block = pool_block
+    self.rate_limit = rate_limit
+    self.retry_policy = retry_policy
+    if cache is True:
+      from servicepytan.cache import ResponseCache
+      cache = ResponseCache()
+    self.cache = cache or None
+    self.shared_rate_limiter = shared_rate_limiter
+    self.decoder = decoder
+    self.metrics = metrics
+    self._session = None
+    self._owns_session = True
+    self._session_lock = threading.Lock()
+
+  @property
+  def session(self):
+    """The pooled `requests.Session`, created on first use."""
+    if self._session is None:
+      with self._session_lock:
+        if self._session is None:
+          self._session = create_session(self.pool_size, self.pool_block)
+    return self._session
+
+  def for_tenant(self, tenant_id):
+    """Returns a connection to another tenant of the same app.
+
+    The new connection shares this connection's pooled session, cache, decoder,
+    metrics, retry policy and shared rate limiter. Requests to the new tenant use that tenant's
+    own rate limiter.
+
+    Args:
+        tenant_id: The ServiceTitan tenant ID
+
+    Returns:
+        Connection: A connection whose SERVICETITAN_TENANT_ID is `tenant_id`
+
+    Examples:
+        >>> conn = Connection(config_file="servicepytan_config.json")
+        >>> other = conn.for_tenant("1234567890")
+    """
+    clone = Connection(dict(self, SERVICETITAN_TENANT_ID=str(tenant_id)), pool_size=self.pool_size,
+                       pool_block=self.pool_block, rate_limit=self.rate_limit, retry_policy=self.retry_policy,
+                       cache=self.cache, shared_rate_limiter=self.shared_rate_limiter, decoder=self.decoder,
+                       metrics=self.metrics)
+    clone._session = self.session
+    clone._owns_session = False
+    return clone
+
+  def close(self):
+    """Closes the session and every pooled connection.
+
+    Connections created with `for_tenant` only release their reference to the
+    shared session.
+    """
+    if self._session is not None:
+      if self._owns_session:
+        self._session.close()
+      self._session = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+def get_session(conn=None):
+  """Returns the HTTP session to use for a connection.
+
+  `Connection` objects use their own session. Plain configuration dictionaries share
+  a module level pooled session so they still benefit from keep-alive.
+
+  Args:
+      conn: Dictionary or `Connection` containing the credential configuration
+
+  Returns:
+      requests.Session: Session to send the request with
+  """
+  global _default_session
+  session = getattr(conn, "session", None)
+  if session is not None:
+    return session
+  if _default_session is None:
+    with _default_session_lock:
+      if _default_session is None:
+        _default_session = create_session()
+  return _default_session
@@ -2,6 +2,27 @@
 from servicepytan.requests import Endpoint
 from servicepytan._dates import _convert_date_to_api_format
 from servicepytan.utils import get_timezone_by_file
+from servicepytan._concurrency import _map_concurrently
+from servicepytan.sharding import DateRangeSharder
+from servicepytan.models import get_model
+
+def _merge_unique(results, key="id"):
+  """Merges lists of records, keeping the first record seen for each key.
+
+  Records without the key are always kept.
+  """
+  seen = set()
+  data = []
+  for records in results:
+    for record in records:
+      record_key = record.get(key)
+      if record_key is not None:
+        if record_key in seen:
+          continue
+        seen.add(record_key)
+      data.append(record)
+  return data
+
 class DataService:
   """Primary class for executing data methods.
 
@@ -10,18 +31,59 @@ class DataService:
   based on retrieving data between a date range.
 
   Attributes:
-      conn: a dictionary containing the credential config.
+      conn: a dictionary or `Connection` containing the credential config. Every
+          endpoint queried by the service shares its pooled session.
+      max_workers: Maximum number of queries run concurrently by methods that
+          combine several queries (e.g. one per status).
+      models: Whether jobs, appointments, estimates and purchase orders are returned
+          as compact `models.Record` instances instead of dictionaries.
   """
-  def __init__(self, conn=None):
+  def __init__(self, conn=None, max_workers=4, models=False):
     """Inits DataService with configuration file and authentication settings."""
     self.conn = conn
     self.timezone = get_timezone_by_file(conn)
+    self.max_workers = max_workers
+    self.models = models
+
+  def _endpoint(self, folder, endpoint):
+    """Returns an `Endpoint` on the service's connection, using the endpoint's model when `models` is set."""
+    model = get_model(folder, endpoint) if self.models else None
+    return Endpoint(folder, endpoint, conn=self.conn, model=model)
+
+  def get_all_for_each(self, folder, endpoint, option_sets, key="id"):
+    """Run one `get_all` query per option set concurrently and merge the results.
+
+    The queries run on a bounded thread pool of `max_workers`. Records returned by
+    more than one query are only kept once, identified by `key`.
+
+    Args:
+        folder: The API endpoint category/folder (e.g., "jpm")
+        endpoint: The endpoint within the folder (e.g., "jobs")
+        option_sets: List of query option dictionaries, one per query
+        key: Record field used to drop duplicates
+
+    Returns:
+        list: Combined list of unique records, in the order of `option_sets`
+
+    Raises:
+        requests.HTTPError: If any API request fails
+
+    Examples:
+        >>> data_service = DataService(conn, max_workers=4)
+        >>> jobs = data_service.get_all_for_each("jpm", "jobs", [
+        ...     {"jobStatus": "Completed"}, {"jobStatus": "InProgress"}
+        ... ])
+    """
+    api_endpoint = self._endpoint(folder, endpoint)
+    results = _map_concurrently(api_endpoint.get_all, option_sets, self.max_workers)
+    return _merge_unique(results, key)
 
   def get_jobs_completed_between(self, start_date, end_date, job_status=["Completed","Scheduled","InProgress","Dispatched"]):
     """Retrieve all jobs completed between the start and end date.
     
     Fetches jobs that were completed within the specified date range.
-    Can filter by multiple job statuses simultaneously.
+    Can filter by multiple job statuses simultaneously; the statuses are
+    queried concurrently and jobs returned for more than one are kept once.
     
     Args:
         start_date: Start date for the query (string or datetime object)
@@ -38,18 +100,25 @@ class DataService:
         ...     "2024-01-01", "2024-01-31", job_status=["Completed"]
         ... )
     """
-    data = []
+    option_sets = []
     for status in job_status:
       options = {
         "jobStatus": status,
         "completedOnOrAfter": _convert_date_to_api_format(start_date, self.timezone),
         "completedBefore": _convert_date_to_api_format(end_date, self.timezone)
       }
-      data.extend(Endpoint("jpm", "jobs").get_all(options))
+      option_sets.append(options)
     
-    return data
+    return self.get_all_for_each("jpm", "jobs", option_sets)
 
-  def get_jobs_created_between(self, start_date, end_date):
+  def _sharded(self, folder, endpoint, start_key, end_key, shard):
+    """Builds a `DateRangeSharder` for the service's connection and timezone."""
+    return DateRangeSharder(
+      self._endpoint(folder, endpoint), start_key, end_key,
+      timezone=self.timezone, shard=shard, max_workers=self.max_workers
+    )
+
+  def get_jobs_created_between(self, start_date, end_date, shard=None):
     """Retrieve all jobs created between the start and end date.
     
     Fetches jobs that were originally created within the specified date range,
@@ -58,6 +127,8 @@ class DataService:
     Args:
         start_date: Start date for the query (string or datetime object)
         end_date: End date for the query (string or datetime object)
+        shard: Optional shard size ("day", "week", "adaptive", see `DateRangeSharder`)
+            to fetch large ranges as concurrent sub-windows
         
     Returns:
         list: List of all jobs created in the date range
@@ -65,18 +136,22 @@ class DataService:
     Examples:
         >>> data_service = DataService(conn)
         >>> new_jobs = data_service.get_jobs_created_between("2024-01-01", "2024-01-31")
+        >>> year_of_jobs = data_service.get_jobs_created_between("2024-01-01", "2025-01-01", shard="week")
     """
+    if shard:
+      return self._sharded("jpm", "jobs", "createdOnOrAfter", "createdBefore", shard).get_all(start_date, end_date)
     options = {
       "createdOnOrAfter": _convert_date_to_api_format(start_date, self.timezone),
       "createdBefore": _convert_date_to_api_format(end_date, self.timezone)
     }
-    return Endpoint("jpm", "jobs").get_all(options)
+    return self._endpoint("jpm", "jobs").get_all(options)
 
   def get_appointments_between(self, start_date, end_date, appointment_status=["Scheduled", "Dispatched", "Working","Done"]):
     """Retrieve all appointments that start between the start and end date.
     
     Fetches appointments scheduled to start within the specified date range.
-    Can filter by multiple appointment statuses simultaneously.
+    Can filter by multiple appointment statuses simultaneously; the statuses are
+    queried concurrently and appointments returned for more than one are kept once.
     
     Args:
         start_date: Start date for the query (string or datetime object)
@@ -93,16 +168,16 @@ class DataService:
         ...     "2024-01-01", "2024-01-31", appointment_status=["Scheduled"]
         ... )
     """
-    data = []
+    option_sets = []
     for status in appointment_status:
       options = {
         "status": status,
         "startsOnOrAfter":_convert_date_to_api_format(start_date, self.timezone),
         "startsBefore":_convert_date_to_api_format(end_date, self.timezone)
       }
-      data.extend(Endpoint("jpm", "appointments").get_all(options))
+      option_sets.append(options)
     
-    return data
+    return self.get_all_for_each("jpm", "appointments", option_sets)
 
   def get_sold_estimates_between(self, start_date, end_date):
     """Retrieve all sold estimates that were sold between the start and end date.
@@ -126,7 +201,7 @@ class DataService:
         "soldAfter":_convert_date_to_api_format(start_date, self.timezone),
         "soldBefore":_convert_date_to_api_format(end_date, self.timezone)
       }
-    return Endpoint("sales", "estimates").get_all(options)
+    return self._endpoint("sales", "estimates").get_all(options)
 
   def get_total_sales_between(self, start_date, end_date):
     """Retrieves total sales dollar amount between start and end date.
@@ -148,6 +223,8 @@ class DataService:
         >>> print(f"Total sales: ${total_sales:,.2f}")
     """
     data = self.get_sold_estimates_between(start_date, end_date)
+    if self.models:
+      return sum(estimate.items_total for estimate in data)
     sales = 0
     for row in data:
       for sku in row["items"]:
@@ -176,9 +253,9 @@ class DataService:
         "createdOnOrAfter":_convert_date_to_api_format(start_date, self.timezone),
         "createdBefore":_convert_date_to_api_format(end_date, self.timezone)
       }
-    return Endpoint("inventory", "purchase-orders").get_all(options)
+    return self._endpoint("inventory", "purchase-orders").get_all(options)
 
-  def get_jobs_modified_between(self, start_date, end_date):
+  def get_jobs_modified_between(self, start_date, end_date, shard=None):
     """Retrieve all jobs modified between the start and end date.
     
     Fetches jobs that were updated or modified within the specified date range,
@@ -187,6 +264,8 @@ class DataService:
     Args:
         start_date: Start date for the query (string or datetime object)
         end_date: End date for the query (string or datetime object)
+        shard: Optional shard size ("day", "week", "adaptive", see `DateRangeSharder`)
+            to fetch large ranges as concurrent sub-windows
         
     Returns:
         list: List of all jobs modified in the date range
@@ -194,12 +273,15 @@ class DataService:
     Examples:
         >>> data_service = DataService(conn)
         >>> modified_jobs = data_service.get_jobs_modified_between("2024-01-01", "2024-01-31")
+        >>> year_of_changes = data_service.get_jobs_modified_between("2024-01-01", "2025-01-01", shard="adaptive")
     """
+    if shard:
+      return self._sharded("jpm", "jobs", "modifiedOnOrAfter", "modifiedBefore", shard).get_all(start_date, end_date)
     options = {
       "modifiedOnOrAfter":_convert_date_to_api_format(start_date, self.timezone),
       "modifiedBefore":_convert_date_to_api_format(end_date, self.timezone)
     }
-    data = Endpoint("jpm", "jobs").get_all(options)
+    data = self._endpoint("jpm", "jobs").get_all(options)
     
     return data
 
@@ -223,7 +305,7 @@ class DataService:
     options = {
         "active": active
       }
-    return Endpoint("settings", "employees").get_all(options)
+    return self._endpoint("settings", "employees").get_all(options)
 
   def get_technicians(self, active="True"):
     """Retrieve technician list.
@@ -245,7 +327,7 @@ class DataService:
     options = {
         "active": active
       }
-    return Endpoint("settings", "technicians").get_all(options)
+    return self._endpoint("settings", "technicians").get_all(options)
 
   def get_tag_types(self, active="True"):
     """Retrieve tag types list.
@@ -266,7 +348,7 @@ class DataService:
     options = {
         "active": active
       }
-    return Endpoint("settings", "tag-types").get_all(options)
+    return self._endpoint("settings", "tag-types").get_all(options)
 
   def get_business_units(self, active="True"):
     """Retrieve business units list.
@@ -287,4 +369,4 @@ class DataService:
     options = {
         "active": active
       }
-    return Endpoint("settings", "business-units").get_all(options)
\ No newline at end of file
+    return self._endpoint("settings", "business-units").get_all(options)
\ No newline at end of file
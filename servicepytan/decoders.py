@@ -0,0 +1,158 @@
+"""Decoders Module: Pluggable JSON decoding for API responses"""
+import json
+from importlib import import_module
+from typing import Any
+
+from servicepytan.cache import _endpoint_template
+
+# Backends tried in order when the backend is "auto"
+FAST_BACKENDS = ("orjson", "msgspec")
+# Backend used unless another one is requested
+DEFAULT_BACKEND = "json"
+
+def _is_installed(module):
+  """Returns True if a module can be imported."""
+  try:
+    import_module(module)
+    return True
+  except ImportError:
+    return False
+
+def _resolve_backend(backend=DEFAULT_BACKEND):
+  """Returns the name of the JSON backend to use, checking that it is installed."""
+  if backend == "auto":
+    for candidate in FAST_BACKENDS:
+      if _is_installed(candidate):
+        return candidate
+    return "json"
+  if backend not in FAST_BACKENDS + ("json",):
+    raise ValueError(f"Unsupported JSON backend '{backend}'. Valid backends are: orjson, msgspec, json.")
+  if backend != "json":
+    import_module(backend)
+  return backend
+
+def _loads_function(backend):
+  """Returns a function decoding a JSON document (bytes or str) for a backend."""
+  if backend == "orjson":
+    return import_module("orjson").loads
+  if backend == "msgspec":
+    return import_module("msgspec").json.Decoder().decode
+  return json.loads
+
+class JSONDecoder:
+  """Decodes API response bodies, optionally with a faster JSON library.
+
+  The backend is the standard library `json` unless another one is requested:
+  "orjson", "msgspec", or "auto" for orjson, then msgspec, then `json`, whichever
+  is installed first. Installing a fast library never changes decoding on its
+  own; pass the decoder to `Connection(decoder=...)` to use it. Decoding can be
+  tuned per list or export endpoint, matched on its exact "folder/endpoint" path
+  (e.g., "jpm/jobs" or "accounting/export/invoices"):
+
+  - `fields` keeps only the listed fields of each record in the page's "data";
+    fields missing from a record are set to None. With the msgspec backend the
+    other fields are skipped while parsing instead of being decoded and dropped.
+  - `types` decodes each record of the page's "data" into a `msgspec.Struct`
+    type (requires msgspec). Only the struct's fields are decoded and values
+    are type-checked. Records are then struct objects read with attributes,
+    so they cannot be passed to helpers that expect dictionaries (such as the
+    de-duplication in `DateRangeSharder`).
+
+  Pages are still returned as dictionaries with "data" and every other key of
+  the response ("hasMore", "continueFrom", ...), so the pagination loops work
+  unchanged.
+
+  Attributes:
+      backend: Name of the JSON library used ("orjson", "msgspec" or "json").
+      fields: Dictionary of "folder/endpoint" to the record fields to keep.
+      types: Dictionary of "folder/endpoint" to the `msgspec.Struct` type of its records.
+
+  Examples:
+      >>> conn = Connection(config_file="servicepytan_config.json", decoder=JSONDecoder("auto"))
+      >>> decoder = JSONDecoder("msgspec", fields={"jpm/jobs": ["id", "jobStatus", "completedOn"]})
+      >>> conn = Connection(config_file="servicepytan_config.json", decoder=decoder)
+      >>>
+      >>> class Invoice(msgspec.Struct):
+      ...     id: int
+      ...     total: str
+      >>> conn = Connection(config_file="servicepytan_config.json", decoder=JSONDecoder(types={"accounting/invoices": Invoice}))
+  """
+  def __init__(self, backend=DEFAULT_BACKEND, fields=None, types=None):
+    """Inits JSONDecoder, checking that the requested libraries are installed."""
+    self.backend = _resolve_backend(backend)
+    self.fields = {endpoint.strip("/"): tuple(names) for endpoint, names in (fields or {}).items()}
+    self.types = {endpoint.strip("/"): record_type for endpoint, record_type in (types or {}).items()}
+    if self.types:
+      import_module("msgspec")
+    self._skip_fields = bool(self.fields) and self.backend == "msgspec"
+    self._loads = _loads_function(self.backend)
+    self._page_decoders = {}
+
+  def loads(self, body):
+    """Decodes a JSON document without any per-endpoint handling."""
+    return self._loads(body)
+
+  def _records_decoder(self, endpoint):
+    """Returns a msgspec decoder for the records of an endpoint with typed or trimmed records."""
+    decoder = self._page_decoders.get(endpoint)
+    if decoder is None:
+      msgspec = import_module("msgspec")
+      record_type = self.types.get(endpoint)
+      if record_type is None:
+        record_type = msgspec.defstruct("Record", [(name, Any, None) for name in self.fields[endpoint]])
+      decoder = self._page_decoders[endpoint] = msgspec.json.Decoder(list[record_type])
+    return decoder
+
+  def _decode_page(self, body, endpoint):
+    """Decodes a page with msgspec, typing or trimming its records and keeping every other key."""
+    msgspec = import_module("msgspec")
+    # Values are kept raw at first, so only "data" goes through the record decoder
+    raw = msgspec.json.decode(body, type=dict[str, msgspec.Raw])
+    response = {key: msgspec.json.decode(value) for key, value in raw.items() if key != "data"}
+    records = self._records_decoder(endpoint).decode(raw["data"]) if "data" in raw else []
+    if endpoint not in self.types:
+      records = [msgspec.structs.asdict(record) for record in records]
+    response["data"] = records
+    return response
+
+  def decode(self, body, url=""):
+    """Decodes a response body, applying the `fields` and `types` of the URL's endpoint.
+
+    Args:
+        body: The response body (bytes or str)
+        url: The request URL, used to match the endpoint
+
+    Returns:
+        The decoded JSON document
+    """
+    endpoint = _endpoint_template(url) if url and (self.fields or self.types) else None
+    if endpoint in self.types or (endpoint in self.fields and self._skip_fields):
+      return self._decode_page(body, endpoint)
+
+    response = self._loads(body)
+    names = self.fields.get(endpoint)
+    if names and isinstance(response, dict) and isinstance(response.get("data"), list):
+      response["data"] = [{name: record.get(name) for name in names} for record in response["data"]]
+    return response
+
+_default_decoder = None
+
+def get_decoder(conn=None):
+  """Returns the JSON decoder for a connection.
+
+  `Connection` objects created with a `decoder` use it. Everything else shares a
+  default `JSONDecoder` using the standard library `json`.
+
+  Args:
+      conn: Dictionary or `Connection` containing the credential configuration
+
+  Returns:
+      JSONDecoder: The decoder to use
+  """
+  global _default_decoder
+  decoder = getattr(conn, "decoder", None)
+  if decoder is not None:
+    return decoder
+  if _default_decoder is None:
+    _default_decoder = JSONDecoder()
+  return _default_decoder
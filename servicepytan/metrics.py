@@ -0,0 +1,375 @@
+"""Metrics Module: Request and pull instrumentation with pluggable sinks"""
+import math
+import os
+import re
+import socket
+import threading
+import time
+from collections import deque
+
+from servicepytan.cache import _endpoint_template
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the request latency histogram buckets
+DEFAULT_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_RECORD_ID = re.compile(r"/\d+(?=/|$)")
+
+def metric_endpoint(url):
+  """Returns the endpoint of a URL for metrics, with record IDs replaced by "{id}".
+
+  Examples:
+      >>> metric_endpoint("https://api.servicetitan.io/jpm/v2/tenant/123/jobs/456/notes")
+      >>> # Returns: "jpm/jobs/{id}/notes"
+  """
+  return _RECORD_ID.sub("/{id}", _endpoint_template(url.split("?", 1)[0]))
+
+def request_event(method, url, conn=None, status=None, seconds=0.0, latency=None, size=None, retries=0,
+                  rate_limit_wait=0.0, cached=False, error=None):
+  """Builds a "request" event (see `Metrics`)."""
+  return {
+    "event": "request", "method": method, "endpoint": metric_endpoint(url), "url": url,
+    "tenant_id": (conn or {}).get("SERVICETITAN_TENANT_ID"), "status": status, "seconds": seconds,
+    "latency": latency, "bytes": size, "retries": retries, "rate_limit_wait": rate_limit_wait,
+    "cached": cached, "error": error,
+  }
+
+def _response_size(response, streamed=False):
+  """Returns the body size of a response, without reading a streamed body."""
+  length = response.headers.get("Content-Length")
+  if length is not None and length.isdigit():
+    return int(length)
+  return None if streamed else len(response.content)
+
+class Metrics:
+  """Dispatches instrumentation events to hooks.
+
+  A hook is any callable taking one event dictionary; the sinks in this module
+  (`InMemoryRecorder`, `PrometheusSink`, `StatsDSink`) are hooks. A failing hook
+  is logged and does not affect the request. When no hook is registered, events
+  are not built at all.
+
+  Two kinds of events are emitted:
+
+  - "request", once per `send_request` call (after its retries), with 'method',
+    'endpoint' (see `metric_endpoint`), 'url', 'tenant_id', 'status' (None when
+    the connection failed), 'seconds' (total, including retries and waits),
+    'latency' (of the last attempt), 'bytes', 'retries', 'rate_limit_wait'
+    (seconds spent waiting on rate limiters), 'cached' and 'error'.
+  - "pull", once per `iter_all`, `iter_export` or `Report.iter_data` stream when
+    it ends, with 'kind', 'endpoint', 'tenant_id', 'pages', 'records', 'seconds',
+    'completed' (False when it failed or was stopped early) and 'error'.
+
+  Attributes:
+      hooks: List of callables receiving every event.
+
+  Examples:
+      >>> recorder = InMemoryRecorder()
+      >>> conn = Connection(config_file="servicepytan_config.json", metrics=Metrics([recorder]))
+  """
+  def __init__(self, hooks=None):
+    """Inits Metrics with an optional list of hooks."""
+    self.hooks = list(hooks or [])
+
+  @property
+  def enabled(self):
+    return bool(self.hooks)
+
+  def add_hook(self, hook):
+    """Registers a hook and returns it (so it can be used as a decorator)."""
+    self.hooks.append(hook)
+    return hook
+
+  def remove_hook(self, hook):
+    """Unregisters a hook."""
+    self.hooks.remove(hook)
+
+  def emit(self, event):
+    """Sends an event to every hook."""
+    for hook in list(self.hooks):
+      try:
+        hook(event)
+      except Exception:
+        logger.exception(f"Metrics hook {hook!r} failed.")
+
+  def track_pull(self, kind, url, pages, conn=None):
+    """Wraps a stream of pages, emitting a "pull" event when it ends.
+
+    Args:
+        kind: The kind of pull ("iter_all", "iter_export" or "report")
+        url: A URL of the pull's endpoint
+        pages: Iterable of page responses with a 'data' list
+        conn: Dictionary or `Connection` of the pull
+
+    Yields:
+        dict: Each page, unchanged
+    """
+    if not self.enabled:
+      yield from pages
+      return
+    start = time.perf_counter()
+    page_count = records = 0
+    completed = False
+    error = None
+    try:
+      for page in pages:
+        page_count += 1
+        records += len(page.get("data") or [])
+        yield page
+      completed = True
+    except Exception as e:
+      error = f"{e.__class__.__name__}: {e}"
+      raise
+    finally:
+      self.emit({
+        "event": "pull", "kind": kind, "endpoint": metric_endpoint(url),
+        "tenant_id": (conn or {}).get("SERVICETITAN_TENANT_ID"), "pages": page_count, "records": records,
+        "seconds": time.perf_counter() - start, "completed": completed, "error": error,
+      })
+
+_default_metrics = Metrics()
+
+def get_metrics(conn=None):
+  """Returns the metrics dispatcher for a connection.
+
+  `Connection` objects created with `metrics` use it. Everything else shares the
+  default dispatcher, whose hooks are managed with `add_hook` and `remove_hook`.
+
+  Args:
+      conn: Dictionary or `Connection` containing the credential configuration
+
+  Returns:
+      Metrics: The dispatcher to emit events to
+  """
+  metrics = getattr(conn, "metrics", None)
+  return metrics if metrics is not None else _default_metrics
+
+def add_hook(hook):
+  """Registers a hook on the default dispatcher and returns it.
+
+  Examples:
+      >>> @add_hook
+      ... def log_slow_requests(event):
+      ...     if event["event"] == "request" and event["seconds"] > 5:
+      ...         print(event["endpoint"], event["seconds"])
+  """
+  return _default_metrics.add_hook(hook)
+
+def remove_hook(hook):
+  """Unregisters a hook from the default dispatcher."""
+  _default_metrics.remove_hook(hook)
+
+def _percentile(values, fraction):
+  if not values:
+    return None
+  ordered = sorted(values)
+  return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class InMemoryRecorder:
+  """Hook keeping the most recent events in memory.
+
+  Attributes:
+      events: The last `max_events` events, oldest first.
+  """
+  def __init__(self, max_events=10000):
+    """Inits InMemoryRecorder."""
+    self.events = deque(maxlen=max_events)
+    self._lock = threading.Lock()
+
+  def __call__(self, event):
+    with self._lock:
+      self.events.append(event)
+
+  def requests(self):
+    """Returns the recorded "request" events."""
+    with self._lock:
+      return [event for event in self.events if event["event"] == "request"]
+
+  def pulls(self):
+    """Returns the recorded "pull" events."""
+    with self._lock:
+      return [event for event in self.events if event["event"] == "pull"]
+
+  def summary(self):
+    """Summarizes the recorded requests by endpoint.
+
+    Returns:
+        dict: Dictionary of endpoint to 'requests', 'errors', 'retries', 'bytes',
+            'rate_limit_wait', 'latency_p50', 'latency_p95' and 'latency_max'
+    """
+    by_endpoint = {}
+    for event in self.requests():
+      by_endpoint.setdefault(event["endpoint"], []).append(event)
+    summary = {}
+    for endpoint, events in by_endpoint.items():
+      latencies = [event["latency"] for event in events if event["latency"] is not None]
+      summary[endpoint] = {
+        "requests": len(events),
+        "errors": sum(1 for event in events if event["error"] or (event["status"] or 0) >= 400),
+        "retries": sum(event["retries"] for event in events),
+        "bytes": sum(event["bytes"] or 0 for event in events),
+        "rate_limit_wait": sum(event["rate_limit_wait"] for event in events),
+        "latency_p50": _percentile(latencies, 0.5),
+        "latency_p95": _percentile(latencies, 0.95),
+        "latency_max": max(latencies, default=None),
+      }
+    return summary
+
+  def clear(self):
+    """Forgets every recorded event."""
+    with self._lock:
+      self.events.clear()
+
+def _labels(labels):
+  return ",".join('{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"')) for name, value in labels)
+
+def _sample_value(value):
+  """Formats a sample value without losing precision: integers as is, floats by `repr`."""
+  if isinstance(value, float):
+    if math.isnan(value):
+      return "NaN"
+    if math.isinf(value):
+      return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+  return str(value)
+
+class PrometheusSink:
+  """Hook aggregating events into metrics in the Prometheus text format.
+
+  Exposes `<namespace>_requests_total`, `_request_duration_seconds` (histogram),
+  `_response_bytes_total`, `_request_retries_total`, `_rate_limit_wait_seconds_total`,
+  `_pulls_total`, `_pull_pages_total`, `_pull_records_total` and
+  `_pull_duration_seconds_total`. `render` returns the exposition text and
+  `write` saves it for the node exporter's textfile collector.
+
+  Examples:
+      >>> prometheus = PrometheusSink()
+      >>> add_hook(prometheus)
+      >>> prometheus.write("/var/lib/node_exporter/servicepytan.prom")
+  """
+  def __init__(self, namespace="servicepytan", buckets=DEFAULT_LATENCY_BUCKETS):
+    """Inits PrometheusSink."""
+    self.namespace = namespace
+    self.buckets = tuple(sorted(buckets))
+    self._counters = {}
+    self._histograms = {}
+    self._lock = threading.Lock()
+
+  def _add(self, name, labels, value):
+    key = (name, labels)
+    self._counters[key] = self._counters.get(key, 0) + value
+
+  def __call__(self, event):
+    with self._lock:
+      if event["event"] == "request":
+        endpoint = (("endpoint", event["endpoint"]),)
+        self._add("requests_total", (("method", event["method"]),) + endpoint + (("status", event["status"] or "error"),), 1)
+        self._add("response_bytes_total", endpoint, event["bytes"] or 0)
+        self._add("request_retries_total", endpoint, event["retries"])
+        self._add("rate_limit_wait_seconds_total", endpoint, event["rate_limit_wait"])
+        if event["latency"] is not None:
+          labels = (("method", event["method"]),) + endpoint
+          histogram = self._histograms.setdefault(labels, [[0] * len(self.buckets), 0, 0.0])
+          for i, bound in enumerate(self.buckets):
+            if event["latency"] <= bound:
+              histogram[0][i] += 1
+          histogram[1] += 1
+          histogram[2] += event["latency"]
+      elif event["event"] == "pull":
+        labels = (("kind", event["kind"]), ("endpoint", event["endpoint"]))
+        self._add("pulls_total", labels + (("completed", str(event["completed"]).lower()),), 1)
+        self._add("pull_pages_total", labels, event["pages"])
+        self._add("pull_records_total", labels, event["records"])
+        self._add("pull_duration_seconds_total", labels, event["seconds"])
+
+  def render(self):
+    """Returns the metrics in the Prometheus text exposition format."""
+    lines = []
+    with self._lock:
+      names = sorted({name for name, _ in self._counters})
+      for name in names:
+        lines.append(f"# TYPE {self.namespace}_{name} counter")
+        for (metric, labels), value in sorted(self._counters.items(), key=lambda item: str(item[0])):
+          if metric == name:
+            lines.append(f"{self.namespace}_{name}{{{_labels(labels)}}} {_sample_value(value)}")
+      if self._histograms:
+        name = f"{self.namespace}_request_duration_seconds"
+        lines.append(f"# TYPE {name} histogram")
+        for labels, (counts, count, total) in sorted(self._histograms.items()):
+          for bound, bucket_count in zip(self.buckets, counts):
+            lines.append(f"{name}_bucket{{{_labels(labels + (('le', f'{bound:g}'),))}}} {bucket_count}")
+          lines.append(f"{name}_bucket{{{_labels(labels + (('le', '+Inf'),))}}} {count}")
+          lines.append(f"{name}_sum{{{_labels(labels)}}} {_sample_value(total)}")
+          lines.append(f"{name}_count{{{_labels(labels)}}} {count}")
+    return "\n".join(lines) + "\n"
+
+  def write(self, path):
+    """Atomically writes the metrics to a file.
+
+    Args:
+        path: Path of the .prom file
+    """
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w") as f:
+      f.write(self.render())
+    os.replace(temporary_path, path)
+
+def _statsd_name(value):
+  return re.sub(r"[^A-Za-z0-9_.-]", "_", str(value).replace("/", ".").replace("{id}", "id")).strip("._") or "unknown"
+
+class StatsDSink:
+  """Hook sending events as StatsD metrics over UDP.
+
+  Each event is sent as one datagram: for requests, a
+  `<prefix>.requests.<endpoint>.<status>` counter, `<prefix>.latency.<endpoint>`
+  and `<prefix>.rate_limit_wait.<endpoint>` timers (ms) and `<prefix>.bytes.<endpoint>`
+  and `<prefix>.retries.<endpoint>` counters; for pulls, `<prefix>.pulls.<kind>.<endpoint>`
+  with `.pages` and `.records` counters and a `.duration` timer. Slashes in the
+  endpoint become dots. Send errors are ignored, as UDP metrics are best effort.
+
+  Examples:
+      >>> add_hook(StatsDSink("statsd.internal", 8125, prefix="etl.servicepytan"))
+  """
+  def __init__(self, host="127.0.0.1", port=8125, prefix="servicepytan"):
+    """Inits StatsDSink."""
+    self.address = (host, port)
+    self.prefix = prefix
+    self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+  def lines(self, event):
+    """Returns the StatsD lines for an event."""
+    if event["event"] == "request":
+      endpoint = _statsd_name(event["endpoint"])
+      lines = [f"{self.prefix}.requests.{endpoint}.{event['status'] or 'error'}:1|c"]
+      if event["latency"] is not None:
+        lines.append(f"{self.prefix}.latency.{endpoint}:{event['latency'] * 1000:.3f}|ms")
+      if event["bytes"]:
+        lines.append(f"{self.prefix}.bytes.{endpoint}:{event['bytes']}|c")
+      if event["retries"]:
+        lines.append(f"{self.prefix}.retries.{endpoint}:{event['retries']}|c")
+      if event["rate_limit_wait"]:
+        lines.append(f"{self.prefix}.rate_limit_wait.{endpoint}:{event['rate_limit_wait'] * 1000:.3f}|ms")
+      return lines
+    if event["event"] == "pull":
+      name = f"{self.prefix}.pulls.{_statsd_name(event['kind'])}.{_statsd_name(event['endpoint'])}"
+      return [
+        f"{name}.pages:{event['pages']}|c",
+        f"{name}.records:{event['records']}|c",
+        f"{name}.duration:{event['seconds'] * 1000:.3f}|ms",
+      ]
+    return []
+
+  def __call__(self, event):
+    lines = self.lines(event)
+    if lines:
+      try:
+        self._socket.sendto("\n".join(lines).encode(), self.address)
+      except OSError as e:
+        logger.debug(f"Could not send StatsD metrics: {e}")
+
+  def close(self):
+    """Closes the UDP socket."""
+    self._socket.close()
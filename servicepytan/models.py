@@ -0,0 +1,252 @@
+"""Models Module: Compact record classes for core ServiceTitan entities"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (record class, field, value type) combinations already logged by `Record._load`
+_reported_drift = set()
+
+def _int(value):
+  """Converts an id or count to int, accepting numeric strings."""
+  return int(value)
+
+def _float(value):
+  """Converts an amount to float. Amounts are sometimes sent as strings (e.g., "123.45")."""
+  return float(value)
+
+def _str(value):
+  """Converts a text field to str, accepting numbers (e.g., a numeric jobNumber)."""
+  if isinstance(value, str):
+    return value
+  if isinstance(value, (int, float)) and not isinstance(value, bool):
+    return str(value)
+  raise TypeError(f"Expected a string, got {type(value).__name__}: {value!r}")
+
+def _bool(value):
+  """Converts a flag to bool, accepting "true"/"false" strings and 0/1."""
+  if isinstance(value, bool):
+    return value
+  if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+    return value.strip().lower() == "true"
+  if isinstance(value, int) and value in (0, 1):
+    return bool(value)
+  raise TypeError(f"Expected a boolean, got {type(value).__name__}: {value!r}")
+
+def _ids(value):
+  """Converts a list of ids to a tuple of ints."""
+  return tuple(int(item) for item in value)
+
+class _LazyCollection:
+  """Descriptor converting a nested list of dicts into records on first access.
+
+  The raw list is kept in the `_<name>` slot until the attribute is read, so
+  records whose nested collections are never used do not pay for converting them.
+  """
+  def __init__(self, name, model):
+    self.name = name
+    self.model = model
+    self.slot = f"_{name}"
+
+  def __get__(self, record, owner=None):
+    if record is None:
+      return self
+    value = getattr(record, self.slot)
+    if isinstance(value, list):
+      value = tuple(self.model.from_dict(item) for item in value)
+      setattr(record, self.slot, value)
+    return value
+
+class _RecordMeta(type):
+  """Builds `__slots__` and lazy collection descriptors from `FIELDS` and `NESTED`."""
+  def __new__(mcs, name, bases, namespace):
+    fields = namespace.get("FIELDS", {})
+    nested = namespace.get("NESTED", {})
+    namespace["__slots__"] = tuple(fields) + tuple(f"_{field}" for field in nested)
+    for field, model in nested.items():
+      namespace[field] = _LazyCollection(field, model)
+    return super().__new__(mcs, name, bases, namespace)
+
+class Record(metaclass=_RecordMeta):
+  """Base class for compact, slotted API records.
+
+  Subclasses declare `FIELDS`, a dictionary of field name to converter (None
+  keeps the value as is), and `NESTED`, a dictionary of field name to the
+  `Record` class of a nested list. Converters run when the record is built and
+  accept the usual drift in API types (numeric strings, numbers for text fields,
+  "true"/"false" flags). A value a converter cannot handle is kept as received
+  and logged once per field and type, so one unexpected value does not fail a
+  whole pull. Fields missing from the API response are None; fields not declared
+  are dropped.
+
+  Records are mutable and compare by value, so they are not hashable.
+
+  Records support attribute access (`job.jobStatus`) and, for code written
+  against dictionaries, `record["jobStatus"]` and `record.get("jobStatus")`.
+  """
+  FIELDS = {}
+  NESTED = {}
+
+  def __init__(self, **values):
+    """Inits the record from keyword arguments, converting each declared field."""
+    self._load(values)
+
+  def _load(self, data):
+    for field, convert in self.FIELDS.items():
+      value = data.get(field)
+      if value is not None and convert is not None:
+        try:
+          value = convert(value)
+        except (TypeError, ValueError) as e:
+          drift = (type(self), field, type(value))
+          if drift not in _reported_drift:
+            _reported_drift.add(drift)
+            logger.warning(f"{type(self).__name__}.{field}: keeping unexpected value as is ({e})")
+      setattr(self, field, value)
+    for field in self.NESTED:
+      setattr(self, f"_{field}", data.get(field) or [])
+
+  @classmethod
+  def from_dict(cls, data):
+    """Builds a record from an API dictionary."""
+    record = cls.__new__(cls)
+    record._load(data)
+    return record
+
+  @classmethod
+  def from_dicts(cls, records):
+    """Builds a list of records from a list of API dictionaries."""
+    return [cls.from_dict(data) for data in records]
+
+  def to_dict(self):
+    """Returns the record as a dictionary, including nested collections."""
+    data = {field: getattr(self, field) for field in self.FIELDS}
+    for field in self.NESTED:
+      data[field] = [item.to_dict() for item in getattr(self, field)]
+    return data
+
+  def get(self, key, default=None):
+    """Returns a field value, or `default` if the field is not declared or is None."""
+    if key not in self.FIELDS and key not in self.NESTED:
+      return default
+    value = getattr(self, key)
+    return default if value is None else value
+
+  def __getitem__(self, key):
+    if key not in self.FIELDS and key not in self.NESTED:
+      raise KeyError(key)
+    return getattr(self, key)
+
+  def __contains__(self, key):
+    return key in self.FIELDS or key in self.NESTED
+
+  def __eq__(self, other):
+    return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+  __hash__ = None
+
+  def __repr__(self):
+    return f"{self.__class__.__name__}(id={getattr(self, 'id', None)!r})"
+
+class Job(Record):
+  """A job from jpm/jobs."""
+  FIELDS = {
+    "id": _int, "jobNumber": _str, "projectId": _int, "customerId": _int, "locationId": _int,
+    "jobStatus": _str, "completedOn": _str, "businessUnitId": _int, "jobTypeId": _int,
+    "priority": _str, "campaignId": _int, "summary": _str, "appointmentCount": _int,
+    "firstAppointmentId": _int, "lastAppointmentId": _int, "recallForId": _int, "warrantyId": _int,
+    "noCharge": _bool, "notificationsEnabled": _bool, "createdOn": _str, "createdById": _int,
+    "modifiedOn": _str, "tagTypeIds": _ids, "customerPo": _str, "soldById": _int,
+    "externalData": None,
+  }
+
+class Appointment(Record):
+  """An appointment from jpm/appointments."""
+  FIELDS = {
+    "id": _int, "jobId": _int, "appointmentNumber": _str, "start": _str, "end": _str,
+    "arrivalWindowStart": _str, "arrivalWindowEnd": _str, "status": _str,
+    "specialInstructions": _str, "createdOn": _str, "modifiedOn": _str, "customerId": _int,
+    "unused": _bool, "active": _bool,
+  }
+
+class EstimateItem(Record):
+  """An item of an estimate."""
+  FIELDS = {
+    "id": _int, "sku": None, "skuAccount": _str, "description": _str, "membershipTypeId": _int,
+    "qty": _float, "unitRate": _float, "total": _float, "unitCost": _float, "totalCost": _float,
+    "itemGroupName": _str, "itemGroupRootId": _int, "createdOn": _str, "modifiedOn": _str,
+    "chargeable": _bool,
+  }
+
+class Estimate(Record):
+  """An estimate from sales/estimates. `items` are converted on first access."""
+  FIELDS = {
+    "id": _int, "jobId": _int, "projectId": _int, "locationId": _int, "customerId": _int,
+    "name": _str, "jobNumber": _str, "status": None, "reviewStatus": _str, "summary": _str,
+    "createdOn": _str, "modifiedOn": _str, "soldOn": _str, "soldBy": _int, "active": _bool,
+    "subtotal": _float, "tax": _float, "businessUnitId": _int, "businessUnitName": _str,
+    "isRecommended": _bool, "budgetCodeId": _int, "isChangeOrder": _bool,
+  }
+  NESTED = {"items": EstimateItem}
+
+  @property
+  def items_total(self):
+    """Sum of the `total` of every item."""
+    return sum(item.total or 0 for item in self.items)
+
+class InvoiceItem(Record):
+  """An item of an invoice."""
+  FIELDS = {
+    "id": _int, "description": _str, "quantity": _float, "cost": _float, "totalCost": _float,
+    "inventoryLocation": _str, "price": _float, "type": _str, "skuName": _str, "skuId": _int,
+    "total": _float, "inventory": _bool, "taxable": _bool, "generalLedgerAccount": None,
+    "costOfSaleAccount": None, "assetAccount": None, "membershipTypeId": _int, "itemGroup": None,
+    "displayName": _str, "soldHours": _float, "modifiedOn": _str, "serviceDate": _str,
+    "order": _int, "businessUnit": None,
+  }
+
+class Invoice(Record):
+  """An invoice from accounting/invoices. `items` are converted on first access."""
+  FIELDS = {
+    "id": _int, "syncStatus": _str, "summary": _str, "referenceNumber": _str, "invoiceDate": _str,
+    "dueDate": _str, "subTotal": _float, "salesTax": _float, "salesTaxCode": None, "total": _float,
+    "balance": _float, "invoiceType": None, "customer": None, "customerAddress": None,
+    "location": None, "locationAddress": None, "businessUnit": None, "termName": _str,
+    "createdBy": _str, "batch": None, "depositedOn": _str, "createdOn": _str, "modifiedOn": _str,
+    "adjustmentToId": _int, "job": None, "projectId": _int, "royalty": None,
+    "employeeInfo": None, "commissionEligibilityDate": _str, "customFields": None,
+  }
+  NESTED = {"items": InvoiceItem}
+
+class PurchaseOrderItem(Record):
+  """An item of a purchase order."""
+  FIELDS = {
+    "id": _int, "skuId": _int, "skuName": _str, "skuCode": _str, "skuType": _str,
+    "description": _str, "vendorPartNumber": _str, "quantity": _float, "quantityReceived": _float,
+    "cost": _float, "total": _float, "serialNumbers": None, "status": _str, "chargeable": _bool,
+    "createdOn": _str, "modifiedOn": _str,
+  }
+
+class PurchaseOrder(Record):
+  """A purchase order from inventory/purchase-orders. `items` are converted on first access."""
+  FIELDS = {
+    "id": _int, "number": _str, "invoiceId": _int, "jobId": _int, "projectId": _int,
+    "status": _str, "typeId": _int, "vendorId": _int, "technicianId": _int, "shipTo": None,
+    "businessUnitId": _int, "inventoryLocationId": _int, "batchId": _int,
+    "vendorDocumentNumber": _str, "date": _str, "requiredOn": _str, "sentOn": _str,
+    "receivedOn": _str, "createdOn": _str, "modifiedOn": _str, "total": _float, "tax": _float,
+    "shipping": _float, "summary": _str,
+  }
+  NESTED = {"items": PurchaseOrderItem}
+
+# Record class for each "folder/endpoint", used by `Endpoint(model=...)` and `DataService(models=True)`
+MODELS = {
+  "jpm/jobs": Job,
+  "jpm/appointments": Appointment,
+  "sales/estimates": Estimate,
+  "accounting/invoices": Invoice,
+  "inventory/purchase-orders": PurchaseOrder,
+}
+
+def get_model(folder, endpoint):
+  """Returns the record class for an endpoint or its export (e.g., "jpm", "export/jobs"), or None."""
+  return MODELS.get(f"{folder}/{endpoint}".replace("/export/", "/"))
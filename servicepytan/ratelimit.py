@@ -0,0 +1,245 @@
+"""Rate limiting and retry policies shared by every request to the API"""
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ServiceTitan allows 60 calls per second per app per tenant, pace a little below that
+DEFAULT_REQUESTS_PER_SECOND = 50
+
+class TokenBucket:
+  """Thread-safe token bucket that paces requests below a rate limit.
+
+  Tokens refill continuously at `rate` per second up to `capacity`. Callers reserve
+  a token before each request and sleep until it is available. When the server
+  still answers with 429, `throttle` pauses every caller and halves the rate, which
+  then recovers gradually with each successful request.
+
+  Attributes:
+      max_rate: The configured number of requests per second.
+      rate: The current, possibly reduced, number of requests per second.
+      capacity: Maximum number of requests that can be sent in a burst.
+  """
+  def __init__(self, rate=DEFAULT_REQUESTS_PER_SECOND, capacity=None, min_rate=1):
+    """Inits TokenBucket with a full bucket."""
+    self.max_rate = rate
+    self.rate = rate
+    self._min_rate = min_rate
+    self.min_rate = min(min_rate, rate)
+    self._fixed_capacity = capacity is not None
+    self.capacity = capacity if capacity is not None else max(rate, 1)
+    self._tokens = self.capacity
+    self._updated = time.monotonic()
+    self._paused_until = 0
+    self._lock = threading.Lock()
+
+  def reserve(self, tokens=1, max_wait=None):
+    """Reserves tokens and returns how many seconds the caller must wait before using them.
+
+    Args:
+        tokens: Number of tokens to reserve
+        max_wait: Optional longest acceptable wait. When the wait would be longer,
+            nothing is reserved and None is returned.
+
+    Returns:
+        float: Seconds to wait (0 when the tokens are available now), or None
+    """
+    with self._lock:
+      now = time.monotonic()
+      self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+      self._updated = now
+      wait = max(0, (tokens - self._tokens) / self.rate, self._paused_until - now)
+      if max_wait is not None and wait > max_wait:
+        return None
+      self._tokens -= tokens
+    return wait
+
+  def acquire(self, tokens=1):
+    """Blocks until the tokens are available.
+
+    Args:
+        tokens: Number of tokens to acquire
+
+    Returns:
+        float: Seconds spent waiting
+    """
+    wait = self.reserve(tokens)
+    if wait > 0:
+      time.sleep(wait)
+    return wait
+
+  def set_rate(self, rate):
+    """Changes the configured rate, keeping the tokens already available.
+
+    A rate currently reduced by `throttle` stays reduced (but never above the new
+    rate) and recovers toward the new `max_rate`.
+
+    Args:
+        rate: The new number of requests per second
+    """
+    with self._lock:
+      now = time.monotonic()
+      self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+      self._updated = now
+      throttled = self.rate < self.max_rate
+      self.max_rate = rate
+      self.rate = min(self.rate, rate) if throttled else rate
+      self.min_rate = min(self._min_rate, rate)
+      if not self._fixed_capacity:
+        self.capacity = max(rate, 1)
+        self._tokens = min(self._tokens, self.capacity)
+
+  def throttle(self, seconds):
+    """Pauses every caller for `seconds` and halves the rate after a 429 response.
+
+    Args:
+        seconds: How long the server asked clients to wait
+    """
+    with self._lock:
+      self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+      self.rate = max(self.min_rate, self.rate / 2)
+
+  def recover(self):
+    """Raises a reduced rate back toward `max_rate` after a successful request."""
+    if self.rate < self.max_rate:
+      with self._lock:
+        self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+class RetryPolicy:
+  """Describes which responses are retried and how long to wait between attempts.
+
+  Attributes:
+      max_attempts: Maximum number of attempts per request, including the first one.
+      backoff_base: Delay in seconds before the first retry, doubled on each attempt.
+      backoff_max: Upper bound in seconds for a single delay.
+      jitter: Whether to randomize backoff delays ("full jitter") so concurrent callers spread out.
+      retry_statuses: HTTP status codes that are retried.
+      idempotent_methods: HTTP methods that are safe to send again after a server
+          error or a read timeout. Other methods (POST, PATCH) are only retried when
+          the server cannot have processed them: on 429 and on connect timeouts.
+  """
+  def __init__(self, max_attempts=5, backoff_base=0.5, backoff_max=60.0, jitter=True,
+               retry_statuses=(429, 500, 502, 503, 504),
+               idempotent_methods=("GET", "HEAD", "OPTIONS", "PUT", "DELETE")):
+    """Inits RetryPolicy."""
+    self.max_attempts = max_attempts
+    self.backoff_base = backoff_base
+    self.backoff_max = backoff_max
+    self.jitter = jitter
+    self.retry_statuses = tuple(retry_statuses)
+    self.idempotent_methods = tuple(method.upper() for method in idempotent_methods)
+
+  def is_idempotent(self, request_type):
+    """Returns whether a request can be sent again after the server may have processed it.
+
+    Args:
+        request_type: HTTP method type (e.g., "GET", "POST")
+
+    Returns:
+        bool: True for the methods in `idempotent_methods`
+    """
+    return request_type.upper() in self.idempotent_methods
+
+  def backoff(self, attempt):
+    """Returns the exponential backoff delay after a failed attempt.
+
+    Args:
+        attempt: Number of the attempt that failed (1-based)
+
+    Returns:
+        float: Seconds to wait before the next attempt
+    """
+    delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+    return random.uniform(0, delay) if self.jitter else delay
+
+  def delay(self, attempt, retry_after=None):
+    """Returns the delay before the next attempt, preferring the server's Retry-After.
+
+    Args:
+        attempt: Number of the attempt that failed (1-based)
+        retry_after: Seconds the server asked to wait, if any
+
+    Returns:
+        float: Seconds to wait before the next attempt
+    """
+    if retry_after is not None:
+      return min(self.backoff_max, retry_after)
+    return self.backoff(attempt)
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+def parse_retry_after(response):
+  """Reads how long the server asked clients to wait from a rate-limited response.
+
+  Uses the `Retry-After` header (seconds or HTTP date) and falls back to the
+  "Try again in N seconds." message ServiceTitan puts in the error title.
+
+  Args:
+      response: The `requests.Response` with status 429
+
+  Returns:
+      float: Seconds to wait, or None if the response does not say
+  """
+  header = response.headers.get("Retry-After")
+  if header:
+    try:
+      return max(0.0, float(header))
+    except ValueError:
+      try:
+        return max(0.0, parsedate_to_datetime(header).timestamp() - time.time())
+      except (TypeError, ValueError):
+        pass
+  try:
+    body = response.json()
+  except ValueError:
+    return None
+  title = body.get("title", "") if isinstance(body, dict) else ""
+  match = re.search(r"(\d+(?:\.\d+)?)\s*second", title or "")
+  return float(match.group(1)) if match else None
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(conn):
+  """Returns the rate limiter shared by every request made for the connection's app and tenant.
+
+  ServiceTitan limits requests per app per tenant, so limiters are keyed by
+  (api_root, client_id, tenant_id). A `Connection` created with a `rate_limit`
+  sets the limiter's rate; if the limiter already exists with another rate, its
+  rate is changed (with a warning, as every connection of that app and tenant
+  shares it).
+
+  Args:
+      conn: Dictionary or `Connection` containing the credential configuration
+
+  Returns:
+      TokenBucket: The limiter for the app and tenant
+  """
+  key = (conn.get("api_root"), conn.get("SERVICETITAN_CLIENT_ID"), conn.get("SERVICETITAN_TENANT_ID"))
+  rate = getattr(conn, "rate_limit", None)
+  limiter = _rate_limiters.get(key)
+  if limiter is None or (rate and rate != limiter.max_rate):
+    with _rate_limiters_lock:
+      limiter = _rate_limiters.get(key)
+      if limiter is None:
+        limiter = _rate_limiters[key] = TokenBucket(rate or DEFAULT_REQUESTS_PER_SECOND)
+      elif rate and rate != limiter.max_rate:
+        logger.warning(f"Changing the rate limit of tenant {key[2]} from {limiter.max_rate:g} to {rate:g} requests per second.")
+        limiter.set_rate(rate)
+  return limiter
+
+def get_retry_policy(conn):
+  """Returns the retry policy of a connection, or the default policy for plain dictionaries.
+
+  Args:
+      conn: Dictionary or `Connection` containing the credential configuration
+
+  Returns:
+      RetryPolicy: The policy to apply to the connection's requests
+  """
+  return getattr(conn, "retry_policy", None) or DEFAULT_RETRY_POLICY
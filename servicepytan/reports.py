@@ -1,9 +1,16 @@
+import json
 import math
+import os
+import threading
+import time
 from servicepytan.utils import request_json, get_timezone_by_file, endpoint_url, request_json_with_retry
+from servicepytan.ratelimit import TokenBucket
+from servicepytan._concurrency import _imap_concurrently
+from servicepytan.columnar import ReportTable
+from servicepytan.metrics import get_metrics
 
 import logging
 
-logging.basicConfig()
 logger = logging.getLogger(__name__)
 
 def get_report_categories(conn=None):
@@ -76,32 +83,196 @@ def get_dynamic_set_list(dynamic_set_id,conn=None):
     """
     return request_json(endpoint_url('reporting', f'dynamic-value-sets/{dynamic_set_id}', conn=conn), conn=conn)
 
-class Report:
-  """Primary class for retrieving Reporting Endpoint Data.
+# The reporting API only serves data for the same report 5 times per minute
+REPORT_REQUESTS_PER_MINUTE = 5
 
-  Provides a comprehensive interface for working with ServiceTitan reports,
-  including parameter management, metadata retrieval, and data extraction.
+_report_rate_limiters = {}
+_report_rate_limiters_lock = threading.Lock()
+
+def get_report_rate_limiter(report_id, conn=None):
+  """Returns the rate limiter shared by every data request for one report.
+
+  Limiters are keyed by (api_root, tenant_id, report_id) and allow
+  `REPORT_REQUESTS_PER_MINUTE` requests per minute, with a burst of the same size,
+  unless another limit was set with `set_report_rate_limit`.
+
+  Args:
+      report_id: The report ID
+      conn: Dictionary containing the credential configuration
+
+  Returns:
+      TokenBucket: The report's rate limiter
+  """
+  key = (conn.get("api_root"), conn.get("SERVICETITAN_TENANT_ID"), str(report_id))
+  with _report_rate_limiters_lock:
+    if key not in _report_rate_limiters:
+      _report_rate_limiters[key] = _report_rate_limiter(REPORT_REQUESTS_PER_MINUTE)
+    return _report_rate_limiters[key]
+
+def _report_rate_limiter(requests_per_minute):
+  return TokenBucket(requests_per_minute / 60, capacity=requests_per_minute)
+
+def set_report_rate_limit(report_id, requests_per_minute, conn=None):
+  """Sets how many data requests per minute are sent for one report.
+
+  Replaces the report's limiter (see `get_report_rate_limiter`) with a full one
+  allowing `requests_per_minute`, with a burst of the same size. Useful when
+  ServiceTitan grants an app a higher reporting limit, and for tests against a
+  local server.
+
+  Args:
+      report_id: The report ID
+      requests_per_minute: Data requests allowed per minute
+      conn: Dictionary containing the credential configuration
+
+  Examples:
+      >>> set_report_rate_limit(123, 30, conn)
+  """
+  key = (conn.get("api_root"), conn.get("SERVICETITAN_TENANT_ID"), str(report_id))
+  with _report_rate_limiters_lock:
+    _report_rate_limiters[key] = _report_rate_limiter(requests_per_minute)
+
+# Report metadata rarely changes; cached metadata is refetched after a day by default
+DEFAULT_METADATA_TTL_SECONDS = 24 * 60 * 60
+
+class ReportMetadataCache:
+  """Report metadata shared by every `Report` instance in the process.
+
+  Entries are keyed by (api_root, tenant_id, category, report_id) and expire after
+  `ttl` seconds (None keeps them forever). The cache can be saved to and loaded
+  from a JSON file so short-lived processes do not refetch metadata on start.
 
   Attributes:
-      category: A string representing the report category. Find list of categories with get_report_categories().
-      report_id: A string representing the report id. Find list of report_id using get_report_list().
-      conn: a dictionary containing the credential config.
+      ttl: Seconds before cached metadata is refetched, or None.
   """
-  def __init__(self, category, report_id, conn=None):
-    """Initialize Report with category, report ID, and connection configuration.
-    
+  def __init__(self, ttl=DEFAULT_METADATA_TTL_SECONDS):
+    """Inits an empty ReportMetadataCache."""
+    self.ttl = ttl
+    self._entries = {}
+    self._lock = threading.Lock()
+
+  @staticmethod
+  def make_key(category, report_id, conn=None):
+    """Returns the cache key of a report for a connection."""
+    conn = conn or {}
+    return (conn.get("api_root"), str(conn.get("SERVICETITAN_TENANT_ID")), str(category), str(report_id))
+
+  def get(self, category, report_id, conn=None):
+    """Returns cached metadata for a report, or None if missing or expired."""
+    with self._lock:
+      entry = self._entries.get(self.make_key(category, report_id, conn))
+    if entry is None or (self.ttl is not None and time.time() - entry[0] > self.ttl):
+      return None
+    return entry[1]
+
+  def set(self, category, report_id, metadata, conn=None):
+    """Stores the metadata of a report."""
+    with self._lock:
+      self._entries[self.make_key(category, report_id, conn)] = (time.time(), metadata)
+
+  def invalidate(self, category=None, report_id=None, conn=None):
+    """Removes cached metadata matching every argument given.
+
     Args:
-        category: The report category (e.g., "jobs", "customers")
-        report_id: The specific report ID within the category
+        category: Optional report category whose reports are removed
+        report_id: Optional report id whose metadata is removed
+        conn: Optional connection whose tenant's entries are removed (every tenant if omitted)
+
+    Examples:
+        >>> cache.invalidate("operations", 123, conn)  # one report
+        >>> cache.invalidate(category="operations")  # every report in a category
+        >>> cache.invalidate()  # everything
+    """
+    tenant = None if conn is None else self.make_key(category, report_id, conn)[:2]
+    with self._lock:
+      for key in list(self._entries):
+        if tenant is not None and key[:2] != tenant:
+          continue
+        if category is not None and key[2] != str(category):
+          continue
+        if report_id is not None and key[3] != str(report_id):
+          continue
+        del self._entries[key]
+
+  def __len__(self):
+    return len(self._entries)
+
+  def persist(self, path):
+    """Writes the cache to a JSON file (atomically).
+
+    Args:
+        path: Path of the JSON file
+    """
+    with self._lock:
+      entries = [{"key": list(key), "fetched_at": fetched_at, "metadata": metadata}
+                 for key, (fetched_at, metadata) in self._entries.items()]
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+      json.dump(entries, f)
+    os.replace(tmp_path, path)
+
+  def load(self, path):
+    """Adds the entries of a JSON file written by `persist`. Missing files are ignored.
+
+    Args:
+        path: Path of the JSON file
+
+    Returns:
+        int: Number of entries loaded
+    """
+    if not os.path.exists(path):
+      return 0
+    with open(path) as f:
+      entries = json.load(f)
+    with self._lock:
+      for entry in entries:
+        self._entries[tuple(entry["key"])] = (entry["fetched_at"], entry["metadata"])
+    return len(entries)
+
+  def warm(self, reports, conn=None):
+    """Fetches and caches the metadata of several reports.
+
+    Args:
+        reports: Iterable of (category, report_id) pairs, or a category name to
+            warm every report listed in that category
         conn: Dictionary containing the credential configuration
+
+    Returns:
+        int: Number of reports fetched
+
+    Examples:
+        >>> get_report_metadata_cache().warm([("operations", 123), ("accounting", 456)], conn)
+        >>> get_report_metadata_cache().warm("operations", conn)
     """
-    self.conn = conn
-    # self.timezone = get_timezone_by_file(conn)
-    self.category = category
-    self.report_id = report_id
-    self.params = {"parameters": []}
-    self.metadata = self.get_metadata()
+    if isinstance(reports, str):
+      reports = [(reports, report["id"]) for report in get_report_list(reports, conn=conn)["data"]]
+    fetched = 0
+    for category, report_id in reports:
+      if self.get(category, report_id, conn) is None:
+        self.set(category, report_id, _fetch_report_metadata(category, report_id, conn), conn)
+        fetched += 1
+    return fetched
+
+_metadata_cache = ReportMetadataCache()
+
+def get_report_metadata_cache():
+  """Returns the process-wide report metadata cache."""
+  return _metadata_cache
+
+def _fetch_report_metadata(category, report_id, conn=None):
+  """Fetches the metadata of a report from the API."""
+  url = endpoint_url("reporting", f"report-category/{category}/reports/{report_id}", conn=conn)
+  return request_json_with_retry(url, conn=conn)
 
+class ReportTimeoutError(TimeoutError):
+  """Raised when a report pull passes its wall-clock deadline."""
+
+class _ReportParams:
+  """Parameter helpers shared by `Report` and `aio.AsyncReport`.
+
+  They work on the `params` and `metadata` attributes only, so the async report
+  can share them without inheriting the blocking request methods of `Report`.
+  """
   def add_params(self, name, value):
     """Add or update a parameter for the report.
     
@@ -158,27 +329,6 @@ class Report:
     """
     return self.params
 
-  def get_metadata(self):
-    """Get report metadata including available parameters and their types.
-    
-    Retrieves comprehensive metadata about the report, including parameter
-    definitions, data types, required fields, and available values.
-    
-    Returns:
-        dict: JSON response containing report metadata
-        
-    Raises:
-        requests.HTTPError: If the API request fails
-        
-    Examples:
-        >>> metadata = report.get_metadata()
-        >>> for param in metadata['parameters']:
-        ...     print(f"{param['name']}: {param['dataType']}")
-    """
-    endpoint = f"report-category/{self.category}/reports/{self.report_id}"
-    url = endpoint_url("reporting",endpoint, conn=self.conn)
-    return request_json_with_retry(url, conn=self.conn)
-
   def show_param_types(self):
     """Display parameter types and requirements in a formatted way.
     
@@ -207,6 +357,76 @@ class Report:
       for value in accepted_values:
         logger.info(f"  - {value}")
 
+class Report(_ReportParams):
+  """Primary class for retrieving Reporting Endpoint Data.
+
+  Provides a comprehensive interface for working with ServiceTitan reports,
+  including parameter management, metadata retrieval, and data extraction.
+  Creating a `Report` does not call the API: metadata is loaded on first access
+  and shared through the process-wide `ReportMetadataCache`.
+
+  Attributes:
+      category: A string representing the report category. Find list of categories with get_report_categories().
+      report_id: A string representing the report id. Find list of report_id using get_report_list().
+      conn: a dictionary or `Connection` containing the credential config.
+  """
+  def __init__(self, category, report_id, conn=None):
+    """Initialize Report with category, report ID, and connection configuration.
+    
+    Args:
+        category: The report category (e.g., "jobs", "customers")
+        report_id: The specific report ID within the category
+        conn: Dictionary containing the credential configuration
+    """
+    self.conn = conn
+    # self.timezone = get_timezone_by_file(conn)
+    self.category = category
+    self.report_id = report_id
+    self.params = {"parameters": []}
+    self._metadata = None
+
+  @property
+  def metadata(self):
+    """The report metadata, read from the shared cache and refetched once it expires (see `get_metadata`).
+
+    Assigning metadata overrides the cache for this report instance.
+    """
+    if self._metadata is not None:
+      return self._metadata
+    return self.get_metadata()
+
+  @metadata.setter
+  def metadata(self, value):
+    self._metadata = value
+
+  def get_metadata(self, refresh=False):
+    """Get report metadata including available parameters and their types.
+    
+    Retrieves comprehensive metadata about the report, including parameter
+    definitions, data types, required fields, and available values. Metadata
+    is served from the shared `ReportMetadataCache` when it is cached.
+    
+    Args:
+        refresh: Whether to refetch the metadata even if it is cached
+
+    Returns:
+        dict: JSON response containing report metadata
+        
+    Raises:
+        requests.HTTPError: If the API request fails
+        
+    Examples:
+        >>> metadata = report.get_metadata()
+        >>> for param in metadata['parameters']:
+        ...     print(f"{param['name']}: {param['dataType']}")
+    """
+    cache = get_report_metadata_cache()
+    metadata = None if refresh else cache.get(self.category, self.report_id, self.conn)
+    if metadata is None:
+      metadata = _fetch_report_metadata(self.category, self.report_id, self.conn)
+      cache.set(self.category, self.report_id, metadata, self.conn)
+    return metadata
+
   def get_data(self, params="", page=1, page_size=5000):
     """Get report data for a specific page.
     
@@ -230,28 +450,112 @@ class Report:
         >>> page_data = report.get_data(page=1, page_size=1000)
         >>> print(f"Retrieved {len(page_data['data'])} records")
     """
+    return self._get_data(params, page, page_size)
+
+  def _get_data(self, params="", page=1, page_size=5000, deadline=None):
+    """Gets one page for `get_data`, giving up before the limiter wait when it would pass `deadline`."""
     if params == "":
       params = self.params
     options = {"page": page, "pageSize": page_size, "includeTotal": True}
     endpoint = f"report-category/{self.category}/reports/{self.report_id}/data"
     url = endpoint_url("reporting",endpoint, conn=self.conn)
-    return request_json_with_retry(url, options=options, json_payload=params, 
-              conn=self.conn, request_type="POST")
+    # A page that would wait past the deadline does not take a slot from the shared limiter
+    max_wait = None if deadline is None else deadline - time.monotonic()
+    wait = get_report_rate_limiter(self.report_id, self.conn).reserve(max_wait=max_wait)
+    if wait is None:
+      raise ReportTimeoutError(f"The report rate limit would delay page {page} past the deadline.")
+    if wait > 0:
+      time.sleep(wait)
+    # Report data is requested with POST but only reads, so it is retried like a GET
+    return request_json_with_retry(url, options=options, json_payload=params,
+              conn=self.conn, request_type="POST", idempotent=True)
   
-  def get_all_data(self, params="", page_size=5000, timeout_min=60):
+  def iter_data(self, params="", page_size=5000, timeout_min=60, max_workers=1):
+    """Stream report data page by page.
+
+    Yields each page response as soon as it has been parsed, in page order. Every
+    data request is paced by the report's rate limiter (see `get_report_rate_limiter`)
+    and retried on rate limits and transient errors. With `max_workers` greater
+    than 1, the pages after the first are fetched concurrently, still within the
+    per-report rate limit.
+
+    Args:
+        params: Parameter configuration (uses instance params if empty)
+        page_size: Number of records per page (max 5000)
+        timeout_min: Wall-clock deadline in minutes for the whole pull
+        max_workers: Number of pages to fetch concurrently (1 fetches pages one after another)
+
+    Yields:
+        dict: Each page response with 'data', 'fields', 'totalCount' and 'hasMore'
+
+    Raises:
+        ReportTimeoutError: If the deadline passes, or the rate limiter would delay a
+            page past it, before every page was requested
+        requests.HTTPError: If any API request fails
+
+    Examples:
+        >>> for page in report.iter_data(max_workers=4):
+        ...     warehouse.write_rows(page["fields"], page["data"])
+    """
+    url = endpoint_url("reporting", f"report-category/{self.category}/reports/{self.report_id}/data", conn=self.conn)
+    responses = self._iter_pages(params, page_size, timeout_min, max_workers)
+    yield from get_metrics(self.conn).track_pull("report", url, responses, self.conn)
+
+  def _iter_pages(self, params="", page_size=5000, timeout_min=60, max_workers=1):
+    """Yields each page response for `iter_data`."""
+    deadline = time.monotonic() + timeout_min * 60
+    if params == "":
+      params = self.params
+    logger.info("Getting first page of data...")
+    response = self._get_data(params, page=1, page_size=page_size, deadline=deadline)
+    total = response["totalCount"]
+    has_more = response["hasMore"]
+    logger.info(f"Retrieved {len(response['data'])} of {total} records...")
+    yield response
+    requests_needed = math.ceil(total / page_size)
+
+    def fetch_page(page):
+      if time.monotonic() > deadline:
+        raise ReportTimeoutError(f"Timed out after {timeout_min} minutes before requesting page {page} of {requests_needed}.")
+      logger.info(f"Getting page {page} of {requests_needed}...")
+      # The rate limiter can wait for minutes, so the deadline is checked against the wait too
+      return self._get_data(params, page=page, page_size=page_size, deadline=deadline)
+
+    page = 1
+    if max_workers > 1 and has_more:
+      for response in _imap_concurrently(fetch_page, range(2, requests_needed + 1), max_workers):
+        yield response
+      page = max(requests_needed, 1)
+      has_more = response["hasMore"]
+    while has_more:
+      page += 1
+      response = fetch_page(page)
+      if(len(response["data"]) == 0):
+        logger.info("No more data to retrieve.")
+        break
+      yield response
+      has_more = response["hasMore"]
+
+  def get_all_data(self, params="", page_size=5000, timeout_min=60, max_workers=1):
     """Get all report data with automatic pagination.
     
     Retrieves all available data from the report by automatically handling
-    pagination. Includes intelligent page size optimization and timeout
-    protection to prevent excessively long-running requests.
+    pagination (see `iter_data`). With `max_workers` greater than 1, the pages
+    after the first are fetched concurrently within the per-report rate limit.
+
+    `timeout_min` is a wall-clock deadline for the whole pull. Pages not yet
+    requested when it passes are skipped and the records retrieved so far are
+    returned along with an 'error' entry.
     
     Args:
         params: Parameter configuration (uses instance params if empty)
         page_size: Number of records per page (max 5000)
         timeout_min: Maximum time in minutes before aborting the request
+        max_workers: Number of pages to fetch concurrently (1 fetches pages one after another)
         
     Returns:
-        dict: Dictionary containing 'data' (list of records) and 'fields' (metadata)
+        dict: Dictionary containing 'data' (list of records) and 'fields' (metadata),
+            plus 'error' if the deadline passed before every page was retrieved
         
     Raises:
         requests.HTTPError: If any API request fails
@@ -263,42 +567,48 @@ class Report:
         >>> all_data = report.get_all_data()
         >>> print(f"Retrieved {len(all_data['data'])} total records")
         
-        >>> # For large datasets, use smaller timeout
-        >>> large_report_data = report.get_all_data(timeout_min=30)
+        >>> # Fetch pages concurrently, giving up after 30 minutes
+        >>> large_report_data = report.get_all_data(timeout_min=30, max_workers=4)
     """
-    page = 1
     data = []
     fields = []
-    if params == "":
-      params = self.params
-    logger.info("Getting first page of data...")
-    response = self.get_data(params, page=page, page_size=page_size)
-    data.extend(response["data"])
-    fields.extend(response["fields"])
-    total = response["totalCount"]
-    has_more = response["hasMore"]
-    logger.info(f"Retrieved {len(data)} of {total} records...")
-    requests_needed = math.ceil(total / page_size)
-    mins_to_complete = requests_needed * 5
-    updated_page_size = page_size
-    if mins_to_complete > timeout_min:
-      init_page_size = updated_page_size
-      if page_size < 5000 and math.ceil(total / 5000) < 12:
-        logger.info("Setting page size to 5000 to speed up report retrieval...")
-        updated_page_size = 5000
-        requests_needed = 1 + math.ceil((total - init_page_size) / updated_page_size)
-      else:
-        logger.warning(f"This request will take at least {mins_to_complete/60} hours to complete.")
-        logger.warning("Limit the parameters to reduce the number of requests and try again.")
-        return {"error": "Too many requests. Try again with fewer parameters."}
-    while has_more:
-      page += 1
-      logger.info(f"Getting page {page} of {requests_needed}...")
-      response = self.get_data(params, page=page, page_size=updated_page_size)
-      if(len(response["data"]) == 0):
-        logger.info("No more data to retrieve.")
-        break
-      data.extend(response["data"])
-      logger.info(f"Retrieved {len(data)} sof {total} records...")
-      has_more = response["hasMore"]
-    return {"data": data, "fields": fields}
\ No newline at end of file
+    try:
+      for response in self.iter_data(params, page_size=page_size, timeout_min=timeout_min, max_workers=max_workers):
+        if not fields:
+          fields.extend(response["fields"])
+        data.extend(response["data"])
+    except ReportTimeoutError as e:
+      logger.warning(f"{e} Returning the {len(data)} records retrieved so far.")
+      return {"data": data, "fields": fields, "error": f"Timed out after {timeout_min} minutes. Limit the parameters to reduce the number of requests and try again."}
+    return {"data": data, "fields": fields}
+
+  def get_table(self, params="", page_size=5000, timeout_min=60, max_workers=1):
+    """Get all report data as a columnar `ReportTable`.
+
+    Builds typed column arrays as each page arrives instead of keeping every row
+    as a list (see `iter_data` for pagination and rate limiting).
+
+    Args:
+        params: Parameter configuration (uses instance params if empty)
+        page_size: Number of records per page (max 5000)
+        timeout_min: Wall-clock deadline in minutes for the whole pull
+        max_workers: Number of pages to fetch concurrently (1 fetches pages one after another)
+
+    Returns:
+        ReportTable: Columns of the report, accessible by field name
+
+    Raises:
+        ReportTimeoutError: If the deadline passes before every page was retrieved
+        requests.HTTPError: If any API request fails
+
+    Examples:
+        >>> table = report.get_table(max_workers=4)
+        >>> total = sum(table["Total"])
+        >>> df = table.to_pandas()
+    """
+    table = None
+    for response in self.iter_data(params, page_size=page_size, timeout_min=timeout_min, max_workers=max_workers):
+      if table is None:
+        table = ReportTable(response["fields"])
+      table.append_rows(response["data"])
+    return table
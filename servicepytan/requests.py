@@ -1,10 +1,46 @@
-from servicepytan.utils import request_json, check_default_options, endpoint_url, request_contents
+import math
+import os
+from urllib.parse import urlencode
+
+import requests
+from servicepytan.utils import request_json, check_default_options, endpoint_url, request_contents, download_to_file, get_content_length
+from servicepytan.ratelimit import TokenBucket
+from servicepytan._concurrency import _imap_concurrently
+from servicepytan.bulk import BulkWriter
+from servicepytan.metrics import get_metrics
 
 import logging
 
-logging.basicConfig()
 logger = logging.getLogger(__name__)
 
+# Default number of ids sent in one `ids` filter query
+IDS_CHUNK_SIZE = 50
+# Keep `ids` filter URLs under the length most proxies and servers accept
+MAX_URL_LENGTH = 2048
+# Largest page size accepted by list endpoints
+MAX_PAGE_SIZE = 5000
+
+class _IdsFilterUnsupported(Exception):
+  """Raised internally when an endpoint ignores the `ids` filter."""
+
+def _chunk_ids(ids, max_ids=IDS_CHUNK_SIZE, max_chars=MAX_URL_LENGTH):
+  """Splits ids into chunks of at most `max_ids` ids whose URL-encoded `ids` value fits in `max_chars`."""
+  chunks = []
+  chunk = []
+  length = 0
+  for id in ids:
+    # Commas are sent URL-encoded as "%2C"
+    id_length = len(str(id)) + 3
+    if chunk and (len(chunk) >= max_ids or length + id_length > max_chars):
+      chunks.append(chunk)
+      chunk = []
+      length = 0
+    chunk.append(id)
+    length += id_length
+  if chunk:
+    chunks.append(chunk)
+  return chunks
+
 class Endpoint:
   """Primary class for interacting with the API by establishing an endpoint object.
 
@@ -16,13 +52,23 @@ class Endpoint:
   Attributes:
       folder: A string indicating the group of endpoints you want to address.
       endpoint: A string indicating the endpoint you want to address.
-      conn: a dictionary containing the credential config.
+      conn: a dictionary or `Connection` containing the credential config.
+      model: Optional `models.Record` class (e.g., `models.Job`). Records returned by
+          `get_one`, `get_all`, `iter_all`, `iter_export` and `export_all` are built as
+          this class instead of dictionaries (except for sub-resources with a modifier).
   """
-  def __init__(self, folder, endpoint, conn=None):
+  def __init__(self, folder, endpoint, conn=None, model=None):
     """Inits Endpoint with folder, endpoint and allows for getting necessary credentials from the config file."""
     self.folder = folder
     self.endpoint = endpoint
     self.conn = conn
+    self.model = model
+
+  def _with_model(self, response, id="", modifier=""):
+    """Converts the records of a page response to `model` instances (a new dict is returned)."""
+    if self.model is None or id or modifier:
+      return response
+    return dict(response, data=self.model.from_dicts(response["data"]))
 
   # Main Request Types
   def get_one(self, id, modifier="", query={}):
@@ -50,7 +96,10 @@ class Endpoint:
     """
     url = endpoint_url(self.folder, self.endpoint, id=id, modifier=modifier, conn=self.conn)
     options = check_default_options(query)
-    return request_json(url, options=options, payload="", conn=self.conn, request_type="GET")
+    record = request_json(url, options=options, payload="", conn=self.conn, request_type="GET")
+    if self.model is not None and not modifier:
+      return self.model.from_dict(record)
+    return record
 
   def get_many(self, query={}, id="", modifier=""):
     """Retrieve one page of results with query options to customize.
@@ -79,17 +128,23 @@ class Endpoint:
     options = check_default_options(query)
     return request_json(url, options, payload="", conn=self.conn, request_type="GET")
   
-  def get_all(self, query={}, id="", modifier=""):
+  def get_all(self, query={}, id="", modifier="", max_workers=1):
     """Retrieve all pages of results for your query.
     
     Automatically handles pagination by making multiple API calls to fetch all
     available records that match the query criteria. This method continues
     fetching pages until no more data is available.
+
+    With `max_workers` greater than 1, the first page is requested with
+    `includeTotal=true` and the remaining pages are fetched concurrently on a
+    bounded thread pool. Records are still returned in page order, and the first
+    failing page cancels the pages that have not been requested yet.
     
     Args:
         query: Dictionary of query parameters for filtering (page parameter will be managed automatically)
         id: Optional record ID for accessing sub-resources
         modifier: Optional sub-resource path
+        max_workers: Number of pages to fetch concurrently (1 fetches pages one after another)
         
     Returns:
         list: Combined list of all records from all pages
@@ -101,21 +156,180 @@ class Endpoint:
         >>> endpoint = Endpoint("jpm", "jobs", conn)
         >>> all_jobs = endpoint.get_all(query={"jobStatus": "Completed"})
         >>> all_job_notes = endpoint.get_all(id="12345678", modifier="notes")
+        >>> all_jobs = endpoint.get_all(query={"jobStatus": "Completed"}, max_workers=8)
     """
+    return list(self.iter_all(query, id=id, modifier=modifier, max_workers=max_workers))
+
+  def iter_all(self, query={}, id="", modifier="", max_workers=1, pages=False):
+    """Stream all pages of results for your query.
+
+    Generator version of `get_all` that yields each record as soon as its page has
+    been parsed instead of building one list, so memory stays flat and the consumer
+    can start processing while later pages are still being fetched.
+
+    Args:
+        query: Dictionary of query parameters for filtering (page parameter will be managed automatically)
+        id: Optional record ID for accessing sub-resources
+        modifier: Optional sub-resource path
+        max_workers: Number of pages to fetch concurrently (1 fetches pages one after another)
+        pages: If True, yield each page response (with 'data' and 'hasMore') instead of each record
+
+    Yields:
+        dict: Each record, or each page response when `pages` is True
+
+    Raises:
+        requests.HTTPError: If any API request fails
+
+    Examples:
+        >>> endpoint = Endpoint("jpm", "jobs", conn)
+        >>> for job in endpoint.iter_all(query={"jobStatus": "Completed"}):
+        ...     warehouse.write(job)
+        >>> for page in endpoint.iter_all(query={"jobStatus": "Completed"}, pages=True):
+        ...     warehouse.write_many(page["data"])
+    """
+    url = endpoint_url(self.folder, self.endpoint, id=id, modifier=modifier, conn=self.conn)
+    responses = self._iter_pages(dict(query), id=id, modifier=modifier, max_workers=max_workers)
+    for response in get_metrics(self.conn).track_pull("iter_all", url, responses, self.conn):
+      response = self._with_model(response, id, modifier)
+      if pages:
+        yield response
+      else:
+        yield from response["data"]
+
+  def _iter_pages(self, query, id="", modifier="", max_workers=1):
+    """Yields each page response for `iter_all`, stopping at the first empty page."""
+    if max_workers > 1:
+      yield from self._iter_pages_parallel(query, id=id, modifier=modifier, max_workers=max_workers)
+      return
+
     query["page"] = "1"
     logger.info(query)
     response = self.get_many(query=query, id=id, modifier=modifier)
-    data = response["data"]
-    if data == []: return []
-    has_more = response["hasMore"]
-    while has_more:
+    if response["data"] == []: return
+    yield response
+    while response["hasMore"]:
       query["page"] = str(int(query["page"]) + 1)
       logger.info(query)
       response = self.get_many(query=query, id=id, modifier=modifier)
-      data.extend(response["data"])
-      has_more = response["hasMore"]
+      yield response
 
-    return data
+  def _iter_pages_parallel(self, query, id="", modifier="", max_workers=4):
+    """Yields page responses fetched concurrently using the first page's totalCount.
+
+    Used when `max_workers` is greater than 1. Pages are yielded in page order. If
+    records were added while the pages were being fetched and the last page still
+    reports `hasMore`, the remaining pages are fetched one after another.
+    """
+    query = check_default_options(query)
+    first_query = dict(query, page="1", includeTotal="true")
+    logger.info(first_query)
+    response = self.get_many(query=first_query, id=id, modifier=modifier)
+    if response["data"] == []: return
+    yield response
+    if not response["hasMore"]: return
+
+    page_size = int(response.get("pageSize") or query["pageSize"])
+    total = response.get("totalCount") or 0
+    last_page = max(math.ceil(total / page_size), 2)
+    logger.info(f"Fetching pages 2-{last_page} of {total} records with {max_workers} workers...")
+
+    def fetch_page(page):
+      return self.get_many(query=dict(query, page=str(page)), id=id, modifier=modifier)
+
+    for response in _imap_concurrently(fetch_page, range(2, last_page + 1), max_workers):
+      yield response
+
+    page = last_page
+    while response["hasMore"]:
+      page += 1
+      logger.info(f"Fetching page {page} past the reported total...")
+      response = fetch_page(page)
+      yield response
+
+  def get_by_ids(self, ids, query={}, key="id", chunk_size=IDS_CHUNK_SIZE, max_workers=4, use_ids_filter=True):
+    """Retrieve many records by id in as few requests as possible.
+
+    Ids are sent in chunks through the list endpoint's `ids` filter, each chunk
+    sized to stay under `chunk_size` ids, the maximum page size and `MAX_URL_LENGTH`,
+    so N lookups take about N/`chunk_size` requests. Chunks are fetched concurrently.
+    Endpoints without an `ids` filter (the request fails with 400/404, or returns
+    records that were not asked for) fall back to concurrent `get_one` calls.
+
+    Args:
+        ids: Iterable of record ids (duplicates are looked up once)
+        query: Optional dictionary of additional query parameters
+        key: Record field holding the id
+        chunk_size: Maximum number of ids per `ids` query
+        max_workers: Number of requests sent concurrently
+        use_ids_filter: Set to False to always use `get_one` calls
+
+    Returns:
+        dict: Dictionary of requested id to record, in the order of `ids`. Ids that
+            were not found are left out.
+
+    Raises:
+        requests.HTTPError: If an API request fails
+
+    Examples:
+        >>> customers = Endpoint("crm", "customers", conn).get_by_ids([101, 102, 103])
+        >>> customers[101]["name"]
+    """
+    requested = {}
+    for id in ids:
+      requested.setdefault(str(id), id)
+    if not requested:
+      return {}
+
+    found = None
+    if use_ids_filter:
+      found = self._get_by_ids_filter(list(requested), query, key, chunk_size, max_workers)
+    if found is None:
+      found = self._get_by_ids_single(list(requested), query, max_workers)
+    return {requested[id]: found[id] for id in requested if id in found}
+
+  def _get_by_ids_filter(self, ids, query, key, chunk_size, max_workers):
+    """Looks up ids with `ids` filter queries. Returns None if the endpoint lacks the filter."""
+    base_length = len(endpoint_url(self.folder, self.endpoint, conn=self.conn)) + len(urlencode(query)) + 64
+    chunks = _chunk_ids(ids, min(chunk_size, MAX_PAGE_SIZE), MAX_URL_LENGTH - base_length)
+
+    def fetch_chunk(chunk):
+      records = []
+      # Checked as records arrive, so an ignored filter is noticed on the first page
+      for record in self.iter_all(dict(query, ids=",".join(chunk), pageSize=len(chunk))):
+        if str(record.get(key)) not in chunk:
+          raise _IdsFilterUnsupported()
+        records.append(record)
+      return records
+
+    found = {}
+    try:
+      # Probe the filter with the first chunk before fanning out
+      results = [fetch_chunk(chunks[0])]
+      results.extend(_imap_concurrently(fetch_chunk, chunks[1:], max_workers))
+    except _IdsFilterUnsupported:
+      logger.info(f"{self.folder}/{self.endpoint} ignores the ids filter. Falling back to single record requests...")
+      return None
+    except requests.HTTPError as e:
+      if e.response is None or e.response.status_code not in (400, 404):
+        raise
+      logger.info(f"{self.folder}/{self.endpoint} does not accept the ids filter. Falling back to single record requests...")
+      return None
+    for records in results:
+      for record in records:
+        found[str(record.get(key))] = record
+    return found
+
+  def _get_by_ids_single(self, ids, query, max_workers):
+    """Looks up ids with concurrent `get_one` calls, skipping ids that are not found."""
+    def fetch_one(id):
+      try:
+        return id, self.get_one(id, query=dict(query))
+      except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+          return id, None
+        raise
+
+    return {id: record for id, record in _imap_concurrently(fetch_one, ids, max_workers) if record is not None}
 
   def create(self, payload):
     """Create a new record via POST request.
@@ -191,7 +405,7 @@ class Endpoint:
         >>> result = endpoint.delete("12345678")
     """
     url = endpoint_url(self.folder, self.endpoint, id=id, modifier=f"{modifier}", conn=self.conn)
-    return request_json(url, options={}, payload="", conn=self.conn, request_type="DEL")
+    return request_json(url, options={}, payload="", conn=self.conn, request_type="DELETE")
 
   def delete_subitem(self, id, modifier_id, modifier):
     """Delete a sub-item of a record via DELETE request.
@@ -216,7 +430,29 @@ class Endpoint:
         >>> result = endpoint.delete_subitem("12345678", "note_id", "notes")
     """
     url = endpoint_url(self.folder, self.endpoint, id=id, modifier=f"{modifier}/{modifier_id}", conn=self.conn)
-    return request_json(url, options={}, payload="", conn=self.conn, request_type="DEL")
+    return request_json(url, options={}, payload="", conn=self.conn, request_type="DELETE")
+
+  def bulk(self, operations, max_workers=4, checkpoint_path=None):
+    """Run many create/update/delete operations concurrently.
+
+    Operations share the connection's rate limiter and retry policy. Failures are
+    reported per operation instead of stopping the batch. See `BulkWriter` for the
+    operation format and checkpointing.
+
+    Args:
+        operations: Iterable of operation dictionaries (e.g., {"action": "update", "id": 123, "payload": {...}})
+        max_workers: Number of operations sent concurrently
+        checkpoint_path: Optional file recording completed operations so an interrupted batch can resume
+
+    Returns:
+        list: One result dictionary per operation, in input order, with 'ok', 'response' and 'error'
+
+    Examples:
+        >>> endpoint = Endpoint("crm", "customers", conn)
+        >>> results = endpoint.bulk([{"action": "patch", "id": 123, "payload": {"doNotMail": True}}], max_workers=8)
+        >>> failed = [result for result in results if not result["ok"]]
+    """
+    return BulkWriter(self, max_workers=max_workers, checkpoint_path=checkpoint_path).run(operations)
 
   def export_one(self, export_endpoint, export_from="", include_recent_changes=False):
     """Export one page of data from an export endpoint.
@@ -267,35 +503,94 @@ class Endpoint:
         >>> all_jobs = endpoint.export_all("jobs")
         >>> recent_jobs = endpoint.export_all("jobs", include_recent_changes=True)
     """
+    data = list(self.iter_export(export_endpoint, export_from, include_recent_changes))
+    logger.info(f"Export Data Complete. {len(data)} rows exported.")
+    return data
+
+  def iter_export(self, export_endpoint, export_from="", include_recent_changes=False, pages=False):
+    """Stream all data from an export endpoint.
+
+    Generator version of `export_all` that yields each record as soon as its page
+    has been parsed instead of building one list. With `pages` set, each page
+    response is yielded whole, which exposes the `continueFrom` token to resume
+    the export from.
+
+    Args:
+        export_endpoint: The specific export endpoint to call
+        export_from: Starting continuation token (empty string to start from beginning)
+        include_recent_changes: Whether to include recent changes in the export
+        pages: If True, yield each page response (with 'data', 'hasMore' and 'continueFrom') instead of each record
+
+    Yields:
+        dict: Each exported record, or each page response when `pages` is True
+
+    Raises:
+        requests.HTTPError: If any API request fails
+
+    Examples:
+        >>> endpoint = Endpoint("jpm", "export", conn)
+        >>> for job in endpoint.iter_export("jobs"):
+        ...     warehouse.write(job)
+        >>> for page in endpoint.iter_export("jobs", pages=True):
+        ...     warehouse.write_many(page["data"])
+        ...     save_token(page["continueFrom"])
+    """
+    url = endpoint_url(self.folder, "export", modifier=export_endpoint, conn=self.conn)
+    responses = self._iter_export_pages(export_endpoint, export_from, include_recent_changes)
+    for response in get_metrics(self.conn).track_pull("iter_export", url, responses, self.conn):
+      if pages:
+        # Empty pages are still yielded so the final continueFrom token is not lost
+        yield self._with_model(response)
+      else:
+        yield from self._with_model(response)["data"]
+
+  def _iter_export_pages(self, export_endpoint, export_from="", include_recent_changes=False):
+    """Yields each page response for `iter_export`, following continueFrom tokens."""
     counter = 1
     logger.info(f"{export_endpoint} {counter}: {export_from}")
     response = self.export_one(export_endpoint, export_from, include_recent_changes)
-    data = response["data"]
-    if data == []: return []
-    has_more = response["hasMore"]
-    while has_more:
+    while True:
+      yield response
+      if response["data"] == [] or not response["hasMore"]:
+        break
       counter += 1
       export_from = response["continueFrom"]
       logger.info(f"{export_endpoint} {counter}: {export_from}")
       response = self.export_one(export_endpoint, export_from, include_recent_changes)
-      data.extend(response["data"])
-      has_more = response["hasMore"]
-    logger.info(f"Export Data Complete. {len(data)} rows exported.")
-    return data
-  
-  def download(self, id, modifier="", filename=None):
+
+  def _download_url(self, id, modifier=""):
+    """Validates a download request and returns its URL."""
+    VALID_ENDPOINTS = ["attachments", "jobs/attachment", "images"]
+
+    if not id:
+        raise ValueError("ID must be provided to download a file.")
+
+    if self.endpoint not in VALID_ENDPOINTS:
+        ERROR_MESSAGE = f"Download method is not supported for endpoint '{self.endpoint}'. Valid endpoints are: {', '.join(VALID_ENDPOINTS)}."
+        logger.error(ERROR_MESSAGE)
+        raise ValueError(ERROR_MESSAGE)
+
+    return endpoint_url(self.folder, self.endpoint, id=id, modifier=modifier, conn=self.conn)
+
+  def download(self, id, modifier="", filename=None, stream=False):
     """Download a file from the specified endpoint.
     
     Sends a GET request to download a file associated with the record.
     The modifier can specify the type of file to download (e.g., "attachments").
+
+    With `stream=True` the file is written to `filename` in chunks as it arrives
+    instead of being loaded into memory, through a `.part` file that is renamed
+    once complete. An interrupted streamed download resumes where it stopped.
     
     Args:
         id: The unique identifier of the record
         modifier: Optional sub-resource path for downloading specific files
-        filename: Optional filename to save the downloaded file as
+        filename: Optional filename to save the downloaded file as (required when streaming)
+        stream: Whether to stream the file to disk instead of returning its bytes
 
     Returns:
-        bytes: The content of the downloaded file
+        bytes: The content of the downloaded file, or the size of the file in
+            bytes when `stream` is True
         
     Raises:
         requests.HTTPError: If the API request fails
@@ -303,22 +598,68 @@ class Endpoint:
     Examples:
         >>> endpoint = Endpoint("forms", "jobs/attachment", conn)
         >>> file_content = endpoint.download("12345678")
+        >>> size = endpoint.download("12345678", filename="photo.jpg", stream=True)
     """
-    VALID_ENDPOINTS = ["attachments", "jobs/attachment", "images"]
+    url = self._download_url(id, modifier)
 
-    if not id:
-        raise ValueError("ID must be provided to download a file.")
-
-    if self.endpoint not in VALID_ENDPOINTS:
-        ERROR_MESSAGE = f"Download method is not supported for endpoint '{self.endpoint}'. Valid endpoints are: {', '.join(VALID_ENDPOINTS)}."
-        logger.error(ERROR_MESSAGE)
-        raise ValueError(ERROR_MESSAGE)
+    if stream:
+      if not filename:
+        raise ValueError("A filename must be provided to stream a download.")
+      return download_to_file(url, filename, conn=self.conn)
 
-    url = endpoint_url(self.folder, self.endpoint, id=id, modifier=modifier, conn=self.conn)
     file_bytes = request_contents(url, options={}, conn=self.conn)
     
     if filename:
         with open(filename, "wb") as f:
             f.write(file_bytes)
 
-    return file_bytes
\ No newline at end of file
+    return file_bytes
+
+  def download_many(self, ids, directory=".", modifier="", filenames=None, sizes=None, max_workers=4,
+                    bytes_per_second=None, skip_existing=True):
+    """Stream many files to a directory concurrently.
+
+    Files are streamed to disk as with `download(stream=True)`. A file that already
+    exists with the expected size is skipped; the size comes from `sizes` or, when
+    not given, from a HEAD request. A failed download does not stop the others.
+
+    Args:
+        ids: Iterable of record ids to download
+        directory: Directory the files are saved in (created if needed)
+        modifier: Optional sub-resource path for downloading specific files
+        filenames: Optional dictionary of id to filename (defaults to the id)
+        sizes: Optional dictionary of id to expected size in bytes
+        max_workers: Number of files downloaded concurrently
+        bytes_per_second: Optional limit on the combined download rate
+        skip_existing: Whether to skip files already present with the expected size
+
+    Returns:
+        dict: Dictionary of id to result with 'path', 'bytes', 'skipped' and 'error'
+
+    Examples:
+        >>> endpoint = Endpoint("forms", "jobs/attachment", conn)
+        >>> results = endpoint.download_many(attachment_ids, "attachments", max_workers=8, bytes_per_second=5_000_000)
+        >>> failed = {id: result["error"] for id, result in results.items() if result["error"]}
+    """
+    os.makedirs(directory, exist_ok=True)
+    filenames = filenames or {}
+    sizes = sizes or {}
+    limiter = TokenBucket(bytes_per_second, capacity=bytes_per_second, min_rate=bytes_per_second) if bytes_per_second else None
+
+    def fetch_file(id):
+      path = os.path.join(directory, str(filenames.get(id, id)))
+      result = {"path": path, "bytes": 0, "skipped": False, "error": None}
+      try:
+        url = self._download_url(id, modifier)
+        if skip_existing and os.path.exists(path):
+          expected = sizes[id] if id in sizes else get_content_length(url, conn=self.conn)
+          if expected is not None and os.path.getsize(path) == expected:
+            result.update(bytes=expected, skipped=True)
+            return id, result
+        result["bytes"] = download_to_file(url, path, conn=self.conn, limiter=limiter)
+      except Exception as e:
+        logger.error(f"Failed to download {self.folder}/{self.endpoint}/{id}: {e}")
+        result["error"] = f"{e.__class__.__name__}: {e}"
+      return id, result
+
+    return dict(_imap_concurrently(fetch_file, list(ids), max_workers))
@@ -0,0 +1,309 @@
+"""Sinks Module: Streaming export and report pages to rotating files"""
+import csv
+import gzip
+import io
+import json
+import os
+import time
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ROWS_PER_FILE = 100000
+
+class FileSink:
+  """Base class for sinks writing records to rotating files with a manifest.
+
+  Records are written as they arrive, so memory use does not grow with the size
+  of the export. A new file is started once the current one holds
+  `max_rows_per_file` rows or `max_bytes_per_file` bytes (uncompressed). When the
+  sink is closed, a manifest (`<prefix>.manifest.json` by default) is written next to the
+  files with the path and row count of each file. Its "complete" flag is False
+  when the sink was closed by an exception (e.g., leaving a `with` block on an
+  error), so consumers can tell a partial pull from a finished one.
+
+  Attributes:
+      directory: Directory the files are written to.
+      prefix: Filename prefix (files are named "<prefix>-00000.<extension>").
+      max_rows_per_file: Rows per file before rotating.
+      max_bytes_per_file: Optional uncompressed bytes per file before rotating.
+      compression: None or "gzip".
+      manifest_name: Filename of the manifest ("<prefix>.manifest.json" unless given), so
+          sinks with different prefixes can share a directory.
+      files: List of {"path", "rows", "bytes"} for every file written.
+      rows: Total number of rows written.
+      closed_rows: Rows in files that have been closed. Rows in the current file may
+          still be buffered (or, for Parquet, unreadable) until it is closed.
+  """
+  extension = ""
+
+  def __init__(self, directory, prefix="part", max_rows_per_file=DEFAULT_MAX_ROWS_PER_FILE,
+               max_bytes_per_file=None, compression=None, manifest_name=None):
+    """Inits FileSink and creates the directory if needed."""
+    if compression not in (None, "gzip"):
+      raise ValueError(f"Unsupported compression '{compression}'. Use None or 'gzip'.")
+    self.directory = directory
+    self.prefix = prefix
+    self.max_rows_per_file = max_rows_per_file
+    self.max_bytes_per_file = max_bytes_per_file
+    self.compression = compression
+    self.manifest_name = manifest_name or f"{prefix}.manifest.json"
+    self.files = []
+    self.rows = 0
+    self.closed_rows = 0
+    self.metadata = {}
+    self.manifest = None
+    self._file = None
+    os.makedirs(directory, exist_ok=True)
+
+  def _path(self):
+    suffix = ".gz" if self.compression == "gzip" else ""
+    return os.path.join(self.directory, f"{self.prefix}-{len(self.files):05d}.{self.extension}{suffix}")
+
+  def _open_text(self, path):
+    if self.compression == "gzip":
+      return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+  def _open(self, path):
+    """Opens a new file. Implemented by subclasses."""
+    raise NotImplementedError
+
+  def _write(self, records):
+    """Writes records to the current file and returns the bytes written. Implemented by subclasses."""
+    raise NotImplementedError
+
+  def _close_file(self):
+    """Closes the current file."""
+    self._file.close()
+
+  def _rotate_if_full(self):
+    current = self.files[-1]
+    if current["rows"] >= self.max_rows_per_file or (self.max_bytes_per_file and current["bytes"] >= self.max_bytes_per_file):
+      self._close_file()
+      self._file = None
+      self.closed_rows = self.rows
+
+  def write_page(self, records):
+    """Writes a page of records, rotating files as they fill up.
+
+    Args:
+        records: List of record dictionaries
+
+    Returns:
+        int: Number of records written
+    """
+    start = 0
+    while start < len(records):
+      if self._file is None:
+        path = self._path()
+        self.files.append({"path": os.path.basename(path), "rows": 0, "bytes": 0})
+        self._open(path)
+      current = self.files[-1]
+      batch = records[start:start + self.max_rows_per_file - current["rows"]]
+      current["bytes"] += self._write(batch)
+      current["rows"] += len(batch)
+      self.rows += len(batch)
+      start += len(batch)
+      self._rotate_if_full()
+    return len(records)
+
+  def write_records(self, records, batch_size=1000):
+    """Writes an iterable of records in batches of `batch_size`.
+
+    Returns:
+        int: Number of records written
+    """
+    count = 0
+    batch = []
+    for record in records:
+      batch.append(record)
+      if len(batch) >= batch_size:
+        count += self.write_page(batch)
+        batch = []
+    if batch:
+      count += self.write_page(batch)
+    return count
+
+  def close(self, complete=True):
+    """Closes the current file and writes the manifest.
+
+    Args:
+        complete: Whether every record was written, stored as "complete" in the manifest
+
+    Returns:
+        dict: The manifest
+    """
+    if self.manifest is not None:
+      return self.manifest
+    if self._file is not None:
+      self._close_file()
+      self._file = None
+    self.closed_rows = self.rows
+    manifest = {
+      "format": self.extension,
+      "compression": self.compression,
+      "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+      "total_rows": self.rows,
+      "files": self.files,
+      **self.metadata,
+      "complete": complete,
+    }
+    with open(os.path.join(self.directory, self.manifest_name), "w") as f:
+      json.dump(manifest, f, indent=2)
+    if complete:
+      logger.info(f"Wrote {self.rows} rows to {len(self.files)} file(s) in {self.directory}.")
+    else:
+      logger.warning(f"Stopped after writing {self.rows} rows to {len(self.files)} file(s) in {self.directory}; the manifest is marked incomplete.")
+    self.manifest = manifest
+    return manifest
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close(complete=exc_type is None)
+
+class NDJSONSink(FileSink):
+  """Writes records as newline-delimited JSON (one record per line)."""
+  extension = "ndjson"
+
+  def _open(self, path):
+    self._file = self._open_text(path)
+
+  def _write(self, records):
+    text = "".join(json.dumps(record, default=str) + "\n" for record in records)
+    self._file.write(text)
+    return len(text)
+
+class CSVSink(FileSink):
+  """Writes records as CSV with a header row in every file.
+
+  Columns are `fieldnames`, or the keys of the first record. Keys missing from
+  a record are left empty, keys not in the columns are dropped, and nested
+  values (dictionaries and lists) are written as JSON.
+  """
+  extension = "csv"
+
+  def __init__(self, directory, fieldnames=None, **kwargs):
+    """Inits CSVSink (see `FileSink` for the other arguments)."""
+    super().__init__(directory, **kwargs)
+    self.fieldnames = fieldnames
+
+  def _open(self, path):
+    self._file = self._open_text(path)
+    self._header_written = False
+
+  def _write(self, records):
+    if self.fieldnames is None:
+      self.fieldnames = list(records[0].keys())
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=self.fieldnames, extrasaction="ignore")
+    if not self._header_written:
+      writer.writeheader()
+      self._header_written = True
+    for record in records:
+      writer.writerow({key: json.dumps(value) if isinstance(value, (dict, list)) else value for key, value in record.items()})
+    text = buffer.getvalue()
+    self._file.write(text)
+    return len(text)
+
+class ParquetSink(FileSink):
+  """Writes records as Parquet files (requires pyarrow).
+
+  Each written page becomes a row group. The schema is `schema`, or is inferred
+  from the first page; columns that are empty in the first page are typed as
+  strings, and keys that first appear in later pages are dropped. Nested values
+  (dictionaries and lists) are written as JSON strings. `compression` applies
+  Parquet's own codec ("gzip", or "snappy" by default).
+  """
+  extension = "parquet"
+
+  def __init__(self, directory, schema=None, compression="snappy", **kwargs):
+    """Inits ParquetSink (see `FileSink` for the other arguments)."""
+    super().__init__(directory, **kwargs)
+    # Parquet compresses internally, so the file itself is never gzipped
+    self.parquet_compression = compression
+    self.metadata["parquet_compression"] = compression
+    self.schema = schema
+
+  def _open(self, path):
+    import pyarrow.parquet as pq
+    self._path_open = path
+    self._file = None if self.schema is None else pq.ParquetWriter(path, self.schema, compression=self.parquet_compression)
+
+  def _write(self, records):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    rows = [{key: json.dumps(value) if isinstance(value, (dict, list)) else value for key, value in record.items()}
+            for record in records]
+    if self.schema is None:
+      inferred = pa.Table.from_pylist(rows).schema
+      self.schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in inferred])
+    if self._file is None:
+      self._file = pq.ParquetWriter(self._path_open, self.schema, compression=self.parquet_compression)
+    table = pa.Table.from_pylist(rows, schema=self.schema)
+    self._file.write_table(table)
+    return table.nbytes
+
+def write_export(endpoint, export_endpoint, sink, export_from="", include_recent_changes=False):
+  """Streams an export into a sink page by page.
+
+  The last continuation token is stored in the manifest as "continueFrom" so the
+  next run can pick up from there. If the export fails, the manifest is still
+  written, marked incomplete, with the token of the last written page.
+
+  Args:
+      endpoint: The `Endpoint` for the folder's "export" endpoint
+      export_endpoint: The export endpoint (e.g., "invoices")
+      sink: The `FileSink` records are written to (closed when done)
+      export_from: Continuation token or date to start from
+      include_recent_changes: Whether to include recent changes
+
+  Returns:
+      dict: The manifest
+
+  Examples:
+      >>> export = Endpoint("accounting", "export", conn)
+      >>> manifest = write_export(export, "invoices", NDJSONSink("invoices", compression="gzip"))
+  """
+  continue_from = export_from
+  complete = False
+  try:
+    for page in endpoint.iter_export(export_endpoint, export_from, include_recent_changes, pages=True):
+      sink.write_page(page["data"])
+      continue_from = page.get("continueFrom", continue_from)
+    complete = True
+  finally:
+    # A failed export keeps the token of the last written page, to resume from
+    sink.metadata["continueFrom"] = continue_from
+    sink.close(complete=complete)
+  return sink.manifest
+
+def write_report(report, sink, params="", page_size=5000, timeout_min=60):
+  """Streams a report into a sink page by page.
+
+  Each row is written as a dictionary of field name to value.
+
+  Args:
+      report: The `Report` to run
+      sink: The `FileSink` rows are written to (closed when done)
+      params: Parameter configuration (uses the report's params if empty)
+      page_size: Number of records per page
+      timeout_min: Wall-clock deadline in minutes for the whole pull
+
+  Returns:
+      dict: The manifest
+
+  Raises:
+      ReportTimeoutError: If the report passes its deadline (the rows received so far are kept)
+
+  Examples:
+      >>> manifest = write_report(report, ParquetSink("technician_report"))
+  """
+  with sink:
+    for page in report.iter_data(params, page_size=page_size, timeout_min=timeout_min):
+      names = [field["name"] for field in page["fields"]]
+      sink.write_page([dict(zip(names, row)) for row in page["data"]])
+  return sink.manifest
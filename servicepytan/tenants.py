@@ -0,0 +1,254 @@
+"""Tenants Module: Running the same pull across many tenants concurrently"""
+import queue
+import threading
+
+from servicepytan.connection import Connection
+from servicepytan.ratelimit import TokenBucket
+from servicepytan.requests import Endpoint
+from servicepytan.reports import Report
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+_TENANT_DONE = object()
+
+class TenantPullError(Exception):
+  """Raised after a multi-tenant pull when one or more tenants failed.
+
+  Attributes:
+      errors: Dictionary of tenant ID to the exception raised for that tenant.
+  """
+  def __init__(self, errors):
+    self.errors = errors
+    super().__init__(f"{len(errors)} tenant(s) failed: " + ", ".join(f"{tenant_id} ({e})" for tenant_id, e in errors.items()))
+
+def tenant_connection(conn, tenant_id):
+  """Returns a connection to another tenant of the same app.
+
+  Args:
+      conn: Dictionary or `Connection` containing the credential configuration
+      tenant_id: The ServiceTitan tenant ID
+
+  Returns:
+      Connection: `conn.for_tenant(tenant_id)` for a `Connection`, otherwise a new
+          `Connection` built from the dictionary with the tenant ID replaced
+  """
+  if isinstance(conn, Connection):
+    return conn.for_tenant(tenant_id)
+  return Connection(dict(conn, SERVICETITAN_TENANT_ID=str(tenant_id)))
+
+class TenantRunner:
+  """Runs the same pull for many tenants concurrently and streams tagged records.
+
+  Tenants are pulled on a bounded thread pool (`max_tenants` at a time). Each
+  tenant's requests go through its own rate limiter, as for any connection, and
+  `global_rate_limit` adds one requests-per-second limit shared by every tenant.
+  Records are yielded as `(tenant_id, record)` tuples as soon as any tenant
+  produces them. A failing tenant does not stop the others; once every tenant is
+  done, `TenantPullError` is raised with the failures (unless `raise_errors` is False,
+  in which case they are only kept in `errors`).
+
+  The runner works on its own copies of the connections it is given (sharing
+  their pooled sessions), so the global limit never leaks into the caller's
+  connections. Connections it creates from dictionaries are closed by `close()`,
+  or at the end of a `with` block.
+
+  Attributes:
+      connections: Dictionary of tenant ID to the runner's `Connection` for that tenant.
+      max_tenants: Number of tenants pulled concurrently.
+      raise_errors: Whether to raise `TenantPullError` when a tenant fails.
+      errors: Dictionary of tenant ID to exception from the last run.
+
+  Examples:
+      >>> with TenantRunner.from_tenant_ids(conn, ["111", "222", "333"], max_tenants=8, global_rate_limit=100) as runner:
+      ...     for tenant_id, job in runner.iter_all("jpm", "jobs", query={"jobStatus": "Completed"}):
+      ...         warehouse.write(tenant_id, job)
+  """
+  def __init__(self, conns, max_tenants=8, global_rate_limit=None, raise_errors=True, buffer_size=1000):
+    """Inits TenantRunner from a list of connection configurations (one per tenant).
+
+    Args:
+        conns: List of dictionaries or `Connection` objects, one per tenant
+        max_tenants: Number of tenants pulled concurrently
+        global_rate_limit: Optional requests per second shared by every tenant
+        raise_errors: Whether to raise `TenantPullError` when a tenant fails
+        buffer_size: Maximum number of records waiting to be consumed
+
+    Raises:
+        ValueError: If two connections are for the same tenant
+    """
+    shared_limiter = TokenBucket(global_rate_limit) if global_rate_limit else None
+    self.connections = {}
+    self._owned = []
+    for conn in conns:
+      tenant_id = str(conn["SERVICETITAN_TENANT_ID"])
+      if tenant_id in self.connections:
+        self.close()
+        raise ValueError(f"Tenant {tenant_id} is listed more than once.")
+      if isinstance(conn, Connection):
+        conn = conn.for_tenant(tenant_id)
+      else:
+        conn = Connection(conn)
+        self._owned.append(conn)
+      if shared_limiter is not None:
+        conn.shared_rate_limiter = shared_limiter
+      self.connections[tenant_id] = conn
+    self.max_tenants = max_tenants
+    self.raise_errors = raise_errors
+    self.buffer_size = buffer_size
+    self.errors = {}
+
+  @classmethod
+  def from_tenant_ids(cls, conn, tenant_ids, **kwargs):
+    """Creates a runner for many tenants of one app credential.
+
+    Args:
+        conn: Dictionary or `Connection` for the app (its tenant ID is replaced)
+        tenant_ids: List of tenant IDs
+        **kwargs: Passed to `TenantRunner`
+
+    Returns:
+        TenantRunner: Runner with one connection per tenant sharing one pooled session
+
+    Raises:
+        ValueError: If a tenant ID is listed more than once
+    """
+    if isinstance(conn, Connection):
+      return cls([tenant_connection(conn, tenant_id) for tenant_id in tenant_ids], **kwargs)
+    # The runner owns the session created for a configuration dictionary
+    base = Connection(conn)
+    try:
+      runner = cls([tenant_connection(base, tenant_id) for tenant_id in tenant_ids], **kwargs)
+    except Exception:
+      base.close()
+      raise
+    runner._owned.append(base)
+    return runner
+
+  def close(self):
+    """Closes the connections the runner created. Connections passed in stay open."""
+    for conn in self._owned:
+      conn.close()
+    self._owned = []
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
+
+  def iter_records(self, pull):
+    """Run a pull for every tenant and stream its records tagged with the tenant.
+
+    Args:
+        pull: Callable taking a tenant's `Connection` and returning an iterable of records
+
+    Yields:
+        tuple: (tenant_id, record), in the order records arrive
+
+    Raises:
+        TenantPullError: After every tenant is done, if any tenant failed and `raise_errors` is True
+    """
+    records = queue.Queue(self.buffer_size)
+    tenant_ids = queue.Queue()
+    for tenant_id in self.connections:
+      tenant_ids.put(tenant_id)
+    stop = threading.Event()
+    self.errors = {}
+
+    def put(item):
+      while not stop.is_set():
+        try:
+          records.put(item, timeout=0.1)
+          return True
+        except queue.Full:
+          continue
+      return False
+
+    def worker():
+      while not stop.is_set():
+        try:
+          tenant_id = tenant_ids.get_nowait()
+        except queue.Empty:
+          break
+        try:
+          for record in pull(self.connections[tenant_id]):
+            if not put((tenant_id, record)):
+              return
+          logger.info(f"Tenant {tenant_id} done.")
+        except Exception as e:
+          logger.error(f"Tenant {tenant_id} failed: {e}")
+          self.errors[tenant_id] = e
+      put(_TENANT_DONE)
+
+    workers = [threading.Thread(target=worker, daemon=True) for _ in range(min(self.max_tenants, len(self.connections)))]
+    for thread in workers:
+      thread.start()
+    try:
+      running = len(workers)
+      while running:
+        item = records.get()
+        if item is _TENANT_DONE:
+          running -= 1
+          continue
+        yield item
+    finally:
+      stop.set()
+      for thread in workers:
+        thread.join()
+
+    if self.errors and self.raise_errors:
+      raise TenantPullError(dict(self.errors))
+
+  def iter_all(self, folder, endpoint, query={}, max_workers=1):
+    """Stream `Endpoint.iter_all` for every tenant as (tenant_id, record) tuples."""
+    def pull(conn):
+      return Endpoint(folder, endpoint, conn=conn).iter_all(dict(query), max_workers=max_workers)
+    return self.iter_records(pull)
+
+  def iter_export(self, folder, export_endpoint, export_from="", include_recent_changes=False):
+    """Stream `Endpoint.iter_export` for every tenant as (tenant_id, record) tuples.
+
+    Args:
+        folder: The API folder (e.g., "jpm")
+        export_endpoint: The export endpoint (e.g., "jobs")
+        export_from: Continuation token or date, applied to every tenant
+        include_recent_changes: Whether to include recent changes
+    """
+    def pull(conn):
+      return Endpoint(folder, "export", conn=conn).iter_export(export_endpoint, export_from, include_recent_changes)
+    return self.iter_records(pull)
+
+  def iter_report(self, category, report_id, params=None, page_size=5000, timeout_min=60):
+    """Stream a report for every tenant as (tenant_id, row) tuples.
+
+    Each row is a dictionary of field name to value.
+
+    Args:
+        category: The report category
+        report_id: The report ID (the same report must exist in every tenant)
+        params: Optional list of {"name", "value"} report parameters
+        page_size: Number of records per page
+        timeout_min: Wall-clock deadline in minutes for each tenant's pull
+    """
+    def pull(conn):
+      report = Report(category, report_id, conn=conn)
+      for param in params or []:
+        report.add_params(param["name"], param["value"])
+      for page in report.iter_data(page_size=page_size, timeout_min=timeout_min):
+        names = [field["name"] for field in page["fields"]]
+        for row in page["data"]:
+          yield dict(zip(names, row))
+    return self.iter_records(pull)
+
+  def get_all(self, folder, endpoint, query={}, max_workers=1):
+    """Retrieve `Endpoint.get_all` for every tenant.
+
+    Returns:
+        dict: Dictionary of tenant ID to list of records
+    """
+    results = {tenant_id: [] for tenant_id in self.connections}
+    for tenant_id, record in self.iter_all(folder, endpoint, query, max_workers):
+      results[tenant_id].append(record)
+    return results
@@ -1,32 +1,148 @@
 """Utility Functions for Supporting Other Modules"""
+import json
+import os
+import re
 import requests
 import time
-from servicepytan.auth import get_auth_headers, get_tenant_id
+from servicepytan.auth import get_auth_headers, get_tenant_id, invalidate_auth_token
+from servicepytan.cache import get_response_cache
+from servicepytan.connection import get_session
+from servicepytan.decoders import get_decoder
+from servicepytan.metrics import _response_size, get_metrics, request_event
+from servicepytan.ratelimit import get_rate_limiter, get_retry_policy, parse_retry_after
 
 import logging
 
-logging.basicConfig()
 logger = logging.getLogger(__name__)
 
-def request_json(url, options={}, payload={}, conn=None, request_type="GET", json_payload={}):
+def _http_method(request_type):
+  """Returns the HTTP method of a request type, accepting the legacy "DEL" for DELETE."""
+  method = request_type.upper()
+  return "DELETE" if method == "DEL" else method
+
+def send_request(request_type, url, conn=None, idempotent=None, **kwargs):
+  """Sends an authenticated request with rate limiting and retries.
+
+  Every request path in the library goes through this function. Before each
+  attempt it waits on the tenant's rate limiter so requests are paced below the
+  quota ahead of time. Idempotent requests (GET, HEAD, PUT and DELETE by default,
+  see `RetryPolicy.idempotent_methods`) are retried up to `max_attempts` times on
+  a status in the retry policy (429 and 5xx by default), connection errors and
+  timeouts. Other requests, such as POST and PATCH, may already have been applied
+  when the server fails or the response times out, so they are only retried on
+  429 and connect timeouts. 429 responses wait for the server's `Retry-After`
+  (and slow down every caller for the tenant), other failures use jittered
+  exponential backoff. A 401 drops the cached auth token and retries once with a
+  new one. Each call emits a "request" event to the connection's metrics hooks
+  (see `metrics.Metrics`).
+
+  Args:
+      request_type: HTTP method type ("GET", "POST", "PUT", "PATCH", "DELETE")
+      url: The complete URL for the API request
+      conn: Dictionary containing the credential configuration
+      idempotent: Whether the request is safe to send twice. Defaults to the retry
+          policy's verdict for `request_type`; pass True for POST requests that only
+          read data (e.g., report data requests).
+      **kwargs: Passed to `requests.Session.request` (params, data, json, stream, ...).
+          `headers` are sent in addition to the authentication headers.
+
+  Returns:
+      requests.Response: The last response received. Its status is not checked.
+
+  Raises:
+      requests.ConnectionError: If the connection keeps failing after every attempt
+      requests.Timeout: If the request keeps timing out after every attempt
+  """
+  request_type = _http_method(request_type)
+  session = get_session(conn)
+  policy = get_retry_policy(conn)
+  limiter = get_rate_limiter(conn)
+  shared_limiter = getattr(conn, "shared_rate_limiter", None)
+  metrics = get_metrics(conn)
+  extra_headers = kwargs.pop("headers", None) or {}
+  if idempotent is None:
+    idempotent = policy.is_idempotent(request_type)
+  attempt = 0
+  token_refreshed = False
+  started = time.perf_counter()
+  waited = 0.0
+  while True:
+    attempt += 1
+    if shared_limiter is not None:
+      waited += shared_limiter.acquire()
+    waited += limiter.acquire()
+    headers = dict(get_auth_headers(conn), **extra_headers)
+    sent = time.perf_counter()
+    try:
+      response = session.request(request_type, url, headers=headers, **kwargs)
+    except (requests.ConnectionError, requests.Timeout) as e:
+      # Only a connect timeout proves the server never received the request
+      if attempt >= policy.max_attempts or not (idempotent or isinstance(e, requests.ConnectTimeout)):
+        if metrics.enabled:
+          now = time.perf_counter()
+          metrics.emit(request_event(request_type, url, conn, seconds=now - started, latency=now - sent,
+                                     retries=attempt - 1, rate_limit_wait=waited, error=e.__class__.__name__))
+        raise
+      delay = policy.delay(attempt)
+      logger.warning(f"{e.__class__.__name__} on {url}. Retrying in {delay:.1f} seconds (attempt {attempt} of {policy.max_attempts})...")
+      time.sleep(delay)
+      continue
+
+    if response.status_code == 401 and not token_refreshed:
+      # The cached token was rejected (revoked or expired early), refresh it once and retry
+      token_refreshed = True
+      attempt -= 1
+      response.close()
+      invalidate_auth_token(conn, headers["Authorization"])
+      continue
+
+    retryable = idempotent or response.status_code == 429
+    if retryable and response.status_code in policy.retry_statuses and attempt < policy.max_attempts:
+      retry_after = parse_retry_after(response) if response.status_code == 429 else None
+      delay = policy.delay(attempt, retry_after)
+      if response.status_code == 429:
+        limiter.throttle(delay)
+        logger.warning(f"Rate Limit Exceeded. Retrying in {delay:.1f} seconds (attempt {attempt} of {policy.max_attempts})...")
+      else:
+        logger.warning(f"Server error {response.status_code} on {url}. Retrying in {delay:.1f} seconds (attempt {attempt} of {policy.max_attempts})...")
+      response.close()
+      time.sleep(delay)
+      continue
+
+    if response.ok:
+      limiter.recover()
+    if metrics.enabled:
+      now = time.perf_counter()
+      metrics.emit(request_event(request_type, url, conn, status=response.status_code, seconds=now - started,
+                                 latency=now - sent, size=_response_size(response, kwargs.get("stream", False)),
+                                 retries=attempt - 1, rate_limit_wait=waited))
+    return response
+
+def request_json(url, options={}, payload={}, conn=None, request_type="GET", json_payload={}, idempotent=None):
   """Makes the request to the API and returns JSON.
 
   Sends HTTP requests to the ServiceTitan API with proper authentication headers
   and handles various request types including GET, POST, PUT, PATCH, and DELETE.
+  Requests are sent through the connection's pooled session and retried on rate
+  limits and transient errors (see `send_request`). GET requests to endpoints
+  with a TTL are answered from the connection's `ResponseCache` when one is set.
+  Bodies are decoded by the connection's `JSONDecoder` (see `decoders.get_decoder`).
 
   Args:
       url: The complete URL for the API request
       options: Dictionary of query parameters to add to the URL for filtering
       payload: Dictionary containing form data for the request body
       conn: Dictionary containing the credential configuration
-      request_type: HTTP method type ("GET", "POST", "PUT", "PATCH", "DEL")
+      request_type: HTTP method type ("GET", "POST", "PUT", "PATCH", "DELETE")
       json_payload: Dictionary containing JSON data for the request body
+      idempotent: Whether the request is safe to retry after a server error (see `send_request`)
 
   Returns:
       dict: JSON response from the API
 
   Raises:
-      requests.HTTPError: If the API request fails
+      requests.HTTPError: If the API request fails, including when it is still
+          rate limited after every retry
       
   Examples:
       >>> response = request_json(
@@ -35,14 +151,25 @@ def request_json(url, options={}, payload={}, conn=None, request_type="GET", jso
       ...     conn=connection_config
       ... )
   """
-  headers = get_auth_headers(conn)
-  response = requests.request(request_type, url, data=payload, headers=headers, params=options, json=json_payload)
+  cache = get_response_cache(conn)
+  ttl = cache.ttl_for(url) if cache is not None and request_type == "GET" else 0
+  if ttl > 0:
+    body = cache.get(get_tenant_id(conn), url, options)
+    if body is not None:
+      metrics = get_metrics(conn)
+      if metrics.enabled:
+        metrics.emit(request_event(request_type, url, conn, status=200, size=len(body), cached=True))
+      return get_decoder(conn).decode(body, url)
+
+  response = send_request(request_type, url, conn=conn, idempotent=idempotent, data=payload, params=options,
+                          json=json_payload)
   if response.status_code != requests.codes.ok:
-    logger.error(f"Error fetching data (url={url}, heads={headers}, data={payload}, json={json_payload}): {response.text}")
-    if response.status_code != 429:
-      response.raise_for_status()
-      
-  return response.json()
+    logger.error(f"Error fetching data (url={url}, data={payload}, json={json_payload}): {response.text}")
+    response.raise_for_status()
+
+  if ttl > 0:
+    cache.set(get_tenant_id(conn), url, options, response.content, ttl)
+  return get_decoder(conn).decode(response.content, url)
 
 def check_default_options(options):
   """Add sensible defaults to options when not defined.
@@ -175,25 +302,26 @@ def sleep_with_countdown(sleep_time):
   logger.info("")
   pass
 
-def request_json_with_retry(url, options={}, payload="", conn=None, request_type="GET", json_payload=""):
+def request_json_with_retry(url, options={}, payload="", conn=None, request_type="GET", json_payload="", idempotent=None):
   """Makes the request to the API and returns JSON with automatic retry for rate limits.
 
-  Enhanced version of request_json that automatically handles rate limiting by
-  detecting 429 status codes and retrying after the specified wait time.
+  Kept for backwards compatibility: `request_json` now retries rate limited and
+  failed requests itself using the connection's retry policy.
 
   Args:
       url: The complete URL for the API request
       options: Dictionary of query parameters to add to the URL for filtering
       payload: Dictionary containing form data for the request body
       conn: Dictionary containing the credential configuration
-      request_type: HTTP method type ("GET", "POST", "PUT", "PATCH", "DEL")
+      request_type: HTTP method type ("GET", "POST", "PUT", "PATCH", "DELETE")
       json_payload: Dictionary containing JSON data for the request body
+      idempotent: Whether the request is safe to retry after a server error (see `send_request`)
 
   Returns:
       dict: JSON response from the API
 
   Raises:
-      requests.HTTPError: If the API request fails (non-rate-limit errors)
+      requests.HTTPError: If the API request fails after every retry
       
   Examples:
       >>> response = request_json_with_retry(
@@ -203,15 +331,8 @@ def request_json_with_retry(url, options={}, payload="", conn=None, request_type
       ... )
       >>> # Automatically retries if rate limited
   """
-  response = request_json(url, options=options, payload=payload, conn=conn, request_type=request_type, json_payload=json_payload)
-  if "traceId" in response:
-    if response['status'] == 429:
-        sleep_time = response['title'].split(" ")[-2]
-        logger.warning("Rate Limit Exceeded. Retrying in {} seconds...".format(sleep_time))
-        sleep_with_countdown(int(sleep_time))
-        response = request_json_with_retry(url, options=options, payload=payload, conn=conn, request_type=request_type, json_payload=json_payload)
-  
-  return response
+  return request_json(url, options=options, payload=payload, conn=conn, request_type=request_type,
+                      json_payload=json_payload, idempotent=idempotent)
 
 def request_contents(url, options={}, conn=None):
   """Fetches the contents of a URL with optional query parameters.
@@ -227,11 +348,135 @@ def request_contents(url, options={}, conn=None):
   Raises:
       requests.HTTPError: If the API request fails
   """
-  response = requests.get(url, params=options, headers=get_auth_headers(conn))
-  response.raise_for_status()
-  
+  response = send_request("GET", url, conn=conn, params=options)
   if response.status_code != requests.codes.ok:
     logger.error(f"Error fetching contents (url={url}, options={options}): {response.text}")
     response.raise_for_status()
 
-  return response.content
\ No newline at end of file
+  return response.content
+
+# Size of the chunks read from streamed downloads
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+_CONTENT_RANGE = re.compile(r"bytes\s+(?:(?P<start>\d+)-\d+|\*)/(?P<total>\d+|\*)")
+
+def _parse_content_range(response):
+  """Returns (start, total) from a Content-Range header ("bytes 100-1233/1234"), each None if unknown."""
+  match = _CONTENT_RANGE.match(response.headers.get("Content-Range", "").strip())
+  if match is None:
+    return None, None
+  start = int(match.group("start")) if match.group("start") else None
+  total = int(match.group("total")) if match.group("total").isdigit() else None
+  return start, total
+
+def _read_download_state(path):
+  """Returns the state saved next to a `.part` file, or None if missing or unreadable."""
+  try:
+    with open(path) as f:
+      return json.load(f)
+  except (OSError, ValueError):
+    return None
+
+def _write_download_state(path, response):
+  """Saves the total size and validators of a download so a later resume can be checked, and returns them."""
+  length = response.headers.get("Content-Length", "")
+  encoded = response.headers.get("Content-Encoding", "identity") != "identity"
+  etag = response.headers.get("ETag")
+  state = {
+    # The bytes written are decoded, so an encoded length says nothing about the file size
+    "total": int(length) if length.isdigit() and not encoded else None,
+    "etag": etag if etag and not etag.startswith("W/") else None,
+    "last_modified": response.headers.get("Last-Modified"),
+  }
+  with open(path, "w") as f:
+    json.dump(state, f)
+  return state
+
+def download_to_file(url, filename, options={}, conn=None, chunk_size=DOWNLOAD_CHUNK_SIZE, resume=True, limiter=None):
+  """Streams the contents of a URL to a file without holding it in memory.
+
+  Chunks are written to `<filename>.part`, which is renamed to `filename` once the
+  download is complete, so `filename` never holds a partial file. The size and
+  validators (ETag, Last-Modified) of the download are saved to
+  `<filename>.part.json`. If the download is interrupted, it continues from the
+  end of the `.part` file with a `Range` request sent with `If-Range` (when `resume`
+  is True). The download starts over instead when the server answers with the
+  whole file, a range that does not start at the end of the `.part` file or a
+  different total size, and when a `.part` file has no saved state.
+
+  Args:
+      url: The complete URL for the API request
+      filename: Path the file is saved to
+      options: Dictionary of query parameters to add to the URL
+      conn: Dictionary containing the credential configuration
+      chunk_size: Number of bytes read and written at a time
+      resume: Whether to continue from an existing `.part` file
+      limiter: Optional `TokenBucket` limiting the download rate in bytes per second
+
+  Returns:
+      int: Size of the downloaded file in bytes
+
+  Raises:
+      requests.HTTPError: If the API request fails
+      requests.ConnectionError: If the connection keeps dropping after every retry
+  """
+  part_filename = f"{filename}.part"
+  state_filename = f"{part_filename}.json"
+  state = _read_download_state(state_filename) if resume else None
+  policy = get_retry_policy(conn)
+  attempt = 0
+  while True:
+    attempt += 1
+    offset = os.path.getsize(part_filename) if state is not None and os.path.exists(part_filename) else 0
+    headers = {}
+    if offset:
+      headers["Range"] = f"bytes={offset}-"
+      validator = state.get("etag") or state.get("last_modified")
+      if validator:
+        # The server sends the whole file instead if it changed since the .part was written
+        headers["If-Range"] = validator
+    response = send_request("GET", url, conn=conn, params=options, headers=headers, stream=True)
+    try:
+      start, total = _parse_content_range(response)
+      if response.status_code == 416 and offset and total == offset == state.get("total"):
+        # The previous attempt already received every byte
+        break
+      if response.status_code not in (requests.codes.ok, requests.codes.partial_content):
+        logger.error(f"Error downloading file (url={url}, options={options}): {response.status_code}")
+        response.raise_for_status()
+      if response.status_code == requests.codes.partial_content and offset:
+        expected_total = state.get("total")
+        if start != offset or (expected_total is not None and total != expected_total):
+          logger.warning(f"Download of {url} returned range {start}/{total} instead of {offset}/{expected_total}. Starting over...")
+          state = None
+          continue
+        mode = "ab"
+      else:
+        state = _write_download_state(state_filename, response)
+        mode = "wb"
+      with open(part_filename, mode) as f:
+        for chunk in response.iter_content(chunk_size):
+          if limiter is not None:
+            limiter.acquire(len(chunk))
+          f.write(chunk)
+      break
+    except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+      if attempt >= policy.max_attempts:
+        raise
+      logger.warning(f"Download of {url} interrupted ({e}). Resuming (attempt {attempt} of {policy.max_attempts})...")
+    finally:
+      response.close()
+
+  os.replace(part_filename, filename)
+  if os.path.exists(state_filename):
+    os.remove(state_filename)
+  return os.path.getsize(filename)
+
+def get_content_length(url, options={}, conn=None):
+  """Returns the size in bytes reported by a HEAD request, or None if unknown."""
+  try:
+    response = send_request("HEAD", url, conn=conn, params=options)
+  except requests.RequestException:
+    return None
+  length = response.headers.get("Content-Length")
+  return int(length) if response.ok and length and length.isdigit() else None
@@ -13,6 +13,11 @@ with open('HISTORY.rst') as history_file:
 requirements = ['Click>=7.0', 'requests', 'python-dateutil', 'pytz','python-dotenv','pyyaml']
 
 # Optional dependencies for data analysis
+extras_requirements = {
+    'async': ['httpx'],
+    'columnar': ['numpy', 'pyarrow', 'pandas'],
+    'fastjson': ['orjson', 'msgspec'],
+}
 
 test_requirements = [ ]
 
@@ -39,6 +44,7 @@ setup(
         ],
     },
     install_requires=requirements,
+    extras_require=extras_requirements,
     license="MIT license",
     long_description=readme + '\n\n' + history,
     long_description_content_type='text/x-rst',
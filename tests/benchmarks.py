@@ -0,0 +1,230 @@
+"""Throughput benchmarks for the pagination modes, run against `MockServiceTitan`.
+
+For every mode this reports the requests sent, records received, requests per
+second, records per second, peak traced memory and the time to the first
+record. Run it from the repository root:
+
+    python -m tests.benchmarks --records 50000 --latency 0.02
+    python -m tests.benchmarks --records 20000 --rate-limit-every 25 --json results.json
+
+The client's rate limits are lifted (unless ``--rate-limit`` is given) so the
+numbers measure the client and the pagination strategy rather than the pacing.
+"""
+
+import argparse
+import itertools
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import servicepytan
+from servicepytan.auth import get_auth_token
+from servicepytan.reports import set_report_rate_limit
+
+try:
+    from tests.mock_server import MockServiceTitan
+except ImportError:
+    from mock_server import MockServiceTitan
+
+REPORT_CATEGORY = "operations"
+
+_tenant_ids = itertools.count(1000)
+_report_ids = itertools.count(1)
+
+
+def _scenarios(page_size, max_workers):
+    """Returns (name, pull) pairs; each pull takes a connection and returns an iterable of records."""
+    query = {"pageSize": page_size}
+
+    def report(conn, workers):
+        report = servicepytan.Report(REPORT_CATEGORY, next(_report_ids), conn=conn)
+        # The 5 requests per minute report limit would dominate every run
+        set_report_rate_limit(report.report_id, 600000, conn)
+        for page in report.iter_data(page_size=5000, max_workers=workers):
+            yield from page["data"]
+
+    return [
+        ("get_all", lambda conn: servicepytan.Endpoint("jpm", "jobs", conn).get_all(dict(query))),
+        (f"get_all(max_workers={max_workers})",
+         lambda conn: servicepytan.Endpoint("jpm", "jobs", conn).get_all(dict(query), max_workers=max_workers)),
+        ("iter_all", lambda conn: servicepytan.Endpoint("jpm", "jobs", conn).iter_all(dict(query))),
+        (f"iter_all(max_workers={max_workers})",
+         lambda conn: servicepytan.Endpoint("jpm", "jobs", conn).iter_all(dict(query), max_workers=max_workers)),
+        ("export_all", lambda conn: servicepytan.Endpoint("jpm", "export", conn).export_all("jobs")),
+        ("iter_export", lambda conn: servicepytan.Endpoint("jpm", "export", conn).iter_export("jobs")),
+        ("Report.iter_data", lambda conn: report(conn, 1)),
+        (f"Report.iter_data(max_workers={max_workers})", lambda conn: report(conn, max_workers)),
+    ]
+
+
+def _run(server, pull, rate_limit, trace_memory):
+    # Each run uses a new tenant ID, so it starts with its own rate limiter
+    conn = servicepytan.Connection(server.config(next(_tenant_ids)), rate_limit=rate_limit or 10000)
+    # Fetch the token before measuring so every run starts from the same state
+    get_auth_token(conn)
+    server.reset_stats()
+    records = 0
+    first_record = None
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        for _ in pull(conn):
+            if first_record is None:
+                first_record = time.perf_counter() - start
+            records += 1
+        seconds = time.perf_counter() - start
+        if trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+        conn.close()
+    return records, seconds, first_record, peak
+
+
+def measure(server, pull, rate_limit=None):
+    """Runs one pull against the server and returns its measurements.
+
+    The pull is run twice: once with tracemalloc for the peak memory and once
+    for the timings, as tracing slows the client down several times over.
+
+    Returns:
+        dict: 'requests', 'records', 'seconds', 'requests_per_second',
+            'records_per_second', 'peak_memory_mb', 'time_to_first_record'
+            and 'rate_limited'
+    """
+    # The traced run goes first, so the timed run also finds the mock's pages already encoded
+    peak = _run(server, pull, rate_limit, trace_memory=True)[3]
+    records, seconds, first_record, _ = _run(server, pull, rate_limit, trace_memory=False)
+    requests, rate_limited = server.stats["requests"], server.stats["rate_limited"]
+    return {
+        "requests": requests,
+        "records": records,
+        "seconds": round(seconds, 4),
+        "requests_per_second": round(requests / seconds, 1),
+        "records_per_second": round(records / seconds, 1),
+        "peak_memory_mb": round(peak / 2 ** 20, 2),
+        "time_to_first_record": round(first_record, 4) if first_record is not None else None,
+        "rate_limited": rate_limited,
+    }
+
+
+def run_benchmarks(records=10000, latency=0.005, rate_limit_every=0, page_size=500, max_workers=8,
+                   rate_limit=None, modes=None):
+    """Runs every pagination mode against a fresh mock server.
+
+    Args:
+        records: Number of records served by each endpoint
+        latency: Seconds of server latency per request
+        rate_limit_every: Answer every Nth request with a 429 (0 disables it)
+        page_size: Page size of the list endpoint modes
+        max_workers: Workers of the concurrent modes
+        rate_limit: Client requests per second (None lifts the limit)
+        modes: Optional list of mode names to run
+
+    Returns:
+        list: One measurement dictionary per mode, with its 'mode' name
+    """
+    results = []
+    with MockServiceTitan(records=records, latency=latency, rate_limit_every=rate_limit_every) as server:
+        for name, pull in _scenarios(page_size, max_workers):
+            if modes and name not in modes:
+                continue
+            results.append({"mode": name, **measure(server, pull, rate_limit)})
+    return results
+
+
+def _import_lines(statement):
+    """Returns (name, cumulative microseconds, is top level) for every module `python -X importtime` reports."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            capture_output=True, text=True, check=True)
+    lines = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Top-level entries have a single space of indentation and include their own imports
+        lines.append((name.strip(), int(cumulative), not name.startswith("  ")))
+    return lines
+
+
+def import_time(statement="import servicepytan", runs=5):
+    """Measures the cold import time of the package in fresh interpreters.
+
+    Modules the interpreter imports on start-up (measured with `python -c pass`)
+    are left out, so the result only covers what the statement imports.
+
+    Args:
+        statement: Python code to time (e.g., "import servicepytan; servicepytan.Endpoint")
+        runs: Number of interpreters started; the fastest run is kept
+
+    Returns:
+        dict: 'seconds' (cumulative import time of the modules the statement imports) and
+            'modules' (every module imported by the statement)
+    """
+    start_up = {name for name, _, _ in _import_lines("pass")}
+    best = None
+    for _ in range(runs):
+        lines = [line for line in _import_lines(statement) if line[0] not in start_up]
+        microseconds = sum(cumulative for _, cumulative, top_level in lines if top_level)
+        if best is None or microseconds < best["seconds"] * 1e6:
+            best = {"seconds": microseconds / 1e6, "modules": [name for name, _, _ in lines]}
+    return best
+
+
+def format_results(results):
+    """Formats benchmark results as a text table."""
+    columns = [
+        ("mode", "mode", "{}"),
+        ("requests", "reqs", "{}"),
+        ("records", "records", "{}"),
+        ("seconds", "secs", "{:.3f}"),
+        ("requests_per_second", "req/s", "{:.1f}"),
+        ("records_per_second", "rec/s", "{:.0f}"),
+        ("peak_memory_mb", "peak MB", "{:.2f}"),
+        ("time_to_first_record", "first rec s", "{:.4f}"),
+        ("rate_limited", "429s", "{}"),
+    ]
+    rows = [[label for _, label, _ in columns]]
+    for result in results:
+        rows.append(["-" if result[key] is None else template.format(result[key]) for key, _, template in columns])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) if i == 0 else cell.rjust(width) for i, (cell, width) in enumerate(zip(row, widths)))
+        for row in rows
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--records", type=int, default=10000, help="records served by each endpoint")
+    parser.add_argument("--latency", type=float, default=0.005, help="server latency per request in seconds")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every Nth request with a 429")
+    parser.add_argument("--page-size", type=int, default=500, help="page size of the list endpoint modes")
+    parser.add_argument("--max-workers", type=int, default=8, help="workers of the concurrent modes")
+    parser.add_argument("--rate-limit", type=float, default=None, help="client requests per second (default: unlimited)")
+    parser.add_argument("--mode", action="append", dest="modes", help="only run this mode (repeatable)")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this JSON file")
+    parser.add_argument("--imports", action="store_true", help="only measure the package's import time")
+    args = parser.parse_args(argv)
+
+    if args.imports:
+        for statement in ("import servicepytan", "import servicepytan; servicepytan.Endpoint",
+                          "import servicepytan; servicepytan.DataService"):
+            print(f"{import_time(statement)['seconds'] * 1000:8.1f} ms  {statement}")
+        return
+
+    results = run_benchmarks(args.records, args.latency, args.rate_limit_every, args.page_size,
+                             args.max_workers, args.rate_limit, args.modes)
+    print(format_results(results))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+"""Local stand-in for the ServiceTitan API used by the tests and benchmarks.
+
+`MockServiceTitan` serves, on a local port:
+
+- ``POST /connect/token``: OAuth client credentials tokens, numbered so tests
+  can tell them apart; revoked tokens are answered with a 401
+- ``GET /{folder}/v2/tenant/{tenant}/{endpoint}``: paginated lists with ``page``,
+  ``pageSize``, ``includeTotal``, ``ids``, ``jobStatus`` and date filters such as
+  ``createdOnOrAfter``/``createdBefore`` (endpoints in ``unfiltered_endpoints``
+  ignore the ``ids`` filter; ``estimates`` records also have ``soldOn`` and ``items``)
+- ``GET /{folder}/v2/tenant/{tenant}/{endpoint}/{id}``: single records
+- ``GET /{folder}/v2/tenant/{tenant}/export/{endpoint}``: exports with
+  ``continueFrom`` tokens
+- ``GET .../reporting/v2/tenant/{tenant}/report-category/{category}/reports/{id}``:
+  report metadata
+- ``POST .../reports/{id}/data``: report pages with ``totalCount`` (or the stale
+  ``report_total_count`` when it is set)
+- ``POST``, ``PUT``, ``PATCH`` and ``DELETE`` on records: recorded in
+  ``writes`` and answered with the record's id
+- ``GET``/``HEAD .../forms/v2/tenant/{tenant}/jobs/attachment/{id}``: the bytes in
+  ``files[id]``, with an ``ETag`` and ``Range``/``If-Range`` support
+
+Every endpoint serves the same generated records. Encoded pages are cached,
+so the server spends little CPU (and GIL time) once a page has been served.
+The server can add latency to each response, answer every Nth request with
+a 429 and a Retry-After header, and answer every Nth request with a server
+error.
+"""
+
+import hashlib
+import json
+import sys
+import threading
+import time
+import traceback
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+REPORT_FIELDS = [
+    {"name": "Id", "label": "Id", "dataType": "Number"},
+    {"name": "JobNumber", "label": "Job Number", "dataType": "String"},
+    {"name": "Total", "label": "Total", "dataType": "Number"},
+    {"name": "CompletedOn", "label": "Completed On", "dataType": "Date"},
+]
+
+
+def make_record(index):
+    """Returns a job-like record for a record index."""
+    return {
+        "id": index + 1,
+        "jobNumber": str(100000 + index),
+        "customerId": 5000 + index % 997,
+        "locationId": 9000 + index % 1013,
+        "jobStatus": "Completed" if index % 4 else "Canceled",
+        "completedOn": f"2024-01-{index % 28 + 1:02d}T15:30:00.1234567Z",
+        "businessUnitId": 10 + index % 7,
+        "jobTypeId": 20 + index % 11,
+        "priority": "Normal",
+        "summary": f"Replace unit and inspect ductwork #{index}",
+        "noCharge": False,
+        "createdOn": f"2024-01-{index % 28 + 1:02d}T09:00:00Z",
+        "modifiedOn": f"2024-01-{index % 28 + 1:02d}T16:00:00Z",
+        "tagTypeIds": [1, 2, 3][: index % 4],
+        "externalData": None,
+    }
+
+
+def make_estimate(index):
+    """Returns an estimate-like record, with sold items, for a record index."""
+    record = make_record(index)
+    return dict(record, soldOn=record["createdOn"], items=[
+        {"id": index * 10 + 1, "total": 100 + index % 50},
+        {"id": index * 10 + 2, "total": round(index * 0.25, 2)},
+    ])
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        # One handler serves every request of a keep-alive connection
+        super().setup()
+        self.server.mock.count("connections")
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def do_PUT(self):
+        self._handle()
+
+    def do_PATCH(self):
+        self._handle()
+
+    def do_DELETE(self):
+        self._handle()
+
+    def do_HEAD(self):
+        self._handle()
+
+    def _send(self, status, payload, headers=None):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.mock.count("bytes", len(body))
+
+    def _send_file(self, id):
+        mock = self.server.mock
+        body = mock.files.get(id)
+        if body is None:
+            return self._send(404, {"status": 404, "title": "Not Found"})
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+        status, start = 200, 0
+        requested = self.headers.get("Range")
+        if requested and (mock.ignore_if_range or self.headers.get("If-Range", etag) == etag):
+            mock.range_requests.append(requested)
+            start = int(requested.split("=")[1].split("-")[0])
+            if start >= len(body):
+                return self._send(416, b"", {"Content-Range": f"bytes */{len(body)}"})
+            start = max(start + mock.range_start_shift, 0)
+            status = 206
+            headers["Content-Range"] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+        content = body[start:]
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+        with mock._lock:
+            cut, mock.cut_download_after = mock.cut_download_after, 0
+        if cut:
+            # Drop the connection partway through, like a network failure
+            self.wfile.write(content[:cut])
+            self.close_connection = True
+            return
+        self.wfile.write(content)
+
+    def _handle(self):
+        mock = self.server.mock
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        parts = url.path.strip("/").split("/")
+
+        if url.path == "/connect/token":
+            return self._send(200, mock.issue_token())
+
+        if self.headers.get("Authorization") in mock.revoked_tokens:
+            return self._send(401, {"status": 401, "title": "Unauthorized"})
+
+        # Requests are counted on arrival, so a client that timed out has still been counted
+        status = mock.injected_status()
+        if mock.latency:
+            time.sleep(mock.latency)
+        if status == 429:
+            return self._send(
+                429,
+                {"status": 429, "title": f"Rate limit is exceeded. Try again in {mock.retry_after:g} seconds."},
+                {"Retry-After": f"{mock.retry_after:g}"},
+            )
+        if status is not None:
+            return self._send(status, {"status": status, "title": "Server Error"})
+        if len(parts) < 4 or parts[1] != "v2" or parts[2] != "tenant":
+            return self._send(404, {"status": 404, "title": "Not Found"})
+
+        folder, resource = parts[0], parts[4:]
+        if resource[:2] == ["jobs", "attachment"] and len(resource) == 3:
+            return self._send_file(resource[2])
+        if folder == "reporting" and resource[:1] == ["report-category"]:
+            if resource[-1] == "data":
+                # The stale total is part of the cached page's key
+                return self._send(200, mock.encoded("report_page", dict(query, totalCount=mock.report_total_count)))
+            return self._send(200, {"id": int(resource[3]), "name": "Mock Report", "fields": REPORT_FIELDS, "parameters": []})
+        if self.command != "GET" and folder != "reporting":
+            return self._send(200, mock.write(self.command, "/".join(resource), body))
+        if resource[:1] == ["export"]:
+            return self._send(200, mock.encoded("export_page", query))
+        if len(resource) == 2:
+            record = mock.record(resource[1])
+            if record is None:
+                return self._send(404, {"status": 404, "title": "Not Found"})
+            return self._send(200, record)
+        if resource[0] in mock.unfiltered_endpoints:
+            query.pop("ids", None)
+        if resource[0] == "estimates":
+            return self._send(200, mock.encoded("estimate_page", query))
+        return self._send(200, mock.encoded("list_page", query))
+
+
+class MockServiceTitan:
+    """A local ServiceTitan API stand-in running on a background thread.
+
+    Attributes:
+        records: Number of records served by every endpoint.
+        latency: Seconds added to every API response (not the token endpoint).
+        rate_limit_every: Answer every Nth API request with a 429 (0 disables it).
+        retry_after: Seconds sent in the Retry-After header of 429 responses.
+        error_every: Answer every Nth API request with `error_status` (0 disables it).
+        error_status: Status of the injected server errors.
+        export_page_size: Records per export page.
+        token_lifetime: Seconds sent as the `expires_in` of new tokens.
+        revoked_tokens: Tokens answered with a 401 (see `revoke_tokens`).
+        stats: Counts of "requests", "token_requests", "rate_limited", "errors", "bytes"
+            served and TCP "connections" accepted.
+        writes: (method, path, body) of every write request received, in order.
+        unfiltered_endpoints: Names of list endpoints that ignore the ``ids`` filter.
+        files: Dictionary of attachment id to the bytes served for it.
+        cut_download_after: Drop the next attachment download after this many bytes (0 disables it).
+        range_start_shift: Bytes added to the start of every ranged response, to mimic a
+            server answering a different range than requested.
+        ignore_if_range: Whether ranges are served even when ``If-Range`` does not match.
+        range_requests: ``Range`` headers of the ranged attachment responses served.
+
+    Examples:
+        >>> with MockServiceTitan(records=10000, latency=0.005) as server:
+        ...     conn = servicepytan.Connection(server.config())
+        ...     jobs = servicepytan.Endpoint("jpm", "jobs", conn).get_all({"pageSize": 500})
+    """
+
+    def __init__(self, records=1000, latency=0.0, rate_limit_every=0, retry_after=0.01, export_page_size=500,
+                 token_lifetime=900, error_every=0, error_status=503):
+        self.records = records
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.export_page_size = export_page_size
+        self.token_lifetime = token_lifetime
+        self.error_every = error_every
+        self.error_status = error_status
+        self.writes = []
+        self.unfiltered_endpoints = set()
+        self.files = {}
+        self.cut_download_after = 0
+        self.range_start_shift = 0
+        self.ignore_if_range = False
+        self.range_requests = []
+        self.report_total_count = None
+        self.revoked_tokens = set()
+        self.issued_tokens = []
+        self.stats = {"requests": 0, "token_requests": 0, "rate_limited": 0, "errors": 0, "bytes": 0,
+                      "connections": 0}
+        self._lock = threading.Lock()
+        self._pages = {}
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def config(self, tenant_id="1"):
+        """Returns a connection configuration pointing at the server."""
+        return {
+            "SERVICETITAN_APP_KEY": "mock-app-key",
+            "SERVICETITAN_TENANT_ID": str(tenant_id),
+            "SERVICETITAN_CLIENT_ID": f"mock-client-{id(self)}",
+            "SERVICETITAN_CLIENT_SECRET": "mock-secret",
+            "SERVICETITAN_APP_ID": "mock-app",
+            "SERVICETITAN_TIMEZONE": "UTC",
+            "SERVICETITAN_API_ENVIRONMENT": "production",
+            "auth_root": self.url,
+            "api_root": self.url,
+        }
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self._server.handle_error = self._handle_error
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @staticmethod
+    def _handle_error(request, client_address):
+        # Clients that time out close their socket before the response is written
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            traceback.print_exc()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def reset_stats(self):
+        with self._lock:
+            for name in self.stats:
+                self.stats[name] = 0
+            self.writes.clear()
+            self.range_requests.clear()
+
+    def issue_token(self):
+        """Returns a token response with a new, numbered access token."""
+        with self._lock:
+            self.stats["token_requests"] += 1
+            token = f"mock-token-{len(self.issued_tokens) + 1}"
+            self.issued_tokens.append(token)
+        return {"access_token": token, "token_type": "Bearer", "expires_in": self.token_lifetime}
+
+    def revoke_tokens(self):
+        """Answers every token issued so far with a 401."""
+        with self._lock:
+            self.revoked_tokens.update(self.issued_tokens)
+
+    def injected_status(self):
+        """Counts an API request and returns the status of the failure to answer it with, if any."""
+        with self._lock:
+            self.stats["requests"] += 1
+            if self.rate_limit_every and self.stats["requests"] % self.rate_limit_every == 0:
+                self.stats["rate_limited"] += 1
+                return 429
+            if self.error_every and self.stats["requests"] % self.error_every == 0:
+                self.stats["errors"] += 1
+                return self.error_status
+        return None
+
+    def write(self, method, path, body):
+        """Records a write request and returns the response body."""
+        payload = json.loads(body) if body.startswith(b"{") else body.decode()
+        with self._lock:
+            self.writes.append((method, path, payload))
+            created = self.records + len(self.writes)
+        parts = path.split("/")
+        return {"id": int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else created}
+
+    def encoded(self, kind, query):
+        """Returns the JSON body of a page, encoding it on first use."""
+        key = (kind, tuple(sorted(query.items())))
+        body = self._pages.get(key)
+        if body is None:
+            body = self._pages[key] = json.dumps(getattr(self, kind)(query)).encode()
+        return body
+
+    def record(self, id):
+        try:
+            index = int(id) - 1
+        except ValueError:
+            return None
+        return make_record(index) if 0 <= index < self.records else None
+
+    def list_page(self, query, make=make_record):
+        page = int(query.get("page", 1))
+        page_size = min(int(query.get("pageSize", 50)), 5000)
+        if query.get("ids"):
+            indexes = [int(id) - 1 for id in query["ids"].split(",") if id.strip()]
+            indexes = [index for index in indexes if 0 <= index < self.records]
+        else:
+            indexes = range(self.records)
+        filters = {key: value for key, value in query.items() if key == "jobStatus" or key.endswith(("OnOrAfter", "Before"))}
+        if filters:
+            indexes = [index for index in indexes if self._matches(make(index), filters)]
+        selected = indexes[(page - 1) * page_size: page * page_size]
+        response = {
+            "page": page,
+            "pageSize": page_size,
+            "hasMore": page * page_size < len(indexes),
+            "data": [make(index) for index in selected],
+        }
+        if str(query.get("includeTotal", "")).lower() == "true":
+            response["totalCount"] = len(indexes)
+        return response
+
+    def estimate_page(self, query):
+        return self.list_page(query, make_estimate)
+
+    @staticmethod
+    def _matches(record, filters):
+        for key, value in filters.items():
+            if key == "jobStatus":
+                if record["jobStatus"] != value:
+                    return False
+            elif key.endswith("OnOrAfter"):
+                if record[key[:-len("OnOrAfter")] + "On"] < value:
+                    return False
+            elif record[key[:-len("Before")] + "On"] >= value:
+                return False
+        return True
+
+    def export_page(self, query):
+        start = int(query.get("from") or 0)
+        end = min(start + self.export_page_size, self.records)
+        return {
+            "data": [make_record(index) for index in range(start, end)],
+            "hasMore": end < self.records,
+            "continueFrom": str(end),
+        }
+
+    def report_page(self, query):
+        page = int(query.get("page", 1))
+        page_size = min(int(query.get("pageSize", 5000)), 5000)
+        start, end = (page - 1) * page_size, min(page * page_size, self.records)
+        rows = []
+        for index in range(start, end):
+            record = make_record(index)
+            rows.append([record["id"], record["jobNumber"], round(index * 1.25, 2), record["completedOn"]])
+        return {
+            "fields": REPORT_FIELDS,
+            "page": page,
+            "pageSize": page_size,
+            "hasMore": end < self.records,
+            "totalCount": self.records if query.get("totalCount") is None else query["totalCount"],
+            "data": rows,
+        }
+
+
+class MockServerTestCase(unittest.TestCase):
+    """Test case running one `MockServiceTitan` for all of its tests.
+
+    Subclasses can set `server_options` to configure the server.
+    """
+
+    server_options = {}
+
+    @classmethod
+    def setUpClass(cls):
+        """Start the mock server."""
+        cls.server = MockServiceTitan(**cls.server_options).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the mock server."""
+        cls.server.stop()
+
+    def setUp(self):
+        """Reset the server's failure injection and counters."""
+        self.server.rate_limit_every = 0
+        self.server.error_every = 0
+        self.server.latency = 0.0
+        self.server.report_total_count = None
+        self.server.reset_stats()
+
+    def connect(self, tenant_id="1", **kwargs):
+        """Returns a connection to the server, closed at the end of the test."""
+        from servicepytan.connection import Connection
+        from servicepytan.ratelimit import RetryPolicy
+        kwargs.setdefault("rate_limit", 10000)
+        kwargs.setdefault("retry_policy", RetryPolicy(max_attempts=3, backoff_base=0.01))
+        conn = Connection(self.server.config(tenant_id), **kwargs)
+        self.addCleanup(conn.close)
+        return conn
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+
+"""Tests for the asyncio client in `servicepytan.aio`."""
+
+
+import asyncio
+import unittest
+
+import httpx
+
+import servicepytan
+from servicepytan.aio import AsyncClient, AsyncEndpoint, AsyncReport, _gather_ordered
+from servicepytan.reports import Report, set_report_rate_limit
+
+from tests.mock_server import MockServerTestCase
+
+
+class TestGatherOrdered(unittest.TestCase):
+    """Tests for `_gather_ordered`."""
+
+    def test_results_are_ordered_and_bounded(self):
+        """Results keep input order and at most `limit` coroutines are scheduled at once."""
+        running = [0]
+        peak = [0]
+
+        async def call(item):
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            await asyncio.sleep((10 - item % 10) * 0.001)
+            running[0] -= 1
+            return item
+
+        results = asyncio.run(_gather_ordered((call(item) for item in range(50)), limit=4))
+        self.assertEqual(results, list(range(50)))
+        self.assertLessEqual(peak[0], 4)
+
+    def test_failure_cancels_scheduled_coroutines(self):
+        """The first failure is raised and scheduled coroutines are cancelled."""
+        created = []
+        cancelled = []
+
+        async def call(item):
+            created.append(item)
+            try:
+                if item == 0:
+                    raise ValueError("page failed")
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(item)
+                raise
+
+        with self.assertRaisesRegex(ValueError, "page failed"):
+            asyncio.run(_gather_ordered((call(item) for item in range(100)), limit=3))
+        self.assertEqual(created, [0, 1, 2])
+        self.assertEqual(sorted(cancelled), [1, 2])
+
+
+class TestAsyncClient(MockServerTestCase):
+    """Tests for `AsyncEndpoint` and `AsyncReport` against the local mock API."""
+
+    server_options = {"records": 1234, "export_page_size": 500}
+
+    def test_get_all_matches_the_blocking_client(self):
+        """Concurrent async paging returns the same records as `Endpoint.get_all`."""
+        conn = self.connect()
+        expected = servicepytan.Endpoint("jpm", "jobs", conn).get_all({"pageSize": 100})
+
+        async def main():
+            async with AsyncClient(conn, max_concurrency=4) as client:
+                endpoint = AsyncEndpoint("jpm", "jobs", client=client)
+                return await endpoint.get_all({"pageSize": 100}), await endpoint.get_all({"pageSize": 100}, concurrent=False)
+
+        concurrent, sequential = asyncio.run(main())
+        self.assertEqual(concurrent, expected)
+        self.assertEqual(sequential, expected)
+
+    def test_export_all(self):
+        """Exports follow continueFrom tokens."""
+        async def main():
+            async with AsyncEndpoint("jpm", "export", self.connect()) as endpoint:
+                return await endpoint.export_all("jobs")
+
+        self.assertEqual(len(asyncio.run(main())), 1234)
+
+    def test_owned_client_is_closed(self):
+        """An endpoint closes the client it created, but not a shared one."""
+        conn = self.connect()
+
+        async def main():
+            async with AsyncEndpoint("jpm", "jobs", conn) as endpoint:
+                await endpoint.get_one(1)
+                pool = endpoint.client._client
+            async with AsyncClient(conn) as client:
+                async with AsyncEndpoint("jpm", "jobs", client=client) as shared:
+                    await shared.get_one(1)
+                self.assertIsNotNone(client._client)
+            return endpoint, pool
+
+        endpoint, pool = asyncio.run(main())
+        self.assertIsNone(endpoint.client._client)
+        self.assertTrue(pool.is_closed)
+
+    def test_writes_are_not_retried_on_server_errors(self):
+        """A POST answered with a 503 is sent once, a GET is retried."""
+        self.server.error_every = 1
+
+        async def main():
+            async with AsyncEndpoint("jpm", "jobs", self.connect()) as endpoint:
+                with self.assertRaises(httpx.HTTPStatusError):
+                    await endpoint.create({"summary": "New job"})
+                self.assertEqual(self.server.stats["requests"], 1)
+                with self.assertRaises(httpx.HTTPStatusError):
+                    await endpoint.get_one(1)
+                self.assertEqual(self.server.stats["requests"], 4)
+
+        asyncio.run(main())
+
+    def test_report(self):
+        """`AsyncReport` is initialized like `Report` and fetches every page."""
+        async def main():
+            async with AsyncReport("operations", 8000, self.connect()) as report:
+                self.assertEqual(report.get_params(), Report("operations", 8000).get_params())
+                report.add_params("From", "2024-01-01")
+                metadata = await report.get_metadata()
+                data = await report.get_all_data()
+            return metadata, data
+
+        metadata, data = asyncio.run(main())
+        self.assertEqual(metadata["id"], 8000)
+        self.assertEqual(len(data["data"]), 1234)
+        self.assertEqual([field["name"] for field in data["fields"]], ["Id", "JobNumber", "Total", "CompletedOn"])
+
+    def test_report_follows_has_more_past_a_stale_total(self):
+        """Pages past an undercounted totalCount are still fetched."""
+        conn = self.connect()
+        set_report_rate_limit(8001, 10000, conn)
+        self.server.report_total_count = 250
+
+        async def main():
+            async with AsyncReport("operations", 8001, conn) as report:
+                return await report.get_all_data(page_size=100)
+
+        data = asyncio.run(main())
+        self.assertEqual([row[0] for row in data["data"]], list(range(1, 1235)))
+        self.assertNotIn("error", data)
+
+    def test_report_deadline(self):
+        """A page the rate limit would delay past the deadline ends the pull with the rows so far."""
+        conn = self.connect()
+        set_report_rate_limit(8002, 2, conn)
+
+        async def main():
+            async with AsyncReport("operations", 8002, conn) as report:
+                return await report.get_all_data(page_size=100, timeout_min=0.01)
+
+        data = asyncio.run(main())
+        self.assertEqual(len(data["data"]), 200)
+        self.assertIn("Timed out", data["error"])
+
+    def test_report_has_no_blocking_methods(self):
+        """Only the parameter helpers are shared with `Report`; metadata must be awaited first."""
+        async def main():
+            async with AsyncReport("operations", 8003, self.connect()) as report:
+                for name in ("iter_data", "get_table", "_iter_pages"):
+                    self.assertFalse(hasattr(report, name))
+                self.assertNotIsInstance(report, Report)
+                with self.assertRaises(ValueError):
+                    report.show_param_types()
+                await report.get_metadata()
+                report.show_param_types()
+
+        asyncio.run(main())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+"""Tests for the cached OAuth tokens in `servicepytan.auth`."""
+
+
+import threading
+import unittest
+
+import servicepytan
+from servicepytan.auth import AuthTokenManager, get_auth_token
+
+from tests.mock_server import MockServerTestCase
+
+
+class TestAuthTokenManager(MockServerTestCase):
+    """Tests for `AuthTokenManager` against the local mock API."""
+
+    def setUp(self):
+        """Use a fresh token manager for each test."""
+        super().setUp()
+        self.server.token_lifetime = 900
+        self.manager = AuthTokenManager()
+
+    def test_token_is_cached(self):
+        """Repeated calls reuse the cached token."""
+        first = self.manager.get_token(self.server.url, "client", "secret")
+        second = self.manager.get_token(self.server.url, "client", "secret")
+        self.assertEqual(first, second)
+        self.assertEqual(self.server.stats["token_requests"], 1)
+
+    def test_concurrent_callers_share_one_refresh(self):
+        """Threads asking for a missing token wait for a single request."""
+        tokens = []
+        barrier = threading.Barrier(8)
+
+        def get_token():
+            barrier.wait()
+            tokens.append(self.manager.get_token(self.server.url, "client", "secret"))
+
+        threads = [threading.Thread(target=get_token) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(tokens)), 1)
+        self.assertEqual(self.server.stats["token_requests"], 1)
+
+    def test_token_is_refreshed_ahead_of_expiry(self):
+        """Tokens expiring within the refresh margin are requested again."""
+        self.server.token_lifetime = 30
+        first = self.manager.get_token(self.server.url, "client", "secret")
+        second = self.manager.get_token(self.server.url, "client", "secret")
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.server.stats["token_requests"], 2)
+
+    def test_tokens_are_keyed_by_client(self):
+        """Different app credentials get their own tokens."""
+        first = self.manager.get_token(self.server.url, "client-a", "secret")
+        second = self.manager.get_token(self.server.url, "client-b", "secret")
+        self.assertNotEqual(first, second)
+
+    def test_invalidate_keeps_a_newer_token(self):
+        """Invalidating a stale token does not drop the token that replaced it."""
+        token = self.manager.get_token(self.server.url, "client", "secret")
+        self.manager.invalidate(self.server.url, "client", "an-older-token")
+        self.assertEqual(self.manager.cached_token(self.server.url, "client"), token)
+        self.manager.invalidate(self.server.url, "client", token)
+        self.assertIsNone(self.manager.cached_token(self.server.url, "client"))
+
+    def test_rejected_token_is_replaced(self):
+        """A 401 drops the cached token and the request is retried with a new one."""
+        conn = self.connect()
+        token = get_auth_token(conn)
+        self.server.revoke_tokens()
+        self.server.reset_stats()
+        job = servicepytan.Endpoint("jpm", "jobs", conn).get_one(7)
+        self.assertEqual(job["id"], 7)
+        self.assertEqual(self.server.stats["token_requests"], 1)
+        self.assertNotEqual(get_auth_token(conn), token)
+
+
+if __name__ == "__main__":
+    unittest.main()
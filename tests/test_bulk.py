@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+"""Tests for `BulkWriter` in `servicepytan.bulk`."""
+
+
+import os
+import tempfile
+import unittest
+
+import servicepytan
+from servicepytan.bulk import BulkWriter, _operation_key
+from servicepytan.utils import endpoint_url, request_json
+
+from tests.mock_server import MockServerTestCase
+
+
+class TestBulkWriter(MockServerTestCase):
+    """Tests for bulk writes against the local mock API."""
+
+    def setUp(self):
+        """Write to the customers endpoint."""
+        super().setUp()
+        self.endpoint = servicepytan.Endpoint("crm", "customers", self.connect())
+
+    def test_every_action_sends_its_method(self):
+        """Each action is sent with its HTTP method, and deletes use DELETE."""
+        results = self.endpoint.bulk([
+            {"action": "create", "payload": {"name": "A"}},
+            {"action": "update", "id": 5, "payload": {"name": "B"}},
+            {"action": "patch", "id": 6, "payload": {"name": "C"}},
+            {"action": "delete", "id": 7},
+            {"action": "delete_subitem", "id": 8, "modifier_id": 3, "modifier": "tags"},
+        ], max_workers=1)
+        self.assertTrue(all(result["ok"] for result in results))
+        self.assertEqual([(method, path) for method, path, _ in self.server.writes], [
+            ("POST", "customers"), ("PUT", "customers/5"), ("PATCH", "customers/6"),
+            ("DELETE", "customers/7"), ("DELETE", "customers/8/tags/3"),
+        ])
+        self.assertEqual(results[3]["response"], {"id": 7})
+
+    def test_legacy_del_request_type(self):
+        """The legacy "DEL" request type is sent as DELETE."""
+        url = endpoint_url("crm", "customers", id=9, conn=self.endpoint.conn)
+        self.assertEqual(request_json(url, conn=self.endpoint.conn, request_type="DEL"), {"id": 9})
+        self.assertEqual(self.server.writes[0][:2], ("DELETE", "customers/9"))
+
+    def test_failures_are_reported_per_operation(self):
+        """A failed create is not retried and does not stop the batch."""
+        self.server.error_every = 2
+        results = self.endpoint.bulk([{"action": "create", "payload": {"name": name}} for name in "ABC"],
+                                     max_workers=1)
+        self.assertEqual([result["ok"] for result in results], [True, False, True])
+        self.assertEqual(results[1]["status_code"], 503)
+        self.assertEqual(len(self.server.writes), 2)
+        unknown = self.endpoint.bulk([{"action": "merge", "id": 1}])[0]
+        self.assertFalse(unknown["ok"])
+        self.assertIn("ValueError", unknown["error"])
+
+    def test_checkpoint_resumes_regardless_of_order(self):
+        """A rerun with reordered operations only sends the ones that did not succeed."""
+        operations = [{"action": "patch", "id": id, "payload": {"tagTypeIds": [id]}} for id in range(1, 6)]
+        with tempfile.TemporaryDirectory() as directory:
+            writer = BulkWriter(self.endpoint, max_workers=1, checkpoint_path=os.path.join(directory, "bulk.ckpt"))
+            self.server.error_every = 3
+            self.assertEqual(sum(result["ok"] for result in writer.run(operations)), 4)
+            self.server.error_every = 0
+            self.server.reset_stats()
+            results = writer.run(list(reversed(operations)))
+            self.assertEqual([result["skipped"] for result in results], [True, True, False, True, True])
+            self.assertEqual([path for _, path, _ in self.server.writes], ["customers/3"])
+            writer.reset()
+            self.assertEqual(writer.completed_keys(), set())
+
+
+class TestOperationKey(unittest.TestCase):
+    """Tests for the default operation keys."""
+
+    def test_keys_depend_on_content(self):
+        """Keys change with the payload and ignore dictionary order, and explicit keys win."""
+        first = _operation_key({"action": "create", "payload": {"a": 1, "b": 2}})
+        self.assertEqual(first, _operation_key({"action": "create", "payload": {"b": 2, "a": 1}}))
+        self.assertNotEqual(first, _operation_key({"action": "create", "payload": {"a": 1, "b": 3}}))
+        self.assertNotEqual(_operation_key({"action": "delete", "id": 1}), _operation_key({"action": "delete", "id": 2}))
+        self.assertEqual(_operation_key({"action": "delete", "id": 1, "key": "row-7"}), "row-7")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+"""Tests for the TTL response cache in `servicepytan.cache`."""
+
+
+import os
+import tempfile
+import time
+import unittest
+
+import servicepytan
+from servicepytan.cache import MemoryCacheBackend, ResponseCache, SQLiteCacheBackend
+from servicepytan.data import DataService
+
+from tests.mock_server import MockServerTestCase
+
+
+class TestResponseCache(MockServerTestCase):
+    """Tests for cached GET requests against the local mock API."""
+
+    server_options = {"records": 120}
+
+    def test_reference_data_is_cached(self):
+        """Repeated reference data pulls are answered from the cache."""
+        conn = self.connect(cache=True)
+        first = DataService(conn).get_employees()
+        requests = self.server.stats["requests"]
+        second = DataService(conn).get_employees()
+        self.assertEqual(first, second)
+        self.assertEqual(self.server.stats["requests"], requests)
+        self.assertEqual(conn.cache.stats()["hits"], requests)
+
+    def test_other_endpoints_are_not_cached(self):
+        """Endpoints without a TTL always go to the API."""
+        conn = self.connect(cache=True)
+        endpoint = servicepytan.Endpoint("jpm", "jobs", conn)
+        endpoint.get_one(7)
+        endpoint.get_one(7)
+        self.assertEqual(self.server.stats["requests"], 2)
+        self.assertEqual(conn.cache.stats()["entries"], 0)
+
+    def test_query_order_and_returned_data(self):
+        """Keys ignore query parameter order, and hits return fresh copies."""
+        conn = self.connect(cache=True)
+        endpoint = servicepytan.Endpoint("settings", "employees", conn)
+        first = endpoint.get_many({"page": 1, "pageSize": 10})
+        first["data"].clear()
+        second = endpoint.get_many({"pageSize": 10, "page": 1})
+        self.assertEqual(len(second["data"]), 10)
+        self.assertEqual(self.server.stats["requests"], 1)
+
+    def test_entries_expire(self):
+        """Expired responses are fetched again."""
+        cache = ResponseCache(ttls={"settings/employees": 0.05})
+        conn = self.connect(cache=cache)
+        endpoint = servicepytan.Endpoint("settings", "employees", conn)
+        endpoint.get_one(1)
+        endpoint.get_one(1)
+        time.sleep(0.1)
+        endpoint.get_one(1)
+        self.assertEqual(self.server.stats["requests"], 2)
+
+    def test_invalidate(self):
+        """Entries can be removed by endpoint or tenant."""
+        cache = ResponseCache()
+        for tenant_id in ("1", "2"):
+            conn = self.connect(tenant_id, cache=cache)
+            servicepytan.Endpoint("settings", "employees", conn).get_one(1)
+            servicepytan.Endpoint("settings", "technicians", conn).get_one(1)
+        self.assertEqual(len(cache.backend), 4)
+        cache.invalidate(endpoint="settings/employees")
+        self.assertEqual(len(cache.backend), 2)
+        cache.invalidate(tenant_id="1")
+        self.assertEqual(len(cache.backend), 1)
+        cache.invalidate()
+        self.assertEqual(len(cache.backend), 0)
+
+
+class TestCacheBackends(unittest.TestCase):
+    """Tests for the cache storage backends."""
+
+    def test_ttl_lookup(self):
+        """TTLs use the longest matching endpoint prefix."""
+        cache = ResponseCache(ttls={"settings": 60, "settings/employees": 900}, default_ttl=5)
+        root = "https://api.servicetitan.io"
+        self.assertEqual(cache.ttl_for(f"{root}/settings/v2/tenant/1/employees/7"), 900)
+        self.assertEqual(cache.ttl_for(f"{root}/settings/v2/tenant/1/technicians"), 60)
+        self.assertEqual(cache.ttl_for(f"{root}/jpm/v2/tenant/1/jobs"), 5)
+
+    def test_memory_backend_evicts_least_recently_used(self):
+        """The memory backend keeps the most recently used entries."""
+        backend = MemoryCacheBackend(max_entries=2)
+        expires_at = time.time() + 60
+        backend.set("a", "1", "url-a", expires_at, b"a")
+        backend.set("b", "1", "url-b", expires_at, b"b")
+        backend.get("a")
+        backend.set("c", "1", "url-c", expires_at, b"c")
+        self.assertIsNone(backend.get("b"))
+        self.assertEqual(backend.get("a"), (expires_at, b"a"))
+        self.assertEqual(len(backend), 2)
+
+    def test_sqlite_backend_persists(self):
+        """The SQLite backend shares entries across instances and evicts the first to expire."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.db")
+            cache = ResponseCache(backend=SQLiteCacheBackend(path, max_entries=2))
+            url = "https://api.servicetitan.io/settings/v2/tenant/1/employees"
+            cache.set("1", url, {"page": 1}, b'{"data": []}', ttl=10)
+            cache.set("1", url, {"page": 2}, b'{"data": [1]}', ttl=60)
+
+            reopened = ResponseCache(backend=SQLiteCacheBackend(path, max_entries=2))
+            self.assertEqual(reopened.get("1", url, {"page": 2}), b'{"data": [1]}')
+            reopened.set("1", url, {"page": 3}, b'{"data": [2]}', ttl=30)
+            self.assertIsNone(reopened.get("1", url, {"page": 1}))
+            self.assertEqual(reopened.stats()["entries"], 2)
+            reopened.invalidate(tenant_id="1")
+            self.assertEqual(len(cache.backend), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
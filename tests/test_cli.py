@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+"""Tests for the command line in `servicepytan.cli`."""
+
+
+import gzip
+import os
+import tempfile
+import unittest
+
+from servicepytan import cli
+from servicepytan.sinks import NDJSONSink
+
+
+class TestWritePages(unittest.TestCase):
+    """Tests for how `export` writes pages and saves its checkpoint."""
+
+    def setUp(self):
+        """Write into a temporary directory."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    @staticmethod
+    def pages(fail_after=None):
+        """Export-like pages of 4 records, optionally failing after the page ending at `fail_after`."""
+        for end in range(4, 25, 4):
+            yield {"data": [{"id": index} for index in range(end - 4, end)], "continueFrom": str(end)}
+            if end == fail_after:
+                raise RuntimeError("export failed")
+
+    def write(self, pages, saved):
+        """Writes the pages into files of 10 rows, appending each checkpoint saved to `saved`."""
+        sink = NDJSONSink(self.directory, max_rows_per_file=10, compression="gzip")
+
+        def checkpoint(token):
+            self.assertLessEqual(int(token), sink.closed_rows)
+            # Every row up to the token can already be read back from the closed files
+            rows = 0
+            for file in sink.files:
+                if rows + file["rows"] > sink.closed_rows:
+                    break
+                with gzip.open(os.path.join(self.directory, file["path"]), "rt") as f:
+                    rows += len(f.readlines())
+            self.assertGreaterEqual(rows, int(token))
+            saved.append(token)
+
+        try:
+            cli._write_pages(pages, sink, cli._Progress(quiet=True), checkpoint=checkpoint)
+        finally:
+            self.assertEqual(sink.closed_rows, sink.rows)
+
+    def test_checkpoint_waits_for_closed_files(self):
+        """A page's token is saved once its rows are in a rotated file, and the last one on close."""
+        saved = []
+        self.write(self.pages(), saved)
+        self.assertEqual(saved, ["8", "20", "24"])
+
+    def test_failed_export_saves_the_rows_written(self):
+        """Closing the sink after a failure saves the token of the last page written."""
+        saved = []
+        with self.assertRaises(RuntimeError):
+            self.write(self.pages(fail_after=12), saved)
+        self.assertEqual(saved, ["8", "12"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+"""Tests for `servicepytan.columnar`."""
+
+
+import math
+import unittest
+from array import array
+
+import servicepytan
+from servicepytan.columnar import ReportTable
+from servicepytan.reports import set_report_rate_limit
+
+from tests.mock_server import MockServerTestCase
+
+FIELDS = [
+    {"name": "Id", "dataType": "Long"},
+    {"name": "Amount", "dataType": "Number"},
+    {"name": "Total", "dataType": "Currency"},
+    {"name": "Name", "dataType": "String"},
+]
+
+
+class TestReportTable(unittest.TestCase):
+    """Tests for `ReportTable` column storage."""
+
+    def test_large_integers_are_exact(self):
+        """Integer and Number columns keep 64-bit ids exactly."""
+        table = ReportTable(FIELDS)
+        table.append_rows([[9007199254740993, 9007199254740993, 1.5, "a"]])
+        self.assertEqual(table["Id"].typecode, "q")
+        self.assertEqual(table.to_dicts()[0]["Id"], 9007199254740993)
+        self.assertIsInstance(table.to_dicts()[0]["Amount"], int)
+        self.assertEqual(table.to_dicts()[0]["Amount"], 9007199254740993)
+
+    def test_missing_integers_use_a_null_mask(self):
+        """Missing integers are masked instead of turning the column into floats."""
+        table = ReportTable(FIELDS)
+        table.append_rows([[1, 1, 1.0, "a"]])
+        self.assertIsNone(table.null_mask("Id"))
+        table.append_rows([[None, 2, None, "b"], [3, 3, 3.0, "c"]])
+        self.assertEqual(list(table.null_mask("Id")), [0, 1, 0])
+        self.assertEqual(table.column_values("Id"), [1, None, 3])
+        self.assertEqual(table.column_values("Total"), [1.0, None, 3.0])
+        self.assertTrue(math.isnan(table["Total"][1]))
+
+    def test_numeric_strings_are_converted(self):
+        """Numeric strings are stored as numbers."""
+        table = ReportTable(FIELDS)
+        table.append_rows([["12", "7", "3.25", "a"], [" 13 ", "", "4", "b"]])
+        self.assertEqual(table.column_values("Id"), [12, 13])
+        self.assertEqual(table.column_values("Amount"), [7, None])
+        self.assertEqual(table.column_values("Total"), [3.25, 4.0])
+
+    def test_number_column_switches_to_floats(self):
+        """A fractional value turns a Number column into floats, keeping earlier values."""
+        table = ReportTable(FIELDS)
+        table.append_rows([[1, 2, 0, "a"], [2, None, 0, "b"]])
+        table.append_rows([[3, 2.5, 0, "c"]])
+        self.assertEqual(table["Amount"].typecode, "d")
+        self.assertEqual(table.column_values("Amount"), [2.0, None, 2.5])
+
+    def test_unconvertible_values_fall_back_to_a_list(self):
+        """Text in a numeric column keeps every value in a plain list."""
+        table = ReportTable(FIELDS)
+        table.append_rows([[1, 9007199254740993, 1.0, "a"], [None, 2, 2.0, "b"]])
+        table.append_rows([["n/a", 0.5, "x", "c"]])
+        self.assertEqual(table.column_values("Id"), [1, None, "n/a"])
+        # A fractional value cannot be stored next to an id beyond float precision
+        self.assertEqual(table.column_values("Amount"), [9007199254740993, 2, 0.5])
+        self.assertEqual(table.column_values("Total"), [1.0, 2.0, "x"])
+        self.assertEqual(len(table), 3)
+
+    def test_exports(self):
+        """NumPy, pyarrow and pandas exports keep types and missing values."""
+        import pandas as pd
+        table = ReportTable(FIELDS)
+        table.append_rows([[9007199254740993, 1, 1.5, "a"], [None, 2, None, "b"]])
+
+        arrays = table.to_numpy(copy=True)
+        self.assertEqual(str(arrays["Id"].dtype), "int64")
+        self.assertEqual(arrays["Id"][0], 9007199254740993)
+        self.assertTrue(arrays["Id"].mask[1])
+        self.assertEqual(str(arrays["Amount"].dtype), "int64")
+
+        arrow = table.to_arrow(copy=True)
+        self.assertEqual(arrow.column("Id").to_pylist(), [9007199254740993, None])
+        self.assertEqual(str(arrow.schema.field("Amount").type), "int64")
+
+        frame = table.to_pandas()
+        self.assertEqual(str(frame["Id"].dtype), "Int64")
+        self.assertEqual(frame["Id"][0], 9007199254740993)
+        self.assertTrue(pd.isna(frame["Id"][1]))
+
+    def test_shared_exports_block_appends(self):
+        """Appending while a shared export is alive raises BufferError and leaves the table unchanged."""
+        table = ReportTable(FIELDS)
+        table.append_rows([[1, 1, 1.0, "a"]])
+        arrays = table.to_numpy()
+        with self.assertRaises(BufferError):
+            table.append_rows([[2, 2, 2.0, "b"]])
+        self.assertEqual(len(table), 1)
+        self.assertEqual({len(column) for column in table.columns.values()}, {1})
+        del arrays
+
+        copies = table.to_numpy(copy=True)
+        arrow = table.to_arrow(copy=True)
+        table.append_rows([[2, 2, 2.0, "b"]])
+        self.assertEqual(len(copies["Id"]), 1)
+        self.assertEqual(arrow.num_rows, 1)
+        self.assertEqual(table.column_values("Id"), [1, 2])
+
+
+class TestReportGetTable(MockServerTestCase):
+    """Tests for `Report.get_table` against the local mock API."""
+
+    server_options = {"records": 250}
+
+    def test_get_table(self):
+        """Report ids come back as exact integers."""
+        conn = self.connect()
+        set_report_rate_limit(42, 10000, conn)
+        table = servicepytan.Report("operations", 42, conn=conn).get_table(page_size=100)
+        self.assertEqual(len(table), 250)
+        self.assertIsInstance(table["Id"], array)
+        self.assertEqual(table["Id"].typecode, "q")
+        self.assertEqual(table.column_values("Id"), list(range(1, 251)))
+
+
+if __name__ == "__main__":
+    unittest.main()
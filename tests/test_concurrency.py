@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+"""Tests for the bounded thread pools in `servicepytan._concurrency`."""
+
+
+import threading
+import time
+import unittest
+
+import servicepytan
+from servicepytan._concurrency import _imap_concurrently, _map_concurrently
+
+from tests.mock_server import MockServerTestCase
+
+
+class TestConcurrency(unittest.TestCase):
+    """Tests for `_imap_concurrently` and `_map_concurrently`."""
+
+    def test_results_keep_input_order(self):
+        """Results come back in input order even when later calls finish first."""
+        def slow_for_small(item):
+            time.sleep((10 - item) * 0.002)
+            return item * 2
+        self.assertEqual(_map_concurrently(slow_for_small, range(10), max_workers=4), [item * 2 for item in range(10)])
+
+    def test_calls_are_bounded(self):
+        """No more than `max_workers` calls run at once."""
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def call(item):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.005)
+            with lock:
+                running[0] -= 1
+            return item
+
+        self.assertEqual(_map_concurrently(call, range(40), max_workers=3), list(range(40)))
+        self.assertLessEqual(peak[0], 3)
+
+    def test_first_failure_is_raised_and_stops_submission(self):
+        """The first exception reaches the consumer and later items are not started."""
+        started = []
+
+        def call(item):
+            started.append(item)
+            if item == 2:
+                raise ValueError("page 2 failed")
+            time.sleep(0.01)
+            return item
+
+        with self.assertRaisesRegex(ValueError, "page 2 failed"):
+            _map_concurrently(call, range(100), max_workers=2)
+        self.assertLess(len(started), 100)
+
+    def test_closing_early_cancels_outstanding_calls(self):
+        """Closing the generator stops submitting new calls."""
+        started = []
+
+        def call(item):
+            started.append(item)
+            time.sleep(0.005)
+            return item
+
+        results = _imap_concurrently(call, range(100), max_workers=2)
+        self.assertEqual([next(results) for _ in range(3)], [0, 1, 2])
+        results.close()
+        self.assertLess(len(started), 10)
+
+    def test_single_worker_runs_inline(self):
+        """With one worker, calls run on the calling thread."""
+        threads = _map_concurrently(lambda item: threading.current_thread(), range(3), max_workers=1)
+        self.assertEqual(set(threads), {threading.current_thread()})
+
+
+class TestConcurrentGetAll(MockServerTestCase):
+    """Tests for `Endpoint.get_all(max_workers=...)` against the local mock API."""
+
+    server_options = {"records": 1001}
+
+    def test_concurrent_pages_match_sequential_pages(self):
+        """Concurrent paging returns the same records in the same order, one request per page."""
+        endpoint = servicepytan.Endpoint("jpm", "jobs", self.connect())
+        sequential = endpoint.get_all({"pageSize": 100})
+        self.server.reset_stats()
+        concurrent = endpoint.get_all({"pageSize": 100}, max_workers=4)
+        self.assertEqual(concurrent, sequential)
+        self.assertEqual([job["id"] for job in concurrent], list(range(1, 1002)))
+        self.assertEqual(self.server.stats["requests"], 11)
+
+    def test_single_page(self):
+        """A result that fits on the first page takes one request."""
+        endpoint = servicepytan.Endpoint("jpm", "jobs", self.connect())
+        jobs = endpoint.get_all({"pageSize": 5000}, max_workers=4)
+        self.assertEqual(len(jobs), 1001)
+        self.assertEqual(self.server.stats["requests"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
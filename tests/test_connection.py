@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+"""Tests for pooled sessions in `servicepytan.connection`."""
+
+
+import unittest
+
+import servicepytan
+from servicepytan.auth import get_auth_token
+from servicepytan.connection import get_session
+
+from tests.mock_server import MockServerTestCase
+
+
+class TestConnection(MockServerTestCase):
+    """Tests for `Connection` against the local mock API."""
+
+    def test_requests_reuse_pooled_connections(self):
+        """Sequential requests on one connection share a keep-alive socket."""
+        conn = self.connect()
+        get_auth_token(conn)
+        self.server.reset_stats()
+        endpoint = servicepytan.Endpoint("jpm", "jobs", conn)
+        for id in range(1, 21):
+            endpoint.get_one(id)
+        self.assertEqual(self.server.stats["requests"], 20)
+        self.assertEqual(self.server.stats["connections"], 1)
+
+    def test_session_is_created_once(self):
+        """The session is created on first use and kept until close."""
+        conn = self.connect()
+        session = conn.session
+        self.assertIs(conn.session, session)
+        self.assertIs(get_session(conn), session)
+        conn.close()
+        self.assertIsNot(conn.session, session)
+
+    def test_plain_dictionaries_share_the_default_session(self):
+        """Configuration dictionaries without a session use the module session."""
+        self.assertIs(get_session(self.server.config()), get_session(self.server.config()))
+
+    def test_for_tenant_shares_the_session(self):
+        """Tenant connections reuse the parent session and settings and do not close it."""
+        conn = self.connect(pool_size=4)
+        other = conn.for_tenant(2)
+        self.assertEqual(other["SERVICETITAN_TENANT_ID"], "2")
+        self.assertEqual(conn["SERVICETITAN_TENANT_ID"], "1")
+        self.assertIs(other.session, conn.session)
+        self.assertIs(other.retry_policy, conn.retry_policy)
+        self.assertEqual(other.pool_size, 4)
+        session = conn.session
+        other.close()
+        self.assertIs(conn.session, session)
+        self.assertEqual(servicepytan.Endpoint("jpm", "jobs", conn).get_one(1)["id"], 1)
+
+    def test_context_manager_closes_the_session(self):
+        """Leaving the `with` block closes the session."""
+        with servicepytan.Connection(self.server.config()) as conn:
+            session = conn.session
+        self.assertIsNone(conn._session)
+        self.assertIsNotNone(session)
+
+
+if __name__ == "__main__":
+    unittest.main()
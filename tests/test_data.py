@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+
+"""Tests for `DataService` in `servicepytan.data`."""
+
+
+import unittest
+
+import servicepytan
+
+from tests.mock_server import MockServerTestCase, make_estimate, make_record
+
+
+class TestDataService(MockServerTestCase):
+    """Tests for `DataService` against the local mock API."""
+
+    server_options = {"records": 1000}
+
+    def test_get_all_for_each_drops_duplicates(self):
+        """Records returned by several queries are kept once, in query order."""
+        data_service = servicepytan.DataService(self.connect(), max_workers=3)
+        jobs = data_service.get_all_for_each("jpm", "jobs", [{"ids": "1,2,3"}, {"ids": "3,4"}, {"ids": "2,5"}])
+        self.assertEqual([job["id"] for job in jobs], [1, 2, 3, 4, 5])
+        self.assertEqual(self.server.stats["requests"], 3)
+
+    def test_get_jobs_completed_between(self):
+        """One query per status is run and the results are combined."""
+        data_service = servicepytan.DataService(self.connect())
+        jobs = data_service.get_jobs_completed_between("2024-01-01", "2024-01-08", job_status=["Completed", "Canceled"])
+        expected = [index + 1 for index in range(1000) if make_record(index)["completedOn"] < "2024-01-08"]
+        self.assertEqual(sorted(job["id"] for job in jobs), expected)
+        self.assertEqual({job["jobStatus"] for job in jobs}, {"Completed", "Canceled"})
+
+    def test_get_total_sales_between(self):
+        """Sold item totals are summed from dictionaries or, with models, by `Estimate.items_total`."""
+        expected = sum(item["total"] for index in range(1000) for item in make_estimate(index)["items"]
+                       if make_estimate(index)["soldOn"] < "2024-01-08")
+        for models in (False, True):
+            with self.subTest(models=models):
+                data_service = servicepytan.DataService(self.connect(), models=models)
+                self.assertAlmostEqual(data_service.get_total_sales_between("2024-01-01", "2024-01-08"), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+"""Tests for the date parsing helpers in `servicepytan._dates`."""
+
+
+import datetime
+import unittest
+
+from dateutil import parser
+
+from servicepytan._dates import (_convert_date_to_api_format, _parse_date_string, _parse_iso, parse_api_datetime,
+                                 parse_api_datetimes)
+
+ISO_STRINGS = [
+    "2024-01-15",
+    "2024-01-15T10:30",
+    "2024-01-15T10:30:45",
+    "2024-01-15 10:30:45",
+    "2024-01-15T10:30:45.1",
+    "2024-01-15T10:30:45.123456",
+    "2024-01-15T10:30:45.1234567",
+    "2024-01-15T10:30:45.9999999Z",
+    "2024-01-15T10:30:45Z",
+    "2024-01-15T10:30:45.25Z",
+    "2024-01-15T10:30:45+0530",
+    "2024-01-15T10:30:45+05:30",
+    "2024-01-15T10:30:45.5-08:00",
+    "2024-02-29T23:59:59-0800",
+]
+
+
+class TestParseDates(unittest.TestCase):
+    """The ISO fast path and the cached parser agree with dateutil."""
+
+    def assertSameDatetime(self, value, expected):
+        self.assertEqual(value.replace(tzinfo=None), expected.replace(tzinfo=None))
+        self.assertEqual(value.utcoffset(), expected.utcoffset())
+
+    def test_iso_fast_path_matches_dateutil(self):
+        """Dates, times, fractional seconds, Z and numeric offsets parse like dateutil."""
+        for value in ISO_STRINGS:
+            with self.subTest(value=value):
+                self.assertSameDatetime(_parse_iso(value), parser.parse(value))
+
+    def test_cached_parser_matches_dateutil(self):
+        """The cached parser and `parse_api_datetime` give the same results, twice over."""
+        for value in ISO_STRINGS + ["January 15, 2024", "01/15/2024 10:30 PM"]:
+            with self.subTest(value=value):
+                expected = parser.parse(value)
+                self.assertSameDatetime(_parse_date_string(value), expected)
+                self.assertSameDatetime(_parse_date_string(value), expected)
+                self.assertSameDatetime(parse_api_datetime(value), expected)
+
+    def test_non_iso_strings_fall_back_to_dateutil(self):
+        """Strings the fast path does not handle are left to dateutil."""
+        self.assertIsNone(_parse_iso("January 15, 2024"))
+        self.assertIsNone(parse_api_datetime(""))
+        self.assertIsNone(parse_api_datetime(None))
+
+    def test_parse_api_datetimes(self):
+        """Listed string fields are parsed in place and other values are left alone."""
+        records = [{"createdOn": "2024-01-15T10:30:45.123Z", "completedOn": None, "total": "5"}]
+        parse_api_datetimes(records, ("createdOn", "completedOn"))
+        self.assertSameDatetime(records[0]["createdOn"], parser.parse("2024-01-15T10:30:45.123Z"))
+        self.assertIsNone(records[0]["completedOn"])
+        self.assertEqual(records[0]["total"], "5")
+
+    def test_convert_date_to_api_format(self):
+        """Query dates are formatted as is, or converted from a timezone to UTC."""
+        self.assertEqual(_convert_date_to_api_format("2024-01-15"), "2024-01-15T00:00:00Z")
+        self.assertEqual(_convert_date_to_api_format("2024-01-15", "America/New_York"), "2024-01-15T05:00:00Z")
+        self.assertEqual(_convert_date_to_api_format(datetime.datetime(2024, 7, 1, 12), "America/Los_Angeles"),
+                         "2024-07-01T19:00:00Z")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+"""Tests for `servicepytan.decoders`, comparing every backend with the standard library `json`."""
+
+
+import json
+import unittest
+
+import servicepytan
+from servicepytan.decoders import FAST_BACKENDS, JSONDecoder, _is_installed, get_decoder
+
+from tests.mock_server import MockServerTestCase, make_record
+
+URL = "https://api.servicetitan.io/jpm/v2/tenant/1/jobs"
+BACKENDS = ["json"] + [backend for backend in FAST_BACKENDS if _is_installed(backend)]
+PAGE = {
+    "page": 1,
+    "pageSize": 3,
+    "hasMore": True,
+    "totalCount": 1234,
+    "continueFrom": "abc",
+    "newEnvelopeKey": {"nested": [1, 2]},
+    "data": [dict(make_record(index), bigNumber=2 ** 62 + index, ratio=0.1 * index, name="café ☃")
+             for index in range(3)],
+}
+BODY = json.dumps(PAGE).encode()
+
+
+class TestJSONDecoder(unittest.TestCase):
+    """Every backend decodes exactly what the standard library does."""
+
+    def test_default_is_the_standard_library(self):
+        """Installing a fast library does not change the default decoder."""
+        self.assertEqual(JSONDecoder().backend, "json")
+        self.assertEqual(get_decoder({}).backend, "json")
+        self.assertEqual(get_decoder(None).backend, "json")
+
+    def test_backends_match_json(self):
+        """Plain decoding gives the same document with every backend."""
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                self.assertEqual(JSONDecoder(backend).decode(BODY, URL), json.loads(BODY))
+
+    def test_fields_match_json(self):
+        """Trimmed pages keep every envelope key and match trimming the stdlib result."""
+        names = ["id", "jobStatus", "bigNumber", "missing"]
+        expected = dict(PAGE, data=[{name: record.get(name) for name in names} for record in PAGE["data"]])
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                self.assertEqual(JSONDecoder(backend, fields={"jpm/jobs": names}).decode(BODY, URL), expected)
+
+    @unittest.skipUnless(_is_installed("msgspec"), "msgspec is not installed")
+    def test_types_keep_the_envelope(self):
+        """Typed records keep the page's other keys, including ones the decoder does not know."""
+        import msgspec
+
+        class Job(msgspec.Struct):
+            id: int
+            bigNumber: int
+
+        page = JSONDecoder(types={"jpm/jobs": Job}).decode(BODY, URL)
+        self.assertEqual([(job.id, job.bigNumber) for job in page["data"]],
+                         [(record["id"], record["bigNumber"]) for record in PAGE["data"]])
+        self.assertEqual({key: value for key, value in page.items() if key != "data"},
+                         {key: value for key, value in PAGE.items() if key != "data"})
+
+    def test_unknown_backend(self):
+        """Unsupported backends are rejected."""
+        with self.assertRaises(ValueError):
+            JSONDecoder("yaml")
+
+
+class TestConnectionDecoder(MockServerTestCase):
+    """Decoders configured on a connection against the local mock API."""
+
+    server_options = {"records": 120}
+
+    def test_pulls_match_json(self):
+        """get_all returns the same records with every backend."""
+        expected = servicepytan.Endpoint("jpm", "jobs", self.connect()).get_all({"pageSize": 50})
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                conn = self.connect(decoder=JSONDecoder(backend, fields={"jpm/jobs": ["id", "completedOn"]}))
+                records = servicepytan.Endpoint("jpm", "jobs", conn).get_all({"pageSize": 50})
+                self.assertEqual(records, [{"id": job["id"], "completedOn": job["completedOn"]} for job in expected])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+"""Tests for streamed, resumable downloads in `servicepytan.utils` and `Endpoint.download_many`."""
+
+
+import json
+import os
+import tempfile
+import unittest
+
+import servicepytan
+from servicepytan.utils import download_to_file
+
+from tests.mock_server import MockServerTestCase
+
+CONTENT = bytes(range(256)) * 400
+
+
+class TestDownloadToFile(MockServerTestCase):
+    """Tests for `download_to_file` against the local mock API."""
+
+    def setUp(self):
+        """Serve one attachment and download it into a temporary directory."""
+        super().setUp()
+        self.server.files = {"7": CONTENT, "8": b"small file"}
+        self.server.cut_download_after = 0
+        self.server.range_start_shift = 0
+        self.server.ignore_if_range = False
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "photo.jpg")
+        self.conn = self.connect()
+        self.endpoint = servicepytan.Endpoint("forms", "jobs/attachment", self.conn)
+        self.url = self.endpoint._download_url("7")
+
+    def write_part(self, content, state):
+        """Leaves a `.part` file and its saved state, as an interrupted download would."""
+        with open(f"{self.path}.part", "wb") as f:
+            f.write(content)
+        if state is not None:
+            with open(f"{self.path}.part.json", "w") as f:
+                json.dump(state, f)
+
+    def read(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def test_interrupted_download_resumes(self):
+        """A dropped connection continues with a Range request from the end of the .part file."""
+        self.server.cut_download_after = 30000
+        self.assertEqual(download_to_file(self.url, self.path, conn=self.conn, chunk_size=10000), len(CONTENT))
+        self.assertEqual(self.read(), CONTENT)
+        self.assertEqual(self.server.range_requests, ["bytes=30000-"])
+        self.assertFalse(os.path.exists(f"{self.path}.part"))
+        self.assertFalse(os.path.exists(f"{self.path}.part.json"))
+
+    def test_part_file_without_state_starts_over(self):
+        """A leftover .part file with no saved state is not trusted."""
+        self.write_part(b"x" * 1000, None)
+        download_to_file(self.url, self.path, conn=self.conn)
+        self.assertEqual(self.read(), CONTENT)
+        self.assertEqual(self.server.range_requests, [])
+
+    def test_changed_file_starts_over(self):
+        """If-Range makes the server send the whole file when it changed."""
+        self.write_part(b"x" * 1000, {"total": len(CONTENT), "etag": '"old"', "last_modified": None})
+        download_to_file(self.url, self.path, conn=self.conn)
+        self.assertEqual(self.read(), CONTENT)
+        self.assertEqual(self.server.range_requests, [])
+
+    def test_mismatched_range_starts_over(self):
+        """A range that does not start at the end of the .part file is discarded."""
+        self.server.range_start_shift = -100
+        self.write_part(CONTENT[:1000], {"total": len(CONTENT), "etag": None, "last_modified": None})
+        download_to_file(self.url, self.path, conn=self.conn)
+        self.assertEqual(self.read(), CONTENT)
+        self.assertEqual(self.server.range_requests, ["bytes=1000-"])
+
+    def test_changed_total_starts_over(self):
+        """A range of a file whose size changed is discarded, even if the server ignores If-Range."""
+        self.server.ignore_if_range = True
+        self.write_part(CONTENT[:1000], {"total": len(CONTENT) + 5, "etag": '"old"', "last_modified": None})
+        download_to_file(self.url, self.path, conn=self.conn)
+        self.assertEqual(self.read(), CONTENT)
+
+    def test_complete_part_file_is_kept(self):
+        """A .part file that already holds every byte is finished without downloading again."""
+        self.write_part(CONTENT, {"total": len(CONTENT), "etag": None, "last_modified": None})
+        download_to_file(self.url, self.path, conn=self.conn)
+        self.assertEqual(self.read(), CONTENT)
+        self.assertEqual(self.server.stats["bytes"], 0)
+
+    def test_download_many_skips_complete_files(self):
+        """Files already on disk with the size reported by HEAD are skipped."""
+        directory = os.path.dirname(self.path)
+        first = self.endpoint.download_many(["7", "8"], directory, max_workers=2)
+        self.assertEqual({id: result["bytes"] for id, result in first.items()}, {"7": len(CONTENT), "8": 10})
+        second = self.endpoint.download_many(["7", "8", "9"], directory)
+        self.assertTrue(second["7"]["skipped"] and second["8"]["skipped"])
+        self.assertIn("404", second["9"]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
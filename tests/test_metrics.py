@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+
+"""Tests for the metrics sinks in `servicepytan.metrics`."""
+
+
+import unittest
+
+from servicepytan.metrics import PrometheusSink, _sample_value, request_event
+
+URL = "https://api.servicetitan.io/jpm/v2/tenant/1/jobs"
+
+
+class TestPrometheusSink(unittest.TestCase):
+    """Tests for `PrometheusSink`."""
+
+    def test_sample_values(self):
+        """Integers are written as is and floats in full, with Prometheus' names for special values."""
+        self.assertEqual(_sample_value(123456789012), "123456789012")
+        self.assertEqual(_sample_value(1234567.25), "1234567.25")
+        self.assertEqual(_sample_value(0.1), "0.1")
+        self.assertEqual([_sample_value(float(value)) for value in ("nan", "inf", "-inf")], ["NaN", "+Inf", "-Inf"])
+
+    def test_values_keep_their_precision(self):
+        """Large counters and float sums are rendered in full."""
+        prometheus = PrometheusSink()
+        for latency in (0.1, 1234567.25):
+            prometheus(request_event("GET", URL, status=200, latency=latency, size=123456789, rate_limit_wait=1234567.5))
+        text = prometheus.render()
+        self.assertIn('servicepytan_response_bytes_total{endpoint="jpm/jobs"} 246913578\n', text)
+        self.assertIn('servicepytan_rate_limit_wait_seconds_total{endpoint="jpm/jobs"} 2469135.0\n', text)
+        self.assertIn('servicepytan_request_duration_seconds_sum{method="GET",endpoint="jpm/jobs"} 1234567.35\n', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
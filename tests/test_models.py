@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+"""Tests for the record models in `servicepytan.models`."""
+
+
+import unittest
+
+import servicepytan
+from servicepytan.models import Estimate, Invoice, Job, get_model
+
+from tests.mock_server import MockServerTestCase, make_record
+
+
+class TestRecord(unittest.TestCase):
+    """Tests for building and reading records."""
+
+    def test_from_dict(self):
+        """Declared fields are converted and undeclared fields dropped."""
+        job = Job.from_dict(dict(make_record(6), tagTypeIds=["1", 2], unknownField="x"))
+        self.assertEqual((job.id, job.jobNumber, job.tagTypeIds), (7, "100006", (1, 2)))
+        self.assertIsNone(job.projectId)
+        self.assertNotIn("unknownField", job)
+        self.assertEqual(job["jobStatus"], job.get("jobStatus"))
+        self.assertEqual(job.get("projectId", 0), 0)
+        with self.assertRaises(KeyError):
+            job["unknownField"]
+
+    def test_types_are_coerced(self):
+        """Numeric strings, numbers for text and string flags are converted."""
+        job = Job.from_dict({"id": "12", "jobNumber": 100012, "noCharge": "false", "notificationsEnabled": 1})
+        self.assertEqual((job.id, job.jobNumber, job.noCharge, job.notificationsEnabled), (12, "100012", False, True))
+        self.assertEqual(Invoice.from_dict({"total": "123.45"}).total, 123.45)
+
+    def test_unexpected_values_are_kept_and_logged(self):
+        """A value a converter cannot handle is kept as received instead of failing the record."""
+        with self.assertLogs("servicepytan.models", "WARNING") as logs:
+            job = Job.from_dict({"id": 1, "summary": {"text": "nested"}, "noCharge": "maybe", "customerId": "n/a"})
+            Job.from_dict({"id": 2, "summary": {"text": "again"}})
+        self.assertEqual(job.summary, {"text": "nested"})
+        self.assertEqual((job.noCharge, job.customerId), ("maybe", "n/a"))
+        # Logged once per field and type
+        self.assertEqual(len([line for line in logs.output if "Job.summary" in line]), 1)
+
+    def test_nested_items_are_converted_lazily(self):
+        """Nested items stay raw until read, then become records."""
+        estimate = Estimate.from_dict({"id": 1, "items": [{"id": 10, "total": "5.5"}, {"id": 11, "total": 2}]})
+        self.assertIsInstance(estimate._items, list)
+        self.assertEqual([item.total for item in estimate.items], [5.5, 2.0])
+        self.assertEqual(estimate.items_total, 7.5)
+        self.assertEqual(estimate.to_dict()["items"][0]["id"], 10)
+
+    def test_equality_and_hashing(self):
+        """Records compare by value and, being mutable, are not hashable."""
+        first, second = Job.from_dict(make_record(1)), Job.from_dict(make_record(1))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, Job.from_dict(make_record(2)))
+        self.assertNotEqual(first, make_record(1))
+        with self.assertRaises(TypeError):
+            hash(first)
+
+    def test_get_model(self):
+        """Models are found for list and export endpoints."""
+        self.assertIs(get_model("jpm", "jobs"), Job)
+        self.assertIs(get_model("jpm", "export/jobs"), Job)
+        self.assertIsNone(get_model("crm", "customers"))
+
+
+class TestEndpointModels(MockServerTestCase):
+    """Tests for `Endpoint(model=...)` against the local mock API."""
+
+    server_options = {"records": 120, "export_page_size": 50}
+
+    def test_endpoint_returns_records(self):
+        """List, single record and export pulls return model instances."""
+        conn = self.connect()
+        jobs = servicepytan.Endpoint("jpm", "jobs", conn, model=Job).get_all({"pageSize": 50})
+        self.assertEqual(len(jobs), 120)
+        self.assertTrue(all(isinstance(job, Job) for job in jobs))
+        self.assertEqual(jobs[0].to_dict(), Job.from_dict(make_record(0)).to_dict())
+        self.assertEqual(servicepytan.Endpoint("jpm", "jobs", conn, model=Job).get_one(5).id, 5)
+        exported = servicepytan.Endpoint("jpm", "export", conn, model=Job).export_all("jobs")
+        self.assertEqual(exported, jobs)
+
+
+if __name__ == "__main__":
+    unittest.main()
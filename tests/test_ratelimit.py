@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+
+"""Tests for rate limiting and retries in `servicepytan.ratelimit` and `utils.send_request`."""
+
+
+import time
+import unittest
+
+import requests
+
+import servicepytan
+from servicepytan.ratelimit import RetryPolicy, TokenBucket, get_rate_limiter
+from servicepytan.utils import endpoint_url, send_request
+
+from tests.mock_server import MockServerTestCase
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Tests for `TokenBucket`."""
+
+    def test_burst_then_pacing(self):
+        """A full bucket allows a burst, then callers wait for the refill."""
+        bucket = TokenBucket(rate=100, capacity=5)
+        self.assertEqual([bucket.reserve() for _ in range(5)], [0] * 5)
+        self.assertAlmostEqual(bucket.reserve(), 0.01, delta=0.005)
+
+    def test_max_wait(self):
+        """A reservation that would wait longer than max_wait takes no token."""
+        bucket = TokenBucket(rate=1, capacity=1)
+        self.assertEqual(bucket.reserve(max_wait=0), 0)
+        self.assertIsNone(bucket.reserve(max_wait=0.5))
+        self.assertIsNone(bucket.reserve(max_wait=0.5))
+        self.assertAlmostEqual(bucket.reserve(), 1, delta=0.05)
+
+    def test_throttle_pauses_and_recovers(self):
+        """A 429 pauses callers and halves the rate, which recovers on success."""
+        bucket = TokenBucket(rate=100)
+        bucket.throttle(0.5)
+        self.assertEqual(bucket.rate, 50)
+        self.assertGreater(bucket.reserve(), 0.4)
+        for _ in range(20):
+            bucket.recover()
+        self.assertEqual(bucket.rate, 100)
+
+    def test_set_rate(self):
+        """A new rate applies to the refill and keeps a throttled rate reduced."""
+        bucket = TokenBucket(rate=10)
+        bucket.set_rate(100)
+        self.assertEqual((bucket.max_rate, bucket.rate, bucket.capacity), (100, 100, 100))
+        bucket.throttle(0)
+        bucket.set_rate(20)
+        self.assertEqual((bucket.max_rate, bucket.rate), (20, 20))
+
+
+class TestGetRateLimiter(unittest.TestCase):
+    """Tests for the limiters shared by connections in `get_rate_limiter`."""
+
+    def config(self, client_id, tenant_id="limits"):
+        return {"api_root": "https://limits.example.com", "SERVICETITAN_CLIENT_ID": client_id,
+                "SERVICETITAN_TENANT_ID": tenant_id}
+
+    def test_limiters_are_per_app_and_tenant(self):
+        """Two apps of the same tenant get separate limiters."""
+        first = get_rate_limiter(servicepytan.Connection(self.config("app-1")))
+        self.assertIs(get_rate_limiter(servicepytan.Connection(self.config("app-1"))), first)
+        self.assertIsNot(get_rate_limiter(servicepytan.Connection(self.config("app-2"))), first)
+        self.assertIsNot(get_rate_limiter(servicepytan.Connection(self.config("app-1", "other"))), first)
+
+    def test_explicit_rate_limit_updates_the_limiter(self):
+        """A later connection with another rate_limit changes the shared limiter, with a warning."""
+        limiter = get_rate_limiter(servicepytan.Connection(self.config("app-3"), rate_limit=40))
+        self.assertEqual(limiter.max_rate, 40)
+        self.assertIs(get_rate_limiter(servicepytan.Connection(self.config("app-3"))), limiter)
+        self.assertEqual(limiter.max_rate, 40)
+        with self.assertLogs("servicepytan.ratelimit", "WARNING"):
+            self.assertIs(get_rate_limiter(servicepytan.Connection(self.config("app-3"), rate_limit=10)), limiter)
+        self.assertEqual((limiter.max_rate, limiter.rate), (10, 10))
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """Tests for `RetryPolicy`."""
+
+    def test_backoff_is_capped(self):
+        """Backoff doubles per attempt up to `backoff_max`, and Retry-After wins."""
+        policy = RetryPolicy(backoff_base=1, backoff_max=5, jitter=False)
+        self.assertEqual([policy.delay(attempt) for attempt in range(1, 5)], [1, 2, 4, 5])
+        self.assertEqual(policy.delay(1, retry_after=3), 3)
+
+    def test_idempotent_methods(self):
+        """GET, HEAD, PUT and DELETE are idempotent; POST and PATCH are not."""
+        policy = RetryPolicy()
+        for method in ("GET", "head", "PUT", "DELETE"):
+            self.assertTrue(policy.is_idempotent(method))
+        for method in ("POST", "PATCH"):
+            self.assertFalse(policy.is_idempotent(method))
+
+
+class TestSendRequest(MockServerTestCase):
+    """Tests for the retries of `send_request` against the local mock API."""
+
+    def setUp(self):
+        """Connect with three attempts per request."""
+        super().setUp()
+        self.conn = self.connect()
+        self.url = endpoint_url("jpm", "jobs", conn=self.conn)
+        servicepytan.auth.get_auth_token(self.conn)
+
+    def test_server_errors_are_retried_for_idempotent_requests(self):
+        """A GET that keeps failing with a 503 is sent `max_attempts` times."""
+        self.server.error_every = 1
+        response = send_request("GET", self.url, conn=self.conn)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.server.stats["requests"], 3)
+
+    def test_server_error_recovers(self):
+        """A GET answered once with a 503 succeeds on the next attempt."""
+        self.server.error_every = 2
+        send_request("GET", self.url, conn=self.conn)
+        self.assertEqual(send_request("GET", self.url, conn=self.conn).status_code, 200)
+        self.assertEqual((self.server.stats["requests"], self.server.stats["errors"]), (3, 1))
+
+    def test_server_errors_are_not_retried_for_writes(self):
+        """A POST answered with a 503 may have been applied, so it is sent once."""
+        self.server.error_every = 1
+        with self.assertRaises(requests.HTTPError):
+            servicepytan.Endpoint("jpm", "jobs", self.conn).create({"summary": "New job"})
+        self.assertEqual(self.server.stats["requests"], 1)
+        response = send_request("PATCH", f"{self.url}/1", conn=self.conn, json={"summary": "Changed"})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.server.stats["requests"], 2)
+
+    def test_rate_limited_writes_are_retried(self):
+        """A POST answered with a 429 was not processed, so it is sent again."""
+        self.server.rate_limit_every = 2
+        servicepytan.Endpoint("jpm", "jobs", self.conn).get_one(1)
+        created = servicepytan.Endpoint("jpm", "jobs", self.conn).create({"summary": "New job"})
+        self.assertEqual(self.server.stats["requests"], 3)
+        self.assertEqual(len(self.server.writes), 1)
+        self.assertIn("id", created)
+
+    def test_idempotent_opt_in(self):
+        """A POST marked idempotent is retried on server errors."""
+        self.server.error_every = 1
+        response = send_request("POST", self.url, conn=self.conn, idempotent=True, json={})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.server.stats["requests"], 3)
+
+    def test_read_timeouts(self):
+        """Read timeouts are retried for a GET but not for a POST."""
+        self.server.latency = 0.3
+        with self.assertRaises(requests.ReadTimeout):
+            send_request("GET", self.url, conn=self.conn, timeout=0.1)
+        self.assertEqual(self.server.stats["requests"], 3)
+        with self.assertRaises(requests.ReadTimeout):
+            send_request("POST", self.url, conn=self.conn, timeout=0.1, json={"summary": "New job"})
+        self.assertEqual(self.server.stats["requests"], 4)
+        # Let the server finish the delayed responses before the next test
+        time.sleep(0.3)
+
+    def test_report_data_requests_are_retried(self):
+        """Report data is requested with POST but only reads, so it is retried."""
+        self.server.error_every = 2
+        send_request("GET", self.url, conn=self.conn)
+        report = servicepytan.Report("operations", 9000, conn=self.conn)
+        self.assertEqual(len(report.get_data(page_size=10)["data"]), 10)
+        self.assertEqual(self.server.stats["errors"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+"""Tests for `Report` in `servicepytan.reports`."""
+
+
+import time
+import unittest
+
+import servicepytan
+from servicepytan.reports import (ReportMetadataCache, ReportTimeoutError, get_report_metadata_cache,
+                                  get_report_rate_limiter, set_report_rate_limit)
+
+from tests.mock_server import MockServerTestCase
+
+
+class TestReportPages(MockServerTestCase):
+    """Tests for report paging and its rate limit against the local mock API."""
+
+    server_options = {"records": 1234}
+
+    def test_concurrent_pages_match_sequential_pages(self):
+        """Concurrent report pages come back in page order."""
+        conn = self.connect()
+        set_report_rate_limit(1, 10000, conn)
+        report = servicepytan.Report("operations", 1, conn=conn)
+        sequential = report.get_all_data(page_size=100)
+        concurrent = report.get_all_data(page_size=100, max_workers=4)
+        self.assertEqual(concurrent, sequential)
+        self.assertEqual([row[0] for row in concurrent["data"]], list(range(1, 1235)))
+
+    def test_rate_limit_is_set_per_report(self):
+        """`set_report_rate_limit` replaces one report's limiter for one tenant."""
+        conn = self.connect()
+        set_report_rate_limit(2, 30, conn)
+        self.assertEqual(get_report_rate_limiter(2, conn).max_rate, 0.5)
+        self.assertEqual(get_report_rate_limiter(3, conn).max_rate, 5 / 60)
+        self.assertEqual(get_report_rate_limiter(2, conn.for_tenant(9)).max_rate, 5 / 60)
+
+    def test_deadline_is_checked_against_the_limiter_wait(self):
+        """A page the rate limiter would delay past the deadline is not waited for."""
+        conn = self.connect()
+        set_report_rate_limit(4, 2, conn)
+        report = servicepytan.Report("operations", 4, conn=conn)
+        started = time.monotonic()
+        data = report.get_all_data(page_size=500, timeout_min=0.05)
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(len(data["data"]), 1000)
+        self.assertIn("error", data)
+        with self.assertRaises(ReportTimeoutError):
+            list(report.iter_data(page_size=500, timeout_min=0.05))
+        # The timed-out pages left the limiter as they found it: the next slot is one refill (30s) away
+        self.assertAlmostEqual(get_report_rate_limiter(4, conn).reserve(), 30, delta=1)
+
+
+class TestReportMetadata(MockServerTestCase):
+    """Tests for the shared report metadata cache against the local mock API."""
+
+    def setUp(self):
+        """Start each test with an empty metadata cache."""
+        super().setUp()
+        cache = get_report_metadata_cache()
+        self.addCleanup(setattr, cache, "ttl", cache.ttl)
+        self.addCleanup(cache.invalidate)
+        cache.invalidate()
+
+    def test_metadata_property_follows_the_ttl(self):
+        """`Report.metadata` is served from the cache until the entry expires."""
+        get_report_metadata_cache().ttl = 0.05
+        report = servicepytan.Report("operations", 5, conn=self.connect())
+        self.assertEqual(report.metadata["id"], 5)
+        self.assertEqual(report.metadata["id"], 5)
+        self.assertEqual(self.server.stats["requests"], 1)
+        time.sleep(0.1)
+        self.assertEqual(report.metadata["id"], 5)
+        self.assertEqual(self.server.stats["requests"], 2)
+
+    def test_assigned_metadata_is_kept(self):
+        """Metadata assigned to a report overrides the cache."""
+        report = servicepytan.Report("operations", 5, conn=self.connect())
+        report.metadata = {"id": 5, "parameters": []}
+        self.assertEqual(report.metadata, {"id": 5, "parameters": []})
+        self.assertEqual(self.server.stats["requests"], 0)
+
+    def test_invalidate_filters_by_category_report_and_tenant(self):
+        """Invalidation only removes the entries matching its arguments."""
+        cache = ReportMetadataCache()
+        conn, other = self.connect(), self.connect("2")
+        for category, report_id, entry_conn in [("operations", 1, conn), ("operations", 2, conn),
+                                                ("accounting", 1, conn), ("operations", 1, other)]:
+            cache.set(category, report_id, {"id": report_id}, entry_conn)
+
+        cache.invalidate(category="operations", conn=conn)
+        self.assertIsNone(cache.get("operations", 2, conn))
+        self.assertEqual(cache.get("operations", 1, other), {"id": 1})
+        self.assertEqual(len(cache), 2)
+        cache.invalidate(category="operations")
+        self.assertEqual(len(cache), 1)
+        cache.invalidate("accounting", 2, conn)
+        self.assertEqual(cache.get("accounting", 1, conn), {"id": 1})
+        cache.invalidate("accounting", 1, conn)
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
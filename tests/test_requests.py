@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+
+"""Tests for `Endpoint` in `servicepytan.requests`."""
+
+
+import unittest
+
+import servicepytan
+from servicepytan.requests import _chunk_ids
+
+from tests.mock_server import MockServerTestCase
+
+
+class TestStreaming(MockServerTestCase):
+    """Tests for `Endpoint.iter_all` and `Endpoint.iter_export` against the local mock API."""
+
+    server_options = {"records": 250, "export_page_size": 100}
+
+    def test_iter_all_fetches_pages_lazily(self):
+        """The first record is available after one request."""
+        records = servicepytan.Endpoint("jpm", "jobs", self.connect()).iter_all({"pageSize": 100})
+        self.assertEqual(next(records)["id"], 1)
+        self.assertEqual(self.server.stats["requests"], 1)
+        self.assertEqual(sum(1 for _ in records), 249)
+        self.assertEqual(self.server.stats["requests"], 3)
+
+    def test_iter_all_pages(self):
+        """With pages=True each page response is yielded whole."""
+        endpoint = servicepytan.Endpoint("jpm", "jobs", self.connect())
+        pages = list(endpoint.iter_all({"pageSize": 100}, pages=True))
+        self.assertEqual([len(page["data"]) for page in pages], [100, 100, 50])
+        self.assertEqual([page["hasMore"] for page in pages], [True, True, False])
+
+    def test_iter_all_does_not_change_the_query(self):
+        """The caller's query dictionary is left untouched."""
+        query = {"pageSize": 100}
+        list(servicepytan.Endpoint("jpm", "jobs", self.connect()).iter_all(query))
+        self.assertEqual(query, {"pageSize": 100})
+
+    def test_iter_all_without_results(self):
+        """An empty first page yields nothing."""
+        endpoint = servicepytan.Endpoint("jpm", "jobs", self.connect())
+        self.assertEqual(list(endpoint.iter_all({"ids": "999999"})), [])
+
+    def test_iter_export_resumes_from_a_token(self):
+        """An export started from a page's continueFrom token yields the remaining records."""
+        endpoint = servicepytan.Endpoint("jpm", "export", self.connect())
+        pages = endpoint.iter_export("jobs", pages=True)
+        first = next(pages)
+        pages.close()
+        rest = list(endpoint.iter_export("jobs", export_from=first["continueFrom"]))
+        self.assertEqual([job["id"] for job in first["data"] + rest], list(range(1, 251)))
+
+    def test_iter_export_yields_the_final_empty_page(self):
+        """Resuming a finished export yields one empty page with its token."""
+        endpoint = servicepytan.Endpoint("jpm", "export", self.connect())
+        pages = list(endpoint.iter_export("jobs", export_from="250", pages=True))
+        self.assertEqual(len(pages), 1)
+        self.assertEqual((pages[0]["data"], pages[0]["continueFrom"]), ([], "250"))
+
+
+class TestGetByIds(MockServerTestCase):
+    """Tests for `Endpoint.get_by_ids` against the local mock API."""
+
+    server_options = {"records": 250}
+
+    def test_chunk_ids(self):
+        """Chunks respect both the id count and the URL length limits."""
+        self.assertEqual(_chunk_ids(range(7), max_ids=3), [[0, 1, 2], [3, 4, 5], [6]])
+        # Each id takes its digits plus an encoded comma
+        self.assertEqual(_chunk_ids([1000, 2000, 3000], max_ids=50, max_chars=14), [[1000, 2000], [3000]])
+        self.assertEqual(_chunk_ids([]), [])
+
+    def test_ids_are_fetched_in_chunks(self):
+        """Ids are looked up in about N/chunk_size requests, in the order asked for."""
+        endpoint = servicepytan.Endpoint("jpm", "jobs", self.connect())
+        ids = list(range(200, 80, -1)) + [7, 7, 999]
+        records = endpoint.get_by_ids(ids, chunk_size=50)
+        self.assertEqual(list(records), list(range(200, 80, -1)) + [7])
+        self.assertEqual(records[7]["jobNumber"], "100006")
+        self.assertEqual(self.server.stats["requests"], 3)
+
+    def test_endpoint_without_ids_filter_falls_back_to_get_one(self):
+        """An endpoint returning records that were not asked for is queried record by record."""
+        self.server.unfiltered_endpoints.add("locations")
+        self.addCleanup(self.server.unfiltered_endpoints.discard, "locations")
+        endpoint = servicepytan.Endpoint("crm", "locations", self.connect())
+        records = endpoint.get_by_ids(["3", "1", "999"], max_workers=2)
+        self.assertEqual(list(records), ["3", "1"])
+        self.assertEqual(records["1"]["id"], 1)
+        self.assertEqual(self.server.stats["requests"], 4)
+
+    def test_ids_filter_can_be_skipped(self):
+        """use_ids_filter=False always uses get_one."""
+        endpoint = servicepytan.Endpoint("jpm", "jobs", self.connect())
+        self.assertEqual(list(endpoint.get_by_ids([5, 6], use_ids_filter=False)), [5, 6])
+        self.assertEqual(self.server.stats["requests"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
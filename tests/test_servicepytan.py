@@ -3,31 +3,164 @@
 """Tests for `servicepytan` package."""
 
 
+import json
+import os
+import socket
+import tempfile
 import unittest
+
 from click.testing import CliRunner
 
-from servicepytan import servicepytan
+import servicepytan
 from servicepytan import cli
+from servicepytan.metrics import InMemoryRecorder, Metrics, PrometheusSink, StatsDSink
+from servicepytan.reports import set_report_rate_limit
+from servicepytan.ratelimit import RetryPolicy
+
+from tests.benchmarks import format_results, import_time, run_benchmarks
+from tests.mock_server import MockServiceTitan
 
 
 class TestServicepytan(unittest.TestCase):
-    """Tests for `servicepytan` package."""
+    """Tests for `servicepytan` package against the local mock API."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start one mock server for the test case."""
+        cls.server = MockServiceTitan(records=1234, export_page_size=200).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the mock server."""
+        cls.server.stop()
 
     def setUp(self):
-        """Set up test fixtures, if any."""
+        """Set up a connection and reset the server's rate limiting."""
+        self.server.rate_limit_every = 0
+        self.conn = servicepytan.Connection(self.server.config(), rate_limit=10000,
+                                            retry_policy=RetryPolicy(backoff_base=0.01))
 
     def tearDown(self):
-        """Tear down test fixtures, if any."""
+        """Close the connection."""
+        self.conn.close()
+
+    def test_get_all_pages_sequentially_and_concurrently(self):
+        """get_all returns every record in order with or without workers."""
+        endpoint = servicepytan.Endpoint("jpm", "jobs", self.conn)
+        sequential = endpoint.get_all({"pageSize": 100})
+        concurrent = endpoint.get_all({"pageSize": 100}, max_workers=4)
+        self.assertEqual([job["id"] for job in sequential], list(range(1, 1235)))
+        self.assertEqual(sequential, concurrent)
+
+    def test_export_follows_continue_from(self):
+        """export_all follows continueFrom tokens until hasMore is false."""
+        records = servicepytan.Endpoint("jpm", "export", self.conn).export_all("jobs")
+        self.assertEqual(len(records), 1234)
+        pages = list(servicepytan.Endpoint("jpm", "export", self.conn).iter_export("jobs", pages=True))
+        self.assertEqual(pages[-1]["continueFrom"], "1234")
+
+    def test_report_pages(self):
+        """Report.get_all_data combines every page of a report."""
+        report = servicepytan.Report("operations", 42, conn=self.conn)
+        set_report_rate_limit(42, 10000, self.conn)
+        data = report.get_all_data(page_size=500, max_workers=2)
+        self.assertEqual([field["name"] for field in data["fields"]], ["Id", "JobNumber", "Total", "CompletedOn"])
+        self.assertEqual(len(data["data"]), 1234)
+        self.assertEqual(data["data"][-1][0], 1234)
+
+    def test_rate_limited_requests_are_retried(self):
+        """429 responses are retried without losing records."""
+        self.server.rate_limit_every = 3
+        self.server.reset_stats()
+        jobs = servicepytan.Endpoint("jpm", "jobs", self.conn).get_all({"pageSize": 200})
+        self.assertEqual(len(jobs), 1234)
+        self.assertGreater(self.server.stats["rate_limited"], 0)
 
-    def test_000_something(self):
-        """Test something."""
+    def test_metrics_hooks(self):
+        """Requests and pulls are reported to every metrics sink."""
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(("127.0.0.1", 0))
+        receiver.settimeout(5)
+        recorder, prometheus = InMemoryRecorder(), PrometheusSink()
+        statsd = StatsDSink(*receiver.getsockname())
+        self.conn.metrics = Metrics([recorder, prometheus, statsd])
+        self.server.rate_limit_every = 3
+        self.server.reset_stats()
+        endpoint = servicepytan.Endpoint("jpm", "jobs", self.conn)
+        endpoint.get_all({"pageSize": 500})
+        endpoint.get_one(7)
+
+        summary = recorder.summary()
+        self.assertEqual(summary["jpm/jobs"]["requests"], 3)
+        self.assertEqual(summary["jpm/jobs"]["retries"], 1)
+        self.assertEqual(summary["jpm/jobs/{id}"]["requests"], 1)
+        pull = recorder.pulls()[0]
+        self.assertEqual((pull["kind"], pull["pages"], pull["records"], pull["completed"]), ("iter_all", 3, 1234, True))
+        self.assertIn('servicepytan_requests_total{method="GET",endpoint="jpm/jobs",status="200"} 3', prometheus.render())
+        self.assertTrue(receiver.recv(4096).decode().startswith("servicepytan.requests.jpm.jobs.200:1|c"))
+        statsd.close()
+        receiver.close()
+
+    def test_benchmarks_run(self):
+        """The benchmark suite measures every mode."""
+        results = run_benchmarks(records=300, latency=0, page_size=100, max_workers=2)
+        self.assertTrue(all(result["records"] == 300 for result in results))
+        self.assertIn("rec/s", format_results(results))
+
+    def test_import_is_lazy(self):
+        """Importing the package defers the HTTP, date and dotenv dependencies."""
+        result = import_time("import servicepytan", runs=1)
+        for module in ("requests", "dateutil", "pytz", "dotenv", "servicepytan.requests"):
+            self.assertNotIn(module, result["modules"])
+        # Guard the import cost by what is imported rather than by wall-clock time, which varies between machines
+        self.assertLessEqual(len(result["modules"]), 5, result["modules"])
+        self.assertIn("requests", import_time("import servicepytan; servicepytan.Endpoint", runs=1)["modules"])
+        self.assertIs(servicepytan.Endpoint, servicepytan.requests.Endpoint)
+        with self.assertRaises(AttributeError):
+            servicepytan.not_a_name
 
     def test_command_line_interface(self):
-        """Test the CLI."""
+        """The CLI exports, pulls and reports to files or stdout and resumes exports."""
         runner = CliRunner()
-        result = runner.invoke(cli.main)
-        assert result.exit_code == 0
-        assert 'servicepytan.cli.main' in result.output
-        help_result = runner.invoke(cli.main, ['--help'])
-        assert help_result.exit_code == 0
-        assert '--help  Show this message and exit.' in help_result.output
+        help_result = runner.invoke(cli.main, ["--help"])
+        self.assertEqual(help_result.exit_code, 0)
+        for command in ("export", "get-all", "report", "download"):
+            self.assertIn(command, help_result.output)
+
+        with tempfile.TemporaryDirectory() as directory:
+            config_file = os.path.join(directory, "config.json")
+            with open(config_file, "w") as f:
+                json.dump(self.server.config(tenant_id="cli"), f)
+            options = ["--config", config_file, "--api-root", self.server.url, "--auth-root", self.server.url,
+                       "--rate-limit", "10000", "--quiet"]
+            output = os.path.join(directory, "out")
+            checkpoint = os.path.join(directory, "checkpoint.json")
+
+            result = runner.invoke(cli.main, options + ["export", "jpm", "jobs", "-o", output, "--prefix", "jobs",
+                                                        "--checkpoint", checkpoint, "--max-rows-per-file", "500"])
+            self.assertEqual(result.exit_code, 0, result.output)
+            with open(os.path.join(output, "jobs.manifest.json")) as f:
+                manifest = json.load(f)
+            self.assertEqual((manifest["total_rows"], len(manifest["files"]), manifest["continueFrom"]), (1234, 3, "1234"))
+
+            # The checkpoint makes the next run start where the export ended
+            result = runner.invoke(cli.main, options + ["export", "jpm", "jobs", "-o", output, "--prefix", "again",
+                                                        "--checkpoint", checkpoint])
+            self.assertEqual(result.exit_code, 0, result.output)
+            with open(os.path.join(output, "again.manifest.json")) as f:
+                self.assertEqual(json.load(f)["total_rows"], 0)
+
+            result = runner.invoke(cli.main, options + ["get-all", "jpm", "jobs", "-o", output, "-f", "csv",
+                                                        "--prefix", "list", "--page-size", "100", "-w", "4"])
+            self.assertEqual(result.exit_code, 0, result.output)
+            with open(os.path.join(output, "list-00000.csv")) as f:
+                self.assertEqual(len(f.readlines()), 1235)
+
+        set_report_rate_limit(7, 10000, self.server.config())
+        result = runner.invoke(cli.main, ["--quiet", "--api-root", self.server.url, "--auth-root", self.server.url,
+                                          "--tenant", "1", "report", "operations", "7", "-o", "-"],
+                               env={key: value for key, value in self.server.config().items() if key.isupper()})
+        self.assertEqual(result.exit_code, 0, result.output)
+        rows = [json.loads(line) for line in result.stdout.splitlines() if line.startswith("{")]
+        self.assertEqual(len(rows), 1234)
+        self.assertEqual(rows[0]["JobNumber"], "100000")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+"""Tests for date-range sharding in `servicepytan.sharding`."""
+
+
+import unittest
+from datetime import datetime, timedelta
+
+import requests
+
+import servicepytan
+from servicepytan.ratelimit import RetryPolicy
+from servicepytan.sharding import DateRangeSharder, split_date_range
+
+from tests.mock_server import MockServerTestCase
+
+
+class TestSplitDateRange(unittest.TestCase):
+    """Tests for `split_date_range`."""
+
+    def test_windows_cover_the_range(self):
+        """Windows are consecutive and the last one is cut at the end date."""
+        windows = split_date_range("2024-01-01", "2024-01-17", "week")
+        self.assertEqual(windows, [
+            (datetime(2024, 1, 1), datetime(2024, 1, 8)),
+            (datetime(2024, 1, 8), datetime(2024, 1, 15)),
+            (datetime(2024, 1, 15), datetime(2024, 1, 17)),
+        ])
+
+    def test_timedelta_shards(self):
+        """A `timedelta` can be used as the shard size."""
+        self.assertEqual(len(split_date_range("2024-01-01", "2024-01-02", timedelta(hours=6))), 4)
+
+
+class TestDateRangeSharder(MockServerTestCase):
+    """Tests for `DateRangeSharder` against the local mock API."""
+
+    server_options = {"records": 1000}
+
+    def sharder(self, conn=None, **kwargs):
+        endpoint = servicepytan.Endpoint("jpm", "jobs", conn or self.connect())
+        return DateRangeSharder(endpoint, "createdOnOrAfter", "createdBefore", **kwargs)
+
+    def expected(self, conn=None):
+        endpoint = servicepytan.Endpoint("jpm", "jobs", conn or self.connect())
+        return endpoint.get_all({"createdOnOrAfter": "2024-01-01", "createdBefore": "2024-01-29", "pageSize": 5000})
+
+    def test_day_shards_return_every_record(self):
+        """Day shards return the same records as one unsharded query, one request per shard."""
+        expected = self.expected()
+        self.server.reset_stats()
+        jobs = self.sharder(shard="day").get_all("2024-01-01", "2024-01-29", {"pageSize": 5000})
+        self.assertEqual(sorted(job["id"] for job in jobs), sorted(job["id"] for job in expected))
+        self.assertEqual(self.server.stats["requests"], 28)
+
+    def test_adaptive_shards_split_large_windows(self):
+        """Adaptive sharding halves windows until each fits the record limit."""
+        sharder = self.sharder(shard="adaptive", max_records_per_shard=200)
+        windows = sharder.shards("2024-01-01", "2024-01-29")
+        self.assertGreater(len(windows), 4)
+        self.assertEqual(windows[0][0], datetime(2024, 1, 1))
+        self.assertEqual(windows[-1][1], datetime(2024, 1, 29))
+        jobs = sharder.get_all("2024-01-01", "2024-01-29")
+        self.assertEqual(len(jobs), len(self.expected()))
+
+    def test_failed_shard_is_retried(self):
+        """A shard that fails is fetched again without failing the pull."""
+        conn = self.connect(retry_policy=RetryPolicy(max_attempts=1))
+        expected = self.expected(conn)
+        self.server.error_every = 5
+        jobs = self.sharder(conn, shard="day", max_shard_attempts=3).get_all("2024-01-01", "2024-01-29")
+        self.assertGreater(self.server.stats["errors"], 0)
+        self.assertEqual(sorted(job["id"] for job in jobs), sorted(job["id"] for job in expected))
+
+    def test_client_errors_are_not_retried(self):
+        """A 4xx fails the pull at once instead of fetching the shard again."""
+        conn = self.connect(retry_policy=RetryPolicy(max_attempts=1))
+        self.addCleanup(setattr, self.server, "error_status", self.server.error_status)
+        self.server.error_status = 400
+        self.server.error_every = 1
+        with self.assertRaises(requests.HTTPError):
+            self.sharder(conn, shard="week", max_workers=1, max_shard_attempts=3).get_all("2024-01-01", "2024-01-08")
+        self.assertEqual(self.server.stats["requests"], 1)
+
+    def test_data_service_sharded_pull(self):
+        """`DataService` pulls return the same jobs with and without sharding."""
+        data_service = servicepytan.DataService(self.connect())
+        sharded = data_service.get_jobs_created_between("2024-01-01", "2024-01-15", shard="week")
+        unsharded = data_service.get_jobs_created_between("2024-01-01", "2024-01-15")
+        self.assertEqual(sorted(job["id"] for job in sharded), sorted(job["id"] for job in unsharded))
+        self.assertEqual(len(sharded), 504)
+
+
+if __name__ == "__main__":
+    unittest.main()
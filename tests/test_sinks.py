@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+"""Tests for the file sinks in `servicepytan.sinks`."""
+
+
+import csv
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import ANY
+
+import requests
+
+import servicepytan
+from servicepytan.ratelimit import RetryPolicy
+from servicepytan.reports import set_report_rate_limit
+from servicepytan.sinks import CSVSink, NDJSONSink, ParquetSink, write_export, write_report
+
+from tests.mock_server import MockServerTestCase, make_record
+
+
+class SinkTestCase(MockServerTestCase):
+    """Writes into a temporary directory."""
+
+    server_options = {"records": 250, "export_page_size": 100}
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def manifest(self, name="part.manifest.json"):
+        with open(os.path.join(self.directory, name)) as f:
+            return json.load(f)
+
+
+class TestFileSinks(SinkTestCase):
+    """Tests for rotation, formats and manifests."""
+
+    def test_ndjson_rotates_files(self):
+        """Files rotate at max_rows_per_file and the manifest lists each one."""
+        records = [make_record(index) for index in range(25)]
+        with NDJSONSink(self.directory, max_rows_per_file=10, compression="gzip") as sink:
+            sink.write_page(records[:7])
+            sink.write_records(records[7:], batch_size=4)
+        manifest = self.manifest()
+        self.assertTrue(manifest["complete"])
+        self.assertEqual(manifest["total_rows"], 25)
+        self.assertEqual([file["rows"] for file in manifest["files"]], [10, 10, 5])
+        with gzip.open(os.path.join(self.directory, manifest["files"][2]["path"]), "rt") as f:
+            self.assertEqual([json.loads(line)["id"] for line in f], list(range(21, 26)))
+
+    def test_csv_writes_nested_values_as_json(self):
+        """CSV files get a header and JSON for nested values."""
+        with CSVSink(self.directory, max_rows_per_file=100) as sink:
+            sink.write_page([make_record(3)])
+        with open(os.path.join(self.directory, "part-00000.csv")) as f:
+            row = next(csv.DictReader(f))
+        self.assertEqual(json.loads(row["tagTypeIds"]), [1, 2, 3])
+        self.assertEqual(row["jobNumber"], "100003")
+
+    def test_parquet(self):
+        """Parquet files keep every row."""
+        import pyarrow.parquet as pq
+        with ParquetSink(self.directory, max_rows_per_file=8) as sink:
+            sink.write_page([make_record(index) for index in range(10)])
+        tables = [pq.read_table(os.path.join(self.directory, file["path"])) for file in sink.manifest["files"]]
+        self.assertEqual([table.num_rows for table in tables], [8, 2])
+
+    def test_prefixes_share_a_directory(self):
+        """Sinks with different prefixes write their own manifests."""
+        for prefix, count in (("jobs", 3), ("invoices", 5)):
+            with NDJSONSink(self.directory, prefix=prefix) as sink:
+                sink.write_page([make_record(index) for index in range(count)])
+        self.assertEqual(self.manifest("jobs.manifest.json")["files"], [{"path": "jobs-00000.ndjson", "rows": 3, "bytes": ANY}])
+        self.assertEqual(self.manifest("invoices.manifest.json")["total_rows"], 5)
+
+    def test_exception_marks_the_manifest_incomplete(self):
+        """Leaving the sink on an exception writes an incomplete manifest."""
+        with self.assertRaises(RuntimeError):
+            with NDJSONSink(self.directory) as sink:
+                sink.write_page([make_record(0)])
+                raise RuntimeError("pull failed")
+        manifest = self.manifest()
+        self.assertFalse(manifest["complete"])
+        self.assertEqual(manifest["total_rows"], 1)
+
+
+class TestWriteExport(SinkTestCase):
+    """Tests for `write_export` and `write_report` against the local mock API."""
+
+    def test_export_stores_the_last_token(self):
+        """A finished export stores its final continueFrom token."""
+        endpoint = servicepytan.Endpoint("jpm", "export", self.connect())
+        manifest = write_export(endpoint, "jobs", NDJSONSink(self.directory))
+        self.assertEqual((manifest["total_rows"], manifest["continueFrom"], manifest["complete"]), (250, "250", True))
+
+    def test_failed_export_keeps_the_last_written_token(self):
+        """A failed export writes an incomplete manifest with the token to resume from."""
+        conn = self.connect(retry_policy=RetryPolicy(max_attempts=1))
+        self.server.error_every = 3
+        with self.assertRaises(requests.HTTPError):
+            write_export(servicepytan.Endpoint("jpm", "export", conn), "jobs", NDJSONSink(self.directory))
+        manifest = self.manifest()
+        self.assertEqual((manifest["total_rows"], manifest["continueFrom"], manifest["complete"]), (200, "200", False))
+
+    def test_report(self):
+        """Report rows are written as field name to value records."""
+        conn = self.connect()
+        set_report_rate_limit(11, 10000, conn)
+        manifest = write_report(servicepytan.Report("operations", 11, conn=conn), NDJSONSink(self.directory),
+                                page_size=100)
+        self.assertEqual((manifest["total_rows"], manifest["complete"]), (250, True))
+        with open(os.path.join(self.directory, "part-00000.ndjson")) as f:
+            self.assertEqual(json.loads(f.readline())["JobNumber"], "100000")
+
+
+if __name__ == "__main__":
+    unittest.main()
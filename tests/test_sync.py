@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+"""Tests for checkpointed export syncs in `servicepytan.sync`."""
+
+
+import os
+import tempfile
+import unittest
+
+from servicepytan.sync import ExportSync, FileCheckpointStore, SQLiteCheckpointStore
+
+from tests.mock_server import MockServerTestCase
+
+
+class TestCheckpointStores(unittest.TestCase):
+    """Tests for the file and SQLite checkpoint stores."""
+
+    def setUp(self):
+        """Create a scratch directory."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def check_store(self, store):
+        key, other = ("1", "jpm", "jobs"), ("2", "jpm", "jobs")
+        self.assertIsNone(store.get(key))
+        store.set(key, "token-1")
+        store.set(key, "token-2")
+        store.set(other, "token-9")
+        self.assertEqual(store.get(key), "token-2")
+        store.delete(key)
+        self.assertIsNone(store.get(key))
+        self.assertEqual(store.get(other), "token-9")
+
+    def test_file_store(self):
+        """The JSON file store keeps one token per key and leaves no temporary file."""
+        path = os.path.join(self.directory, "checkpoints.json")
+        self.check_store(FileCheckpointStore(path))
+        self.assertEqual(FileCheckpointStore(path).get(("2", "jpm", "jobs")), "token-9")
+        self.assertEqual(os.listdir(self.directory), ["checkpoints.json"])
+
+    def test_sqlite_store(self):
+        """The SQLite store keeps one token per key across instances."""
+        path = os.path.join(self.directory, "checkpoints.db")
+        self.check_store(SQLiteCheckpointStore(path))
+        self.assertEqual(SQLiteCheckpointStore(path).get(("2", "jpm", "jobs")), "token-9")
+
+
+class TestExportSync(MockServerTestCase):
+    """Tests for `ExportSync` against the local mock API."""
+
+    server_options = {"records": 250, "export_page_size": 100}
+
+    def setUp(self):
+        """Create a sync with its own checkpoint file."""
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = FileCheckpointStore(os.path.join(directory.name, "checkpoints.json"))
+        self.sync = ExportSync("jpm", "jobs", self.connect(), store=self.store)
+
+    def test_second_run_only_fetches_changes(self):
+        """A finished sync resumes from its last token."""
+        pages = []
+        self.assertEqual(self.sync.run(pages.append), 250)
+        self.assertEqual(self.store.get(self.sync.key), "250")
+        self.server.reset_stats()
+        self.assertEqual(self.sync.run(pages.append), 0)
+        self.assertEqual(self.server.stats["requests"], 1)
+
+    def test_failed_page_is_not_checkpointed(self):
+        """A handler failure leaves the checkpoint at the last completed page."""
+        received = []
+
+        def fail_on_second_page(records):
+            if received:
+                raise RuntimeError("warehouse unavailable")
+            received.extend(records)
+
+        with self.assertRaises(RuntimeError):
+            self.sync.run(fail_on_second_page)
+        self.assertEqual(self.store.get(self.sync.key), "100")
+        rest = list(self.sync.iter_records())
+        self.assertEqual([job["id"] for job in received + rest], list(range(1, 251)))
+
+    def test_reset_starts_over(self):
+        """After a reset the next run is a full export."""
+        self.sync.run(lambda records: None)
+        self.sync.reset()
+        self.assertEqual(self.sync.run(lambda records: None), 250)
+
+
+if __name__ == "__main__":
+    unittest.main()
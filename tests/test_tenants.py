@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+"""Tests for `TenantRunner` in `servicepytan.tenants`."""
+
+
+import unittest
+
+from servicepytan.tenants import TenantPullError, TenantRunner
+
+from tests.mock_server import MockServerTestCase
+
+
+class TestTenantRunner(MockServerTestCase):
+    """Tests for multi-tenant pulls against the local mock API."""
+
+    server_options = {"records": 120}
+
+    def test_records_are_tagged_by_tenant(self):
+        """Every tenant's records are pulled and tagged with the tenant."""
+        with TenantRunner.from_tenant_ids(self.connect(), ["1", "2", "3"], max_tenants=2) as runner:
+            results = runner.get_all("jpm", "jobs", {"pageSize": 50})
+        self.assertEqual(sorted(results), ["1", "2", "3"])
+        self.assertTrue(all(len(records) == 120 for records in results.values()))
+
+    def test_caller_connections_are_not_changed(self):
+        """The global limit is set on the runner's copies, not on the connections passed in."""
+        conns = [self.connect("1"), self.connect("2")]
+        runner = TenantRunner(conns, global_rate_limit=50)
+        self.assertTrue(all(conn.shared_rate_limiter is None for conn in conns))
+        limiters = {id(conn.shared_rate_limiter) for conn in runner.connections.values()}
+        self.assertEqual(len(limiters), 1)
+        self.assertIsNotNone(runner.connections["1"].shared_rate_limiter)
+        self.assertIs(runner.connections["1"].session, conns[0].session)
+
+    def test_duplicate_tenants_are_rejected(self):
+        """Listing a tenant twice raises instead of silently dropping one."""
+        with self.assertRaises(ValueError):
+            TenantRunner([self.server.config("1"), self.server.config("1")])
+        with self.assertRaises(ValueError):
+            TenantRunner.from_tenant_ids(self.server.config(), ["1", "2", "1"])
+
+    def test_close_releases_created_connections(self):
+        """Connections created from dictionaries are closed with the runner."""
+        runner = TenantRunner([self.server.config("1"), self.server.config("2")])
+        runner.get_all("jpm", "jobs", {"pageSize": 200})
+        sessions = [conn._session for conn in runner.connections.values()]
+        self.assertTrue(all(session is not None for session in sessions))
+        runner.close()
+        self.assertTrue(all(conn._session is None for conn in runner.connections.values()))
+
+        with TenantRunner.from_tenant_ids(self.server.config(), ["1", "2"]) as runner:
+            runner.get_all("jpm", "jobs", {"pageSize": 200})
+            base = runner._owned[0]
+        self.assertIsNone(base._session)
+
+    def test_failed_tenant_does_not_stop_the_others(self):
+        """Failures are collected per tenant and raised once every tenant is done."""
+        def pull(conn):
+            if conn["SERVICETITAN_TENANT_ID"] == "2":
+                raise RuntimeError("tenant 2 is down")
+            return range(3)
+
+        runner = TenantRunner.from_tenant_ids(self.connect(), ["1", "2", "3"])
+        records = []
+        with self.assertRaises(TenantPullError) as raised:
+            for item in runner.iter_records(pull):
+                records.append(item)
+        self.assertEqual(sorted(records), [("1", 0), ("1", 1), ("1", 2), ("3", 0), ("3", 1), ("3", 2)])
+        self.assertEqual(list(raised.exception.errors), ["2"])
+        runner.raise_errors = False
+        self.assertEqual(len(list(runner.iter_records(pull))), 6)
+        self.assertIn("2", runner.errors)
+
+
+if __name__ == "__main__":
+    unittest.main()